@@ -1,26 +1,121 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nurse_etr.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Connection pool settings (QueuePool: file SQLite and server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_LEAK_SECONDS = float(os.getenv("DB_POOL_LEAK_SECONDS", "60"))  # checkouts held longer look leaked
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that reports checkouts that gave up waiting for a free connection"""
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_monitor.record_wait_timeout()
+            raise
+
+
+_is_sqlite = "sqlite" in DATABASE_URL
+_is_memory = _is_sqlite and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/").endswith("sqlite:"))
+
+engine_options = {
+    "connect_args": {"check_same_thread": False} if _is_sqlite else {}
+}
+if not _is_memory:
+    engine_options.update(
+        poolclass=MonitoredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=not _is_sqlite
+    )
+
+engine = create_engine(DATABASE_URL, **engine_options)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+class PoolMonitor:
+    """Tracks pool checkouts so leaked or starved connections show up"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.checkins = 0
+        self.peak_checked_out = 0
+        self.wait_timeouts = 0
+        self._checked_out = {}  # id(connection record) -> checkout time
+        self._lock = threading.Lock()
+
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out[id(connection_record)] = time.monotonic()
+            self.peak_checked_out = max(self.peak_checked_out, len(self._checked_out))
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self._checked_out.pop(id(connection_record), None)
+
+    def record_wait_timeout(self):
+        with self._lock:
+            self.wait_timeouts += 1
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        now = time.monotonic()
+        with self._lock:
+            held = list(self._checked_out.values())
+
+        stats = {
+            'pool': type(pool).__name__,
+            'checked_out': len(held),
+            'peak_checked_out': self.peak_checked_out,
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'wait_timeouts': self.wait_timeouts,
+            'long_held': sum(1 for started in held if now - started > DB_POOL_LEAK_SECONDS),
+            'oldest_checkout_seconds': round(now - min(held), 2) if held else 0.0
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                overflow=pool.overflow(),
+                idle=pool.checkedin(),
+                capacity=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+                utilisation=round(pool.checkedout() / (DB_POOL_SIZE + DB_MAX_OVERFLOW), 4)
+            )
+        return stats
+
+
+pool_monitor = PoolMonitor(engine)
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,13 +1,33 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from app.database import get_db, pool_monitor
+from app.migrations import init_db
 from app.routers import agent
+from app.routers.agent import MessageRequest, process_message
 from app.services.reminder_service import ReminderService
+from app.services.telex_service import telex_service
+from app.services.intent_rules import intent_rules
+from app.services.intent_cache import intent_cache
+from app.services import ai_service
+from app.utils import concurrency
+from app.utils.metrics import registry, profiler
+from app.utils.log import setup_logging, shutdown_logging, get_logger, log_context, new_correlation_id
 from contextlib import asynccontextmanager
+import hmac
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+setup_logging()
+logger = get_logger(__name__)
+
+# Schema creation and migrations run at startup, not on import; turn this
+# off when `python -m app.migrations` runs as a separate deploy step
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Token for operator-only endpoints (the profiler), sent as X-Admin-Token;
+# those endpoints are disabled while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 # Initialize reminder service
 reminder_service = None
@@ -18,17 +38,25 @@ async def lifespan(app: FastAPI):
     global reminder_service
     
     # Startup
-    print("🚀 Starting Nurse ETR Assistant...")
+    setup_logging()
+    logger.info("Starting Nurse ETR Assistant")
+    if DB_MIGRATE_ON_STARTUP:
+        init_db()
+    await telex_service.start()
     reminder_service = ReminderService()
     reminder_service.start()
-    print("✅ Application started successfully!")
+    logger.info("Application started")
     
     yield
     
     # Shutdown
-    print("👋 Shutting down...")
-    if reminder_service and reminder_service.scheduler:
-        reminder_service.scheduler.shutdown()
+    logger.info("Shutting down")
+    if reminder_service:
+        reminder_service.stop()
+    await telex_service.stop()
+    profiler.stop()
+    concurrency.shutdown()
+    shutdown_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -47,9 +75,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag every log line of a request with its ID (X-Request-ID if the caller sent one)"""
+    request_id = request.headers.get("X-Request-ID") or new_correlation_id()
+    with log_context(request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Include routers
 app.include_router(agent.router)
 
+# Component stats exported as gauges on /metrics
+registry.gauge_callback(
+    "db_pool", "SQLAlchemy connection pool state", pool_monitor.stats,
+    counters=("checkouts", "checkins", "wait_timeouts")
+)
+registry.gauge_callback(
+    "telex_outbound", "Outbound Telex delivery state", telex_service.stats,
+    counters=("sent", "failed", "retried", "dropped", "coalesced")
+)
+registry.gauge_callback(
+    "intent_cache", "Intent parse cache stats", intent_cache.stats,
+    counters=("hits", "misses", "evictions")
+)
+registry.gauge_callback(
+    "intent_rules", "Rule-based intent fast path stats", intent_rules.stats,
+    counters=("hits", "misses")
+)
+registry.gauge_callback(
+    "llm_backend", "LLM backend circuit breaker state", lambda: ai_service.backend.stats(),
+    counters=("trips",)
+)
+registry.gauge_callback(
+    "reminder_sweep_last",
+    "Last reminder sweep duration in ms",
+    lambda: {name: stats['duration_ms'] for name, stats in reminder_service.sweep_stats.items()} if reminder_service else {}
+)
+registry.gauge_callback(
+    "reminder_leader",
+    "1 if this worker holds the reminder sweep lease",
+    lambda: int(reminder_service.sweep_lease.held) if reminder_service else 0
+)
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Allow a request only if it carries ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 @app.get("/")
 async def root():
     """Root endpoint - GET"""
@@ -64,14 +140,14 @@ async def root():
     }
 
 @app.post("/")
-async def root_post(request: Request):
+async def root_post(request: Request, db: Session = Depends(get_db)):
     """
     Root endpoint - POST
     Handles Telex messages sent to root URL
     """
     try:
         body = await request.json()
-        print(f"📨 Received POST to root: {body}")
+        logger.debug("Received POST to root", extra={"fields": {"keys": sorted(body) if isinstance(body, dict) else None}})
         
         # Extract message from various possible field names
         message_text = (
@@ -91,36 +167,23 @@ async def root_post(request: Request):
         )
         
         if not message_text:
-            print(f"⚠️ No message found in body: {body}")
+            logger.warning("No message found in root POST body")
             return {
                 "error": "No message found",
                 "received": body,
                 "response": "Please provide a message to process."
             }
         
-        print(f"📝 Processing: '{message_text}' from {user_id}")
-        
-        # Import required modules
-        from app.routers.agent import MessageRequest, process_message
-        from app.database import get_db
-        
         # Create message request
         message_request = MessageRequest(message=message_text, user_id=user_id)
         
-        # Get database session
-        db = next(get_db())
-        
-        # Process the message
+        # Process the message with the request-scoped session
         response = await process_message(message_request, db)
         
-        print(f"✅ Responding with: {response}")
-        
         return response
     
     except Exception as e:
-        print(f"❌ Error in root POST handler: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in root POST handler")
         
         error_msg = "Sorry, I encountered an error processing your request."
         return {
@@ -131,6 +194,27 @@ async def root_post(request: Request):
             "error": str(e)
         }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-style metrics"""
+    return registry.render()
+
+@app.post("/metrics/profiler", dependencies=[Depends(require_admin)])
+async def toggle_profiler(enabled: bool, interval_ms: float = 10, reset: bool = False):
+    """Start or stop the sampling profiler at runtime"""
+    if reset:
+        profiler.reset()
+    if enabled:
+        profiler.start(interval_ms)
+    else:
+        profiler.stop()
+    return {"running": profiler.running, "samples": profiler.sample_count, "interval_ms": profiler.interval * 1000}
+
+@app.get("/metrics/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(limit: int = 500):
+    """Collapsed stacks from the sampling profiler (flamegraph.pl / speedscope format)"""
+    return profiler.collapsed(limit)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
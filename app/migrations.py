@@ -0,0 +1,239 @@
+"""
+Lightweight schema migrations.
+
+Base.metadata.create_all only creates missing tables, it never alters
+existing ones. Each migration here runs once per database, in order,
+and is recorded in the schema_migrations table. Migrations must be
+idempotent so they are safe on fresh databases where create_all has
+already built the current schema. Every uvicorn worker may run them at
+startup, so each step holds a database-wide lock and re-checks what is
+already applied once it has it.
+"""
+from contextlib import contextmanager
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from app.database import Base, engine as default_engine
+from app.models.patient import Vitals, Diagnosis, Medication, Appointment
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# pg_advisory_xact_lock key serialising migration runs ("ETRMIGR" in hex)
+MIGRATION_LOCK_KEY = 0x4554524D49475200
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow)
+)
+
+
+def _create_indexes(conn, *names):
+    """Create missing indexes declared in the models' __table_args__, by name"""
+    for model in (Vitals, Diagnosis, Medication, Appointment):
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    """Add a column to an existing table unless it is already there"""
+    existing = {col['name'] for col in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _add_hot_path_indexes(conn):
+    _create_indexes(
+        conn,
+        "ix_vitals_patient_recorded",
+        "ix_diagnoses_patient_diagnosed",
+        "ix_medications_active_next_dose",
+        "ix_medications_patient_active",
+        "ix_appointments_completed_datetime",
+        "ix_appointments_patient_datetime"
+    )
+
+
+def _add_appointment_cancellation(conn):
+    _add_column(conn, "appointments", "is_cancelled", "INTEGER DEFAULT 0")
+    conn.exec_driver_sql("UPDATE appointments SET is_cancelled = 0 WHERE is_cancelled IS NULL")
+
+
+def _add_medication_schedule(conn):
+    from app.services.frequency import parse_frequency
+
+    _add_column(conn, "medications", "interval_minutes", "INTEGER")
+    _add_column(conn, "medications", "dose_times", "VARCHAR")
+    _add_column(conn, "medications", "is_prn", "INTEGER DEFAULT 0")
+
+    # Backfill from the free-text frequency of existing prescriptions
+    rows = conn.execute(
+        select(Medication.id, Medication.frequency, Medication.start_date, Medication.end_date,
+               Medication.next_dose_time).where(Medication.interval_minutes.is_(None), Medication.dose_times.is_(None))
+    ).all()
+    if not rows:
+        return
+
+    updates = []
+    for row in rows:
+        schedule = parse_frequency(row.frequency)
+        updates.append({
+            'b_id': row.id,
+            'interval_minutes': schedule.interval_minutes,
+            'dose_times': schedule.dose_times_text,
+            'is_prn': int(schedule.is_prn),
+            'end_date': row.end_date or (schedule.end_date(row.start_date) if row.start_date else None),
+            # PRN medications no longer get timed reminders
+            'next_dose_time': None if schedule.is_prn else row.next_dose_time
+        })
+    conn.execute(
+        update(Medication.__table__).where(Medication.__table__.c.id == bindparam('b_id')),
+        updates
+    )
+
+
+def _add_blood_pressure_columns(conn, batch_size: int = 5000):
+    from app.services.vitals import parse_blood_pressure
+
+    _add_column(conn, "vitals", "systolic_bp", "INTEGER")
+    _add_column(conn, "vitals", "diastolic_bp", "INTEGER")
+
+    # Backfill in keyset batches; unparseable strings are left as text only
+    vitals = Vitals.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(vitals.c.id, vitals.c.blood_pressure).where(
+                vitals.c.id > last_id,
+                vitals.c.blood_pressure.isnot(None),
+                vitals.c.systolic_bp.is_(None)
+            ).order_by(vitals.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            try:
+                systolic, diastolic = parse_blood_pressure(row.blood_pressure)
+            except ValueError:
+                continue
+            if systolic is not None:
+                updates.append({'b_id': row.id, 'systolic_bp': systolic, 'diastolic_bp': diastolic})
+        if updates:
+            conn.execute(update(vitals).where(vitals.c.id == bindparam('b_id')), updates)
+
+
+def _backfill_patient_summaries(conn):
+    from sqlalchemy.orm import Session
+    from app.models.summary import PatientSummary
+    from app.services.summary_service import SummaryService
+
+    PatientSummary.__table__.create(conn, checkfirst=True)
+    with Session(bind=conn, autoflush=True) as db:
+        SummaryService.rebuild(db)
+
+
+def _add_reminder_claims(conn):
+    from app.models.lease import SchedulerLease
+
+    _add_column(conn, "medications", "claim_token", "VARCHAR")
+    _add_column(conn, "medications", "claimed_until", "TIMESTAMP")
+    SchedulerLease.__table__.create(conn, checkfirst=True)
+
+
+# (version, name, function) - append only, never reorder
+MIGRATIONS = [
+    (1, "add hot-path composite indexes", _add_hot_path_indexes),
+    (2, "add appointments.is_cancelled", _add_appointment_cancellation),
+    (3, "add structured medication schedule", _add_medication_schedule),
+    (4, "add vitals.systolic_bp and vitals.diastolic_bp", _add_blood_pressure_columns),
+    (5, "backfill patient_summaries", _backfill_patient_summaries),
+    (6, "add medication reminder claims and scheduler_leases", _add_reminder_claims),
+]
+
+
+@contextmanager
+def migration_lock(engine=default_engine):
+    """
+    A connection in a transaction holding the database-wide migration lock
+    until it commits: a transaction-scoped advisory lock on Postgres, the
+    write lock (BEGIN IMMEDIATE) on SQLite. Workers starting together take
+    turns instead of running the same DDL at once.
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_KEY})")
+        elif conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+
+
+def _applied(conn) -> set:
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return {row.version for row in conn.execute(schema_migrations.select())}
+
+
+def applied_versions(engine=default_engine) -> set:
+    """Versions already applied to this database"""
+    with engine.connect() as conn:
+        return _applied(conn)
+
+
+def run_migrations(engine=default_engine) -> list:
+    """Apply pending migrations, returning the versions that were applied"""
+    with migration_lock(engine) as conn:
+        _metadata.create_all(bind=conn)
+    done = applied_versions(engine)
+    applied = []
+
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+
+        try:
+            with migration_lock(engine) as conn:
+                # Another worker may have applied it while we waited
+                if version in _applied(conn):
+                    continue
+                migrate(conn)
+                conn.execute(schema_migrations.insert().values(version=version, name=name))
+        except IntegrityError:
+            # Another worker applied it first (databases without a lock)
+            continue
+
+        logger.info("Applied migration", extra={"fields": {"version": version, "migration": name}})
+        applied.append(version)
+
+    return applied
+
+
+def init_db(engine=default_engine) -> list:
+    """
+    Create missing tables and apply pending migrations. Idempotent; run at
+    startup (DB_MIGRATE_ON_STARTUP) or ahead of a deploy with
+    `python -m app.migrations`.
+    """
+    import app.models  # register every table on Base.metadata
+
+    with migration_lock(engine) as conn:
+        Base.metadata.create_all(bind=conn)
+    return run_migrations(engine)
+
+
+if __name__ == "__main__":
+    from app.utils.log import setup_logging, shutdown_logging
+
+    setup_logging()
+    applied = init_db()
+    logger.info("Database schema up to date", extra={"fields": {"applied": applied}})
+    shutdown_logging()
@@ -1 +1,4 @@
-from app.models.patient import Patient, Vitals, Diagnosis, Medication, Appointment
\ No newline at end of file
+from app.models.patient import Patient, Vitals, Diagnosis, Medication, Appointment, AppointmentReminder
+from app.models.sequence import IdSequence
+from app.models.summary import PatientSummary
+from app.models.lease import SchedulerLease
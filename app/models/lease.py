@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, DateTime
+from app.database import Base
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String, primary_key=True)  # e.g., "reminder_sweeps"
+    owner = Column(String)  # worker currently holding the lease
+    expires_at = Column(DateTime)  # renewed by the holder; free once passed
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -27,7 +27,9 @@ class Vitals(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
-    blood_pressure = Column(String)  # e.g., "120/80"
+    blood_pressure = Column(String)  # e.g., "120/80", kept as entered for display
+    systolic_bp = Column(Integer)  # parsed from blood_pressure
+    diastolic_bp = Column(Integer)
     temperature = Column(Float)  # Celsius
     pulse = Column(Integer)  # BPM
     respiratory_rate = Column(Integer)
@@ -36,6 +38,10 @@ class Vitals(Base):
     notes = Column(Text)
     
     patient = relationship("Patient", back_populates="vitals")
+    
+    __table_args__ = (
+        Index("ix_vitals_patient_recorded", "patient_id", "recorded_at"),
+    )
 
 
 class Diagnosis(Base):
@@ -48,6 +54,10 @@ class Diagnosis(Base):
     diagnosed_at = Column(DateTime, default=datetime.utcnow)
     
     patient = relationship("Patient", back_populates="diagnoses")
+    
+    __table_args__ = (
+        Index("ix_diagnoses_patient_diagnosed", "patient_id", "diagnosed_at"),
+    )
 
 
 class Medication(Base):
@@ -58,14 +68,26 @@ class Medication(Base):
     medication_name = Column(String, nullable=False)
     dosage = Column(String)  # e.g., "500mg"
     frequency = Column(String)  # e.g., "twice daily", "every 6 hours"
+    # Structured schedule parsed from frequency at prescription time
+    interval_minutes = Column(Integer)  # e.g., 720 for "twice daily"
+    dose_times = Column(String)  # fixed ward-time (WARD_TIMEZONE) clock times, e.g., "08:00,20:00"
+    is_prn = Column(Integer, default=0)  # 1 = as needed, no reminders
     route = Column(String)  # e.g., "oral", "IV", "injection"
     start_date = Column(DateTime, default=datetime.utcnow)
     end_date = Column(DateTime)
     next_dose_time = Column(DateTime)
     is_active = Column(Integer, default=1)  # 1 = active, 0 = completed
     notes = Column(Text)
+    # Reminder worker holding the due dose, and when its claim lapses
+    claim_token = Column(String)
+    claimed_until = Column(DateTime)
     
     patient = relationship("Patient", back_populates="medications")
+    
+    __table_args__ = (
+        Index("ix_medications_active_next_dose", "is_active", "next_dose_time"),  # reminder sweep
+        Index("ix_medications_patient_active", "patient_id", "is_active"),
+    )
 
 
 class Appointment(Base):
@@ -77,6 +99,29 @@ class Appointment(Base):
     appointment_datetime = Column(DateTime, nullable=False)
     notes = Column(Text)
     is_completed = Column(Integer, default=0)
+    is_cancelled = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    patient = relationship("Patient", back_populates="appointments")
\ No newline at end of file
+    patient = relationship("Patient", back_populates="appointments")
+    reminders = relationship("AppointmentReminder", back_populates="appointment", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_appointments_completed_datetime", "is_completed", "appointment_datetime"),  # reminder sweep
+        Index("ix_appointments_patient_datetime", "patient_id", "appointment_datetime"),
+    )
+
+
+class AppointmentReminder(Base):
+    __tablename__ = "appointment_reminders"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
+    lead_minutes = Column(Integer, nullable=False)  # e.g., 1440 = 24h before, 60 = 1h before
+    sent_at = Column(DateTime, default=datetime.utcnow)
+    
+    appointment = relationship("Appointment", back_populates="reminders")
+    
+    __table_args__ = (
+        # One delivery per appointment and lead time; also serves the sweep's NOT EXISTS lookup
+        UniqueConstraint("appointment_id", "lead_minutes", name="uq_appointment_reminders_lead"),
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
 
@@ -34,6 +34,8 @@ class VitalsCreate(BaseModel):
 class VitalsResponse(BaseModel):
     id: int
     blood_pressure: Optional[str]
+    systolic_bp: Optional[int] = None
+    diastolic_bp: Optional[int] = None
     temperature: Optional[float]
     pulse: Optional[int]
     respiratory_rate: Optional[int]
@@ -102,4 +104,73 @@ class TelexMessage(BaseModel):
     message: str
     user_id: str
     channel_id: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+# Intent payload schemas: what parse_intent extracts for each intent.
+# Every field is optional since the nurse may leave things out; unknown
+# keys in an LLM reply are dropped.
+class RegisterPatientData(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    phone: Optional[str] = None
+
+class RecordVitalsData(BaseModel):
+    patient_id: Optional[str] = None
+    blood_pressure: Optional[str] = None
+    temperature: Optional[float] = None
+    pulse: Optional[int] = None
+    respiratory_rate: Optional[int] = None
+    oxygen_saturation: Optional[float] = None
+
+class AddDiagnosisData(BaseModel):
+    patient_id: Optional[str] = None
+    doctor_name: Optional[str] = None
+    diagnosis: Optional[str] = None
+    notes: Optional[str] = None
+
+class PrescribeMedicationData(BaseModel):
+    patient_id: Optional[str] = None
+    medication_name: Optional[str] = None
+    dosage: Optional[str] = None
+    frequency: Optional[str] = None
+    route: Optional[str] = None
+
+class ScheduleAppointmentData(BaseModel):
+    patient_id: Optional[str] = None
+    appointment_type: Optional[str] = None
+    time: Optional[str] = None
+    notes: Optional[str] = None
+
+class PatientRefData(BaseModel):
+    patient_id: Optional[str] = None
+
+class EmptyData(BaseModel):
+    pass
+
+INTENT_PAYLOADS = {
+    "register_patient": RegisterPatientData,
+    "record_vitals": RecordVitalsData,
+    "add_diagnosis": AddDiagnosisData,
+    "prescribe_medication": PrescribeMedicationData,
+    "schedule_appointment": ScheduleAppointmentData,
+    "query_patient": PatientRefData,
+    "vitals_trend": PatientRefData,
+    "list_reminders": EmptyData,
+    "unknown": EmptyData,
+}
+
+class IntentResult(BaseModel):
+    intent: str
+    data: dict = Field(default_factory=dict)
+
+    @field_validator("intent")
+    @classmethod
+    def known_intent(cls, value: str) -> str:
+        if value not in INTENT_PAYLOADS:
+            raise ValueError(f"must be one of {', '.join(INTENT_PAYLOADS)}")
+        return value
+
+    def payload(self) -> dict:
+        """`data` validated against the intent's payload schema, without unset fields"""
+        return INTENT_PAYLOADS[self.intent].model_validate(self.data).model_dump(exclude_none=True)
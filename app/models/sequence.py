@@ -0,0 +1,8 @@
+from sqlalchemy import Column, String, BigInteger
+from app.database import Base
+
+class IdSequence(Base):
+    __tablename__ = "id_sequences"
+    
+    name = Column(String, primary_key=True)  # e.g., "patient_id"
+    next_value = Column(BigInteger, nullable=False)  # first value not yet leased to any worker
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database import Base
+
+class PatientSummary(Base):
+    """
+    One row per patient for the ward dashboard, kept up to date in the
+    same transaction as each vitals, medication or appointment write.
+    """
+    __tablename__ = "patient_summaries"
+
+    patient_id = Column(Integer, ForeignKey("patients.id"), primary_key=True)
+
+    # Latest vitals
+    last_vitals_at = Column(DateTime)
+    blood_pressure = Column(String)
+    systolic_bp = Column(Integer)
+    diastolic_bp = Column(Integer)
+    temperature = Column(Float)
+    pulse = Column(Integer)
+    respiratory_rate = Column(Integer)
+    oxygen_saturation = Column(Float)
+
+    # Medications
+    active_medications = Column(Integer, default=0)
+    next_dose_time = Column(DateTime)
+    next_dose_medication = Column(String)
+
+    # Appointments
+    next_appointment_at = Column(DateTime)
+    next_appointment_type = Column(String)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_patient_summaries_next_dose", "next_dose_time"),  # dashboard sorted by next dose
+        Index("ix_patient_summaries_next_appointment", "next_appointment_at"),  # refreshing passed appointments
+    )
@@ -1,30 +1,171 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, pool_monitor
+from app.services import ai_service
 from app.services.ai_service import AIAgent
 from app.services.patient_service import PatientService
+from app.services.summary_service import SummaryService
+from app.services.vitals import normalize_vitals, VitalsValidationError
+from app.services.frequency import parse_frequency
+from app.services.intent_rules import intent_rules
+from app.services.intent_cache import intent_cache
+from app.services.telex_service import telex_service
 from app.models.schemas import TelexMessage
+from app.utils.concurrency import run_blocking
+from app.utils.metrics import observe, message_seconds
+from app.utils.log import get_logger
+from app.utils.timeparse import parse_datetime
+from app.utils.ward_time import to_ward_time
 from datetime import datetime, timedelta
-import dateparser
+from typing import List, Optional
+import asyncio
+import os
+import re
+import time
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/agent", tags=["Agent"])
 
+logger = get_logger(__name__)
+
 class MessageRequest(BaseModel):
     message: str
     user_id: str
 
+# Intents that can be written in bulk by the batch endpoint
+CHARTING_INTENTS = {"record_vitals", "add_diagnosis", "prescribe_medication"}
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+
+class BatchMessageRequest(BaseModel):
+    messages: List[str] = []
+    message: Optional[str] = None  # one multi-patient message, split per line or ";"
+    user_id: str
+
+def charting_response(intent: str, patient_id: str, row) -> dict:
+    """Response data for a vitals, diagnosis or medication row"""
+    if intent == "record_vitals":
+        return {
+            'patient_id': patient_id,
+            'vitals': {
+                'blood_pressure': row.blood_pressure,
+                'systolic_bp': row.systolic_bp,
+                'diastolic_bp': row.diastolic_bp,
+                'temperature': row.temperature,
+                'pulse': row.pulse,
+                'respiratory_rate': row.respiratory_rate,
+                'oxygen_saturation': row.oxygen_saturation
+            }
+        }
+    if intent == "add_diagnosis":
+        return {
+            'patient_id': patient_id,
+            'doctor_name': row.doctor_name,
+            'diagnosis': row.diagnosis
+        }
+    return {
+        'patient_id': patient_id,
+        'medication_name': row.medication_name,
+        'dosage': row.dosage,
+        'frequency': row.frequency,
+        'frequency_recognised': parse_frequency(row.frequency).recognised
+    }
+
+def split_handover_message(text: str) -> list:
+    """Split a pasted handover list into one message per line or ';'"""
+    return [part.strip() for part in re.split(r"[;\n]+", text) if part.strip()]
+
+def handle_intent(db: Session, intent: str, data_dict: dict):
+    """
+    Execute the DB work for an intent (blocking, run in the worker pool)
+    """
+    success = False
+    response_data = {}
+    
+    # Handle different intents
+    if intent == "register_patient":
+        patient = PatientService.create_patient(db, data_dict)
+        if patient:
+            success = True
+            response_data = {
+                'patient_id': patient.patient_id,
+                'name': patient.name
+            }
+    
+    elif intent == "record_vitals":
+        try:
+            vitals = PatientService.record_vitals(db, data_dict)
+        except VitalsValidationError as e:
+            return False, {'patient_id': data_dict.get('patient_id'), 'error': f"Vitals not recorded: {e}."}
+        if vitals:
+            success = True
+            response_data = charting_response(intent, data_dict.get('patient_id'), vitals)
+    
+    elif intent == "add_diagnosis":
+        diagnosis = PatientService.add_diagnosis(db, data_dict)
+        if diagnosis:
+            success = True
+            response_data = charting_response(intent, data_dict.get('patient_id'), diagnosis)
+    
+    elif intent == "prescribe_medication":
+        medication = PatientService.prescribe_medication(db, data_dict)
+        if medication:
+            success = True
+            response_data = charting_response(intent, data_dict.get('patient_id'), medication)
+    
+    elif intent == "schedule_appointment":
+        # Parse the time string into datetime
+        time_str = data_dict.get('time', '')
+        appointment_dt = parse_datetime(time_str)
+        
+        if not appointment_dt:
+            appointment_dt = datetime.utcnow() + timedelta(days=1)
+        
+        data_dict['appointment_datetime'] = appointment_dt
+        appointment = PatientService.schedule_appointment(db, data_dict)
+        
+        if appointment:
+            success = True
+            response_data = {
+                'patient_id': data_dict.get('patient_id'),
+                'appointment_type': appointment.appointment_type,
+                'appointment_datetime': to_ward_time(appointment.appointment_datetime).strftime('%B %d, %Y at %I:%M %p')
+            }
+    
+    elif intent == "query_patient":
+        patient_record = PatientService.get_patient_full_record(db, data_dict.get('patient_id'))
+        if patient_record:
+            success = True
+            response_data = patient_record
+    
+    elif intent == "vitals_trend":
+        if data_dict.get('patient_id'):
+            trend = PatientService.get_vitals_trend(db, data_dict['patient_id'])
+            if trend:
+                success = True
+                response_data = trend
+        else:
+            success = True
+            response_data = {'patients': PatientService.get_ward_scores(db, limit=10)}
+    
+    elif intent == "unknown" and data_dict.get('unavailable'):
+        response_data = {'error': "AI temporarily unavailable, so nothing was recorded. Please rephrase or retry in a minute."}
+    
+    return success, response_data
+
 @router.post("/message")
 async def process_message(data: MessageRequest, db: Session = Depends(get_db)):
     """
     Process incoming messages from Telex
     """
+    started = time.perf_counter()
+    intent = None
     try:
         message = data.message.strip()
         user_id = data.user_id
         
-        # Log incoming request
-        print(f"📨 Received message from {user_id}: {message}")
+        # Log incoming request (the text itself is PHI and is redacted)
+        logger.info("Received message", extra={"fields": {"user_id": user_id, "length": len(message), "message": message}})
         
         if not message:
             return {
@@ -35,92 +176,25 @@ async def process_message(data: MessageRequest, db: Session = Depends(get_db)):
             }
         
         # Parse intent using AI
-        parsed = AIAgent.parse_intent(message)
+        parsed = await AIAgent.parse_intent_async(message)
         intent = parsed.get('intent')
         data_dict = parsed.get('data', {})
         
-        print(f"🎯 Detected intent: {intent}")
-        print(f"📋 Extracted data: {data_dict}")
-        
-        response_text = ""
-        success = False
-        response_data = {}
-        
-        # Handle different intents
-        if intent == "register_patient":
-            patient = PatientService.create_patient(db, data_dict)
-            if patient:
-                success = True
-                response_data = {
-                    'patient_id': patient.patient_id,
-                    'name': patient.name
-                }
+        logger.info("Detected intent", extra={"fields": {"intent": intent, "patient_id": data_dict.get('patient_id')}})
+        logger.debug("Extracted data", extra={"fields": {"keys": sorted(data_dict)}})
         
-        elif intent == "record_vitals":
-            vitals = PatientService.record_vitals(db, data_dict)
-            if vitals:
-                success = True
-                response_data = {
-                    'patient_id': data_dict.get('patient_id'),
-                    'vitals': {
-                        'blood_pressure': vitals.blood_pressure,
-                        'temperature': vitals.temperature,
-                        'pulse': vitals.pulse,
-                        'respiratory_rate': vitals.respiratory_rate,
-                        'oxygen_saturation': vitals.oxygen_saturation
-                    }
-                }
-        
-        elif intent == "add_diagnosis":
-            diagnosis = PatientService.add_diagnosis(db, data_dict)
-            if diagnosis:
-                success = True
-                response_data = {
-                    'patient_id': data_dict.get('patient_id'),
-                    'doctor_name': diagnosis.doctor_name,
-                    'diagnosis': diagnosis.diagnosis
-                }
-        
-        elif intent == "prescribe_medication":
-            medication = PatientService.prescribe_medication(db, data_dict)
-            if medication:
-                success = True
-                response_data = {
-                    'patient_id': data_dict.get('patient_id'),
-                    'medication_name': medication.medication_name,
-                    'dosage': medication.dosage,
-                    'frequency': medication.frequency
-                }
-        
-        elif intent == "schedule_appointment":
-            # Parse the time string into datetime
-            time_str = data_dict.get('time', '')
-            appointment_dt = dateparser.parse(time_str)
-            
-            if not appointment_dt:
-                appointment_dt = datetime.utcnow() + timedelta(days=1)
-            
-            data_dict['appointment_datetime'] = appointment_dt
-            appointment = PatientService.schedule_appointment(db, data_dict)
-            
-            if appointment:
-                success = True
-                response_data = {
-                    'patient_id': data_dict.get('patient_id'),
-                    'appointment_type': appointment.appointment_type,
-                    'appointment_datetime': appointment.appointment_datetime.strftime('%B %d, %Y at %I:%M %p')
-                }
-        
-        elif intent == "query_patient":
-            patient_record = PatientService.get_patient_full_record(db, data_dict.get('patient_id'))
-            if patient_record:
-                success = True
-                response_data = patient_record
+        # Run DB work off the event loop
+        success, response_data = await run_blocking(handle_intent, db, intent, data_dict)
         
         # Generate natural language response
         response_text = AIAgent.generate_response(intent, success, response_data)
         
-        print(f"✅ Response generated: {response_text[:100]}...")
+        elapsed = time.perf_counter() - started
+        logger.info("Response generated", extra={"fields": {
+            "intent": intent, "success": success, "duration_ms": round(elapsed * 1000, 1)
+        }})
+        
+        observe(message_seconds, elapsed, intent=intent, success=success)
         
         # Return in multiple formats for compatibility with different systems
         return {
@@ -137,9 +211,8 @@ async def process_message(data: MessageRequest, db: Session = Depends(get_db)):
     
     except Exception as e:
         error_msg = "Sorry, I encountered an error. Please try again."
-        print(f"❌ Error processing message: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing message")
+        observe(message_seconds, time.perf_counter() - started, intent=intent or "unknown", success="error")
         
         return {
             "response": error_msg,
@@ -151,11 +224,146 @@ async def process_message(data: MessageRequest, db: Session = Depends(get_db)):
             "timestamp": datetime.utcnow().isoformat()
         }
 
+def handle_batch(db: Session, parsed: list) -> list:
+    """
+    Execute the DB work for a batch of parsed messages (blocking).
+    Charting intents are bulk-inserted in one transaction; anything
+    else goes through the regular single-message path, which commits per
+    message, so a failure there fails only that message.
+    """
+    results = [None] * len(parsed)
+    
+    charting = []
+    for i, p in enumerate(parsed):
+        if p.get('intent') not in CHARTING_INTENTS:
+            continue
+        if p['intent'] == "record_vitals":
+            # Reject bad vitals per message instead of failing the whole batch
+            try:
+                normalize_vitals(p.get('data', {}))
+            except VitalsValidationError as e:
+                results[i] = (False, {'patient_id': p.get('data', {}).get('patient_id'), 'error': f"Vitals not recorded: {e}."})
+                continue
+        charting.append((i, p))
+    if charting:
+        rows = PatientService.chart_batch(db, [(p['intent'], p.get('data', {})) for _, p in charting])
+        for (i, p), row in zip(charting, rows):
+            patient_id = p.get('data', {}).get('patient_id')
+            results[i] = (True, charting_response(p['intent'], patient_id, row)) if row else (False, {})
+    
+    for i, p in enumerate(parsed):
+        if results[i] is None:
+            try:
+                results[i] = handle_intent(db, p.get('intent'), p.get('data', {}))
+            except Exception:
+                # The charting rows and earlier messages are already saved
+                db.rollback()
+                logger.exception("Error processing batch message", extra={"fields": {"index": i, "intent": p.get('intent')}})
+                results[i] = (False, {'error': "Not recorded because of an error. Please send it again on its own."})
+    
+    return results
+
+@router.post("/messages/batch")
+async def process_batch(data: BatchMessageRequest, db: Session = Depends(get_db)):
+    """
+    Process many messages at once, e.g. a ward's vitals at shift handover.
+    Messages are parsed concurrently and charted in a single transaction.
+    """
+    messages = [m.strip() for m in data.messages if m.strip()]
+    if data.message:
+        messages += split_handover_message(data.message)
+    
+    if not messages:
+        raise HTTPException(status_code=400, detail="Please provide at least one message.")
+    if len(messages) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} messages per batch.")
+    
+    # Parsing is bounded by the shared LLM concurrency limit
+    parsed = await asyncio.gather(*[AIAgent.parse_intent_async(m) for m in messages])
+    
+    try:
+        outcomes = await run_blocking(handle_batch, db, parsed)
+    except Exception as e:
+        # Only the charting transaction, which runs first, can fail the batch
+        logger.exception("Error processing batch", extra={"fields": {"messages": len(messages)}})
+        raise HTTPException(status_code=500, detail="Sorry, I couldn't save this batch. Nothing was recorded.")
+    
+    results = []
+    for index, (message, p, (success, response_data)) in enumerate(zip(messages, parsed, outcomes)):
+        results.append({
+            "index": index,
+            "message": message,
+            "intent": p.get('intent'),
+            "success": success,
+            "response": AIAgent.generate_response(p.get('intent'), success, response_data),
+            "data": response_data
+        })
+    
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+        "user_id": data.user_id,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/patients/{patient_id}/history/{section}")
+async def patient_history(patient_id: str, section: str, limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
+    """
+    Paginated full history for one record section
+    (vitals, diagnoses, medications or appointments)
+    """
+    try:
+        history = await run_blocking(PatientService.get_patient_history, db, patient_id.upper(), section, limit, max(offset, 0))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not history:
+        raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
+    return history
+
+@router.get("/patients/{patient_id}/trend")
+async def patient_trend(patient_id: str, db: Session = Depends(get_db)):
+    """Rolling means, slopes and NEWS2 early-warning score from recent vitals"""
+    trend = await run_blocking(PatientService.get_vitals_trend, db, patient_id.upper())
+    if not trend:
+        raise HTTPException(status_code=404, detail=f"No recent vitals for patient {patient_id}")
+    return trend
+
+@router.get("/ward/early-warning")
+async def ward_early_warning(limit: int = 20, min_score: int = 0, db: Session = Depends(get_db)):
+    """Patients with recent vitals ranked by NEWS2 score, highest first"""
+    patients = await run_blocking(PatientService.get_ward_scores, db, limit, min_score)
+    return {
+        'patients': patients,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+@router.get("/ward/dashboard")
+async def ward_dashboard(limit: int = 50, offset: int = 0, sort: str = 'patient', db: Session = Depends(get_db)):
+    """
+    Ward at a glance: latest vitals, active medication count, next due dose
+    and next appointment per patient (sort: patient, next_dose, next_appointment)
+    """
+    try:
+        dashboard = await run_blocking(SummaryService.get_dashboard, db, limit, max(offset, 0), sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    dashboard['timestamp'] = datetime.utcnow().isoformat()
+    return dashboard
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "service": "Nurse ETR Assistant",
+        "intent_rules": intent_rules.stats(),
+        "intent_cache": intent_cache.stats(),
+        "llm_backend": ai_service.backend.stats(),
+        "outbound": telex_service.stats(),
+        "db_pool": pool_monitor.stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
\ No newline at end of file
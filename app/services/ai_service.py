@@ -1,58 +1,313 @@
-import google.generativeai as genai
 import os
+import functools
 import json
-import re
+import typing
 from dotenv import load_dotenv
+from pydantic import ValidationError
+from app.models.schemas import INTENT_PAYLOADS, IntentResult
+from app.services.intent_rules import intent_rules, likely_intents
+from app.services.intent_cache import intent_cache
+from app.services.llm_backend import IntentBackend, GeminiBackend, LocalBackend, ResilientBackend, LLM_BACKEND
+from app.utils.concurrency import llm_slot, run_blocking
+from app.utils.metrics import timer, timed, inc, observe, intent_parse_total, llm_decode_total, llm_tokens
+from app.utils.log import get_logger
 
 load_dotenv()
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.5-flash')
+logger = get_logger(__name__)
+
+# Few-shot examples sent with a message (at most this many, within this
+# many estimated tokens), chosen by a local keyword pre-classifier
+PROMPT_MAX_EXAMPLES = int(os.getenv("PROMPT_MAX_EXAMPLES", "2"))
+PROMPT_EXAMPLE_TOKEN_BUDGET = int(os.getenv("PROMPT_EXAMPLE_TOKEN_BUDGET", "120"))
+
+INTENTS = list(INTENT_PAYLOADS)
+
+# Static instructions, set once on the model as the system instruction
+# rather than formatted into every request prompt
+SYSTEM_INSTRUCTION = f"""You are a healthcare assistant AI. Analyze the nurse's message and extract structured information.
+
+Return a JSON object with:
+- intent: one of {json.dumps(INTENTS)}
+- data: extracted relevant information based on intent
+
+Data fields per intent:
+- register_patient: name, age, gender, phone
+- record_vitals: patient_id, blood_pressure ("120/80"), temperature, pulse, respiratory_rate, oxygen_saturation
+- add_diagnosis: patient_id, doctor_name, diagnosis, notes
+- prescribe_medication: patient_id, medication_name, dosage, frequency, route
+- schedule_appointment: patient_id, appointment_type, time (as written), notes
+- query_patient: patient_id
+- vitals_trend: patient_id, or {{}} for the whole ward
+- list_reminders, unknown: {{}}
+
+Patient IDs look like PT10001 (older patients have four digits, like PT1234). Leave out fields the message doesn't mention."""
+
+FEW_SHOT_EXAMPLES = {
+    "register_patient": [
+        ("New patient John Doe, 45 years old, male",
+         {"intent": "register_patient", "data": {"name": "John Doe", "age": 45, "gender": "male"}}),
+    ],
+    "record_vitals": [
+        ("Record vitals for PT10001: BP 120/80, temp 37.2, pulse 75",
+         {"intent": "record_vitals", "data": {"patient_id": "PT10001", "blood_pressure": "120/80", "temperature": 37.2, "pulse": 75}}),
+    ],
+    "add_diagnosis": [
+        ("Dr Smith diagnosed PT10001 with hypertension",
+         {"intent": "add_diagnosis", "data": {"patient_id": "PT10001", "doctor_name": "Dr Smith", "diagnosis": "hypertension"}}),
+    ],
+    "prescribe_medication": [
+        ("Prescribe amoxicillin 500mg three times daily for PT10001",
+         {"intent": "prescribe_medication", "data": {"patient_id": "PT10001", "medication_name": "amoxicillin", "dosage": "500mg", "frequency": "three times daily"}}),
+    ],
+    "schedule_appointment": [
+        ("Schedule follow-up for PT10001 tomorrow at 2pm",
+         {"intent": "schedule_appointment", "data": {"patient_id": "PT10001", "appointment_type": "follow-up", "time": "tomorrow at 2pm"}}),
+    ],
+    "query_patient": [
+        ("Show me PT10001's records", {"intent": "query_patient", "data": {"patient_id": "PT10001"}}),
+    ],
+    "vitals_trend": [
+        ("How are PT10001's vitals trending?", {"intent": "vitals_trend", "data": {"patient_id": "PT10001"}}),
+        ("Who on the ward is deteriorating?", {"intent": "vitals_trend", "data": {}}),
+    ],
+}
+
+_SCHEMA_TYPES = {str: "STRING", int: "INTEGER", float: "NUMBER"}
+
+
+def build_response_schema() -> dict:
+    """
+    Gemini response schema for the intent reply: the intent enum plus the
+    union of every payload's fields (Gemini schemas have no oneOf, so the
+    per-intent shape is enforced when the reply is validated)
+    """
+    properties = {}
+    for payload in INTENT_PAYLOADS.values():
+        for name, field in payload.model_fields.items():
+            types = [t for t in typing.get_args(field.annotation) if t is not type(None)] or [field.annotation]
+            properties.setdefault(name, {"type": _SCHEMA_TYPES[types[0]]})
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "intent": {"type": "STRING", "enum": INTENTS},
+            "data": {"type": "OBJECT", "properties": properties},
+        },
+        "required": ["intent", "data"],
+    }
+
+
+def build_backend(name: str = LLM_BACKEND) -> IntentBackend:
+    """
+    The backend parse_intent calls: Gemini in JSON mode constrained to the
+    intent schema, guarded by the local rule-based backend, or the local
+    backend on its own
+    """
+    local = LocalBackend()
+    if name == "local":
+        return local
+    gemini = GeminiBackend(
+        'gemini-2.5-flash',
+        system_instruction=SYSTEM_INSTRUCTION,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": build_response_schema(),
+        },
+    )
+    return ResilientBackend(gemini, fallback=local)
+
+
+backend = build_backend()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting the prompt"""
+    return len(text) // 4 + 1
+
+
+@functools.lru_cache(maxsize=None)
+def _example_line(intent: str, index: int) -> str:
+    message, result = FEW_SHOT_EXAMPLES[intent][index]
+    return f'"{message}" → {json.dumps(result)}'
+
 
 class AIAgent:
     
     @staticmethod
+    def select_examples(message: str) -> list:
+        """
+        Few-shot example lines for the intents the message most likely
+        expresses, within PROMPT_MAX_EXAMPLES and the token budget
+        """
+        lines, used = [], 0
+        for intent in likely_intents(message, limit=PROMPT_MAX_EXAMPLES):
+            for index in range(len(FEW_SHOT_EXAMPLES.get(intent, ()))):
+                line = _example_line(intent, index)
+                cost = estimate_tokens(line)
+                if len(lines) >= PROMPT_MAX_EXAMPLES or used + cost > PROMPT_EXAMPLE_TOKEN_BUDGET:
+                    return lines
+                lines.append(line)
+                used += cost
+        return lines
+    
+    @staticmethod
+    def build_prompt(message: str) -> str:
+        """
+        Build the per-message part of the prompt (the instructions are
+        in SYSTEM_INSTRUCTION)
+        """
+        examples = AIAgent.select_examples(message)
+        prompt = ""
+        if examples:
+            prompt = "Examples:\n" + "\n".join(examples) + "\n\n"
+        return prompt + f'Message: "{message}"\n'
+    
+    @staticmethod
+    def record_usage(response):
+        """Report the call's token counts (prompt, output)"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        counts = {
+            'prompt': getattr(usage, 'prompt_token_count', 0) or 0,
+            'output': getattr(usage, 'candidates_token_count', 0) or 0,
+        }
+        for kind, count in counts.items():
+            observe(llm_tokens, count, kind=kind)
+        logger.debug("LLM token usage", extra={"fields": {f"{kind}_tokens": count for kind, count in counts.items()}})
+    
+    @staticmethod
+    def build_repair_prompt(message: str, reply: str, error: str) -> str:
+        """Ask the model to fix a reply that didn't validate, once"""
+        return (
+            f"Your previous reply did not match the required schema ({error}).\n"
+            f"Previous reply: {reply[:500]}\n"
+            "Return the corrected JSON object for the message.\n\n"
+            f'Message: "{message}"\n'
+        )
+    
+    @staticmethod
+    def decode_response(result_text: str) -> dict:
+        """
+        Validate the model's JSON reply into an intent dict, with `data`
+        checked against that intent's payload schema. Raises ValidationError.
+        """
+        parsed = IntentResult.model_validate_json(result_text)
+        return {"intent": parsed.intent, "data": parsed.payload()}
+    
+    @staticmethod
+    def try_decode(result_text: str):
+        """(result, None) if the reply validates, else (None, short error description)"""
+        with timer("json_decode"):
+            try:
+                return AIAgent.decode_response(result_text), None
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc']) or 'reply'}: {err['msg']}" for err in e.errors()[:3]
+                )
+                return None, error
+    
+    @staticmethod
+    def finish_decode(result, repaired: bool, error: str, degraded: bool = False) -> dict:
+        """Record how the reply decoded; a reply that failed even after repair becomes unknown"""
+        if result is None:
+            logger.warning("AI reply failed validation after repair", extra={"fields": {"error": error}})
+            inc(llm_decode_total, outcome="failed")
+            inc(intent_parse_total, path="llm_invalid", intent="unknown")
+            return {"intent": "unknown", "data": {}}
+        inc(llm_decode_total, outcome="repaired" if repaired else "ok")
+        inc(intent_parse_total, path="fallback" if degraded else "llm", intent=result.get('intent'))
+        if degraded and result.get('intent') == "unknown":
+            # The fallback wasn't confident; tell the nurse instead of guessing
+            return {"intent": "unknown", "data": {"unavailable": True}}
+        return result
+    
+    @staticmethod
+    @timed("parse_intent")
     def parse_intent(message: str) -> dict:
         """
         Determine user intent and extract relevant information
         """
-        prompt = f"""
-You are a healthcare assistant AI. Analyze this nurse's message and extract structured information.
-
-Message: "{message}"
-
-Return a JSON object with:
-- intent: one of ["register_patient", "record_vitals", "add_diagnosis", "prescribe_medication", "schedule_appointment", "query_patient", "list_reminders", "unknown"]
-- data: extracted relevant information based on intent
-
-Examples:
-1. "New patient John Doe, 45 years old, male" → {{"intent": "register_patient", "data": {{"name": "John Doe", "age": 45, "gender": "male"}}}}
-2. "Record vitals for PT001: BP 120/80, temp 37.2, pulse 75" → {{"intent": "record_vitals", "data": {{"patient_id": "PT001", "blood_pressure": "120/80", "temperature": 37.2, "pulse": 75}}}}
-3. "Dr Smith diagnosed PT001 with hypertension" → {{"intent": "add_diagnosis", "data": {{"patient_id": "PT001", "doctor_name": "Dr Smith", "diagnosis": "hypertension"}}}}
-4. "Prescribe amoxicillin 500mg three times daily for PT001" → {{"intent": "prescribe_medication", "data": {{"patient_id": "PT001", "medication_name": "amoxicillin", "dosage": "500mg", "frequency": "three times daily"}}}}
-5. "Schedule follow-up for PT001 tomorrow at 2pm" → {{"intent": "schedule_appointment", "data": {{"patient_id": "PT001", "appointment_type": "follow-up", "time": "tomorrow at 2pm"}}}}
-6. "Show me PT001's records" → {{"intent": "query_patient", "data": {{"patient_id": "PT001"}}}}
-
-Return ONLY valid JSON, no explanation.
-"""
+        # Routine messages are handled by the rule-based fast path
+        fast_result = intent_rules.parse(message)
+        if fast_result:
+            inc(intent_parse_total, path="rules", intent=fast_result.get('intent'))
+            return fast_result
+        
+        # Repeated messages and Telex retries are served from the cache
+        cached = intent_cache.get(message)
+        if cached:
+            inc(intent_parse_total, path="cache", intent=cached.get('intent'))
+            return cached
         
         try:
-            response = model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Extract JSON from markdown code blocks if present
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', result_text, re.DOTALL)
-            if json_match:
-                result_text = json_match.group(1)
-            
-            result = json.loads(result_text)
-            return result
+            with timer("llm_call"):
+                response = backend.generate(AIAgent.build_prompt(message))
+            AIAgent.record_usage(response)
+            result, error = AIAgent.try_decode(response.text)
+            repaired = result is None
+            if repaired:
+                with timer("llm_repair"):
+                    response = backend.generate(AIAgent.build_repair_prompt(message, response.text, error))
+                AIAgent.record_usage(response)
+                result, error = AIAgent.try_decode(response.text)
+            # Answers from the degraded fallback path aren't worth caching
+            degraded = getattr(response, 'degraded', False)
+            if result is not None and not degraded:
+                intent_cache.set(message, result)
+            return AIAgent.finish_decode(result, repaired, error, degraded)
+        except Exception as e:
+            logger.warning("AI parsing error", extra={"fields": {"error": type(e).__name__}})
+            inc(intent_parse_total, path="llm_error", intent="unknown")
+            return {"intent": "unknown", "data": {}}
+    
+    @staticmethod
+    @timed("parse_intent")
+    async def parse_intent_async(message: str) -> dict:
+        """
+        Async variant of parse_intent that doesn't block the event loop
+        """
+        fast_result = intent_rules.parse(message)
+        if fast_result:
+            inc(intent_parse_total, path="rules", intent=fast_result.get('intent'))
+            return fast_result
+        
+        # A shared cache is a network round-trip, so keep it off the event loop
+        if intent_cache.backend.is_remote:
+            cached = await run_blocking(intent_cache.get, message)
+        else:
+            cached = intent_cache.get(message)
+        if cached:
+            inc(intent_parse_total, path="cache", intent=cached.get('intent'))
+            return cached
+        
+        try:
+            async with llm_slot():
+                with timer("llm_call"):
+                    response = await backend.generate_async(AIAgent.build_prompt(message))
+            AIAgent.record_usage(response)
+            result, error = AIAgent.try_decode(response.text)
+            repaired = result is None
+            if repaired:
+                async with llm_slot():
+                    with timer("llm_repair"):
+                        response = await backend.generate_async(AIAgent.build_repair_prompt(message, response.text, error))
+                AIAgent.record_usage(response)
+                result, error = AIAgent.try_decode(response.text)
+            degraded = getattr(response, 'degraded', False)
+            if result is not None and not degraded:
+                if intent_cache.backend.is_remote:
+                    await run_blocking(intent_cache.set, message, result)
+                else:
+                    intent_cache.set(message, result)
+            return AIAgent.finish_decode(result, repaired, error, degraded)
         except Exception as e:
-            print(f"AI parsing error: {e}")
+            logger.warning("AI parsing error", extra={"fields": {"error": type(e).__name__}})
+            inc(intent_parse_total, path="llm_error", intent="unknown")
             return {"intent": "unknown", "data": {}}
     
     @staticmethod
+    @timed("generate_response")
     def generate_response(intent: str, success: bool, data: dict = None) -> str:
         """
         Generate natural language responses
@@ -62,17 +317,22 @@ Return ONLY valid JSON, no explanation.
         
         elif intent == "record_vitals" and success:
             vitals = data.get('vitals', {})
-            vitals_text = "\n".join([f"• {k.replace('_', ' ').title()}: {v}" for k, v in vitals.items() if v])
+            vitals_text = "\n".join([
+                f"• {k.replace('_', ' ').title()}: {v}" for k, v in vitals.items() if v and k not in ('systolic_bp', 'diastolic_bp')
+            ])
             return f"✅ Vitals recorded for Patient {data.get('patient_id')}:\n\n{vitals_text}"
         
         elif intent == "add_diagnosis" and success:
             return f"✅ Diagnosis added for Patient {data.get('patient_id')}:\n\n**Doctor:** {data.get('doctor_name')}\n**Diagnosis:** {data.get('diagnosis')}"
         
         elif intent == "prescribe_medication" and success:
-            return f"✅ Medication prescribed for Patient {data.get('patient_id')}:\n\n**Medication:** {data.get('medication_name')}\n**Dosage:** {data.get('dosage')}\n**Frequency:** {data.get('frequency')}\n\n⏰ Reminders have been set automatically."
+            response = f"✅ Medication prescribed for Patient {data.get('patient_id')}:\n\n**Medication:** {data.get('medication_name')}\n**Dosage:** {data.get('dosage')}\n**Frequency:** {data.get('frequency')}\n\n"
+            if data.get('frequency_recognised') is False:
+                return response + "⚠️ I couldn't work out this frequency, so reminders will fire every 8 hours. Please re-prescribe with a clearer frequency (e.g. \"twice daily\" or \"every 12 hours\")."
+            return response + "⏰ Reminders have been set automatically."
         
         elif intent == "schedule_appointment" and success:
-            return f"✅ Appointment scheduled for Patient {data.get('patient_id')}:\n\n**Type:** {data.get('appointment_type')}\n**Date/Time:** {data.get('appointment_datetime')}\n\n📅 Reminder will be sent 24 hours before."
+            return f"✅ Appointment scheduled for Patient {data.get('patient_id')}:\n\n**Type:** {data.get('appointment_type')}\n**Date/Time:** {data.get('appointment_datetime')}\n\n📅 Reminders will be sent 24 hours and 1 hour before."
         
         elif intent == "query_patient" and success:
             patient = data.get('patient', {})
@@ -108,6 +368,31 @@ Return ONLY valid JSON, no explanation.
             
             return response
         
+        elif intent == "vitals_trend" and success and 'patients' in data:
+            patients = data.get('patients', [])
+            if not patients:
+                return "📈 No recent vitals on the ward to score."
+            response = "🚨 **Ward Early Warning (NEWS2)**\n\n"
+            for p in patients:
+                response += f"• {p['patient_id']}: {p['news2']['score']} ({p['news2']['risk']})\n"
+            return response
+        
+        elif intent == "vitals_trend" and success:
+            news2 = data.get('news2', {})
+            response = f"📈 **Vitals Trend: {data.get('patient_id')}**\n\n"
+            response += f"**NEWS2:** {news2.get('score')} ({news2.get('risk')} risk)\n"
+            response += f"**Readings:** {data.get('readings')}\n\n"
+            for name, value in data.get('latest', {}).items():
+                if value is None:
+                    continue
+                slope = data.get('slope_per_hour', {}).get(name)
+                direction = "" if slope is None else (" ↑" if slope > 0 else " ↓" if slope < 0 else " →")
+                response += f"• {name.replace('_', ' ').title()}: {value} (avg {data['mean'][name]}){direction}\n"
+            return response
+        
+        elif not success and data and data.get('error'):
+            return f"❌ {data['error']}"
+        
         elif not success:
             return f"❌ Sorry, I couldn't complete that action. Please check the patient ID and try again."
         
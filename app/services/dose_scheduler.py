@@ -0,0 +1,121 @@
+import heapq
+import threading
+from datetime import datetime
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bound on a single timer wait, so wall-clock jumps are picked up
+MAX_WAIT_SECONDS = 300
+
+
+class DoseScheduler:
+    """
+    In-memory min-heap of upcoming medication doses.
+
+    A single timer thread sleeps until the earliest next_dose_time and
+    then hands every due medication id to the `on_due` callback. Nothing
+    touches the DB while no dose is due. Rescheduling a medication just
+    pushes a new entry; the superseded one is skipped when it surfaces.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due_time, medication_id)
+        self._due = {}  # medication_id -> currently scheduled due_time
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.on_due = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, medication_id: int, due_time: datetime):
+        """Add or move a medication's next dose"""
+        if not self._running or due_time is None:
+            # Not running in this process; the startup rebuild picks it up
+            return
+        with self._cond:
+            self._due[medication_id] = due_time
+            heapq.heappush(self._heap, (due_time, medication_id))
+            if self._heap[0][1] == medication_id:
+                self._cond.notify()
+
+    def cancel(self, medication_id: int):
+        """Stop reminders for a medication"""
+        with self._cond:
+            self._due.pop(medication_id, None)
+
+    def load(self, entries):
+        """Replace the schedule with (medication_id, due_time) pairs from the DB"""
+        with self._cond:
+            self._due = {med_id: due for med_id, due in entries if due is not None}
+            self._heap = [(due, med_id) for med_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def next_due(self):
+        """Earliest scheduled dose time, if any"""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def start(self, on_due):
+        """Start the timer thread; on_due receives a list of due medication ids"""
+        self.on_due = on_due
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="dose-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self):
+        """Block until doses are due (or stopped) and return their ids"""
+        with self._cond:
+            while self._running:
+                self._drop_stale()
+                if not self._heap:
+                    self._cond.wait(MAX_WAIT_SECONDS)
+                    continue
+
+                wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                if wait > 0:
+                    self._cond.wait(min(wait, MAX_WAIT_SECONDS))
+                    continue
+
+                now = datetime.utcnow()
+                due_ids = []
+                while self._heap and self._heap[0][0] <= now:
+                    due_time, med_id = heapq.heappop(self._heap)
+                    if self._due.get(med_id) == due_time:
+                        del self._due[med_id]
+                        due_ids.append(med_id)
+                if due_ids:
+                    return due_ids
+            return None
+
+    def _run(self):
+        while True:
+            due_ids = self._pop_due()
+            if due_ids is None:
+                return
+            try:
+                self.on_due(due_ids)
+            except Exception as e:
+                logger.exception("Error firing dose reminders", extra={"fields": {"medications": len(due_ids)}})
+
+
+dose_scheduler = DoseScheduler()
@@ -0,0 +1,257 @@
+"""
+Medication frequency parsing and dose-time arithmetic.
+
+A prescription's free-text frequency ("twice daily", "q6h", "8am and
+8pm", "prn", "tds for 5 days") is parsed once, when the medication is
+prescribed, into a DoseSchedule whose fields are stored on the
+Medication row. Working out the next dose after that is plain datetime
+arithmetic. Fixed clock times ("8am and 8pm", "at night") are wall-clock
+times on the ward, in WARD_TIMEZONE; the dose timestamps worked out from
+them are stored in UTC like every other timestamp.
+"""
+import bisect
+import functools
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from app.utils.ward_time import to_ward_time, from_ward_time
+
+# Used when the frequency can't be understood (the old behaviour); such
+# schedules are marked recognised=False so the nurse can be told
+DEFAULT_INTERVAL_MINUTES = 8 * 60
+
+MINUTES_PER_DAY = 24 * 60
+
+_COUNT_WORDS = {"once": 1, "one": 1, "twice": 2, "two": 2, "thrice": 3, "three": 3, "four": 4, "five": 5, "six": 6}
+
+# Latin/ward abbreviations -> doses per day
+_ABBREVIATIONS = {"od": 1, "qd": 1, "bd": 2, "bid": 2, "tds": 3, "tid": 3, "qds": 4, "qid": 4}
+
+_PRN_RE = re.compile(r"\b(?:prn|as\s+(?:needed|required)|when\s+(?:needed|required)|if\s+needed|sos)\b")
+
+_STAT_RE = re.compile(r"\b(?:stat|immediately|single\s+dose|one\s+dose|once\s+only)\b")
+
+_DURATION_RE = re.compile(r"\b(?:for|x)\s*(?P<count>\d+)\s*(?P<unit>days?|d|weeks?|wks?)\b")
+
+_PER_DAY_RE = re.compile(
+    r"\b(?P<count>\d+|" + "|".join(_COUNT_WORDS) + r")(?:\s*(?:x|times?))?\s+(?:a\s+|per\s+|each\s+)?(?:daily|day)\b"
+)
+
+_PER_WEEK_RE = re.compile(
+    r"\b(?P<count>\d+|" + "|".join(_COUNT_WORDS) + r")(?:\s*(?:x|times?))?\s+(?:a\s+|per\s+|each\s+)?(?:weekly|week)\b"
+)
+
+_ABBREVIATION_RE = re.compile(r"\b(?P<abbr>" + "|".join(_ABBREVIATIONS) + r")\b")
+
+_EVERY_RE = re.compile(
+    r"\b(?:every|q)\s*(?P<count>\d+(?:\.\d+)?)?\s*(?P<unit>minutes?|mins?|hours?|hrs?|h|days?|d|weeks?|wks?)\b"
+    r"|\b(?P<hourly>\d+)\s*-?\s*hourly\b"
+)
+
+_OTHER_DAY_RE = re.compile(r"\b(?:every\s+other\s+day|alternate\s+days?|eod)\b")
+
+_CLOCK_RE = re.compile(r"\b(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?m\b|\b(?P<hour24>\d{1,2}):(?P<minute24>\d{2})\b")
+
+# Single-dose-per-day phrasings with a conventional time of day (ward time)
+_NAMED_TIMES = [
+    (re.compile(r"\b(?:at\s+night|nightly|at\s+bedtime|bedtime|nocte|hs|every\s+night)\b"), 22 * 60),
+    (re.compile(r"\b(?:every\s+morning|in\s+the\s+morning|mane|om)\b"), 8 * 60),
+    (re.compile(r"\b(?:every\s+evening|in\s+the\s+evening)\b"), 18 * 60),
+]
+
+_DAILY_RE = re.compile(r"\b(?:daily|every\s+day|a\s+day|per\s+day)\b")
+_WEEKLY_RE = re.compile(r"\b(?:weekly|once\s+a\s+week|every\s+week)\b")
+
+
+@dataclass(frozen=True)
+class DoseSchedule:
+    """
+    Structured dosing schedule. Exactly one of interval_minutes,
+    dose_times or is_prn describes the repeat pattern; duration_days
+    (if any) bounds the course and becomes the medication's end_date.
+    """
+    interval_minutes: Optional[int] = None
+    dose_times: Tuple[int, ...] = ()  # minutes after midnight, sorted
+    is_prn: bool = False
+    is_stat: bool = False
+    duration_days: Optional[int] = None
+    recognised: bool = True
+
+    @property
+    def dose_times_text(self) -> Optional[str]:
+        """dose_times as stored on the Medication row, e.g. "08:00,20:00" """
+        if not self.dose_times:
+            return None
+        return ",".join(f"{m // 60:02d}:{m % 60:02d}" for m in self.dose_times)
+
+    def end_date(self, start: datetime) -> Optional[datetime]:
+        if self.is_stat:
+            return start
+        if self.duration_days:
+            return start + timedelta(days=self.duration_days)
+        return None
+
+    def first_dose(self, start: datetime) -> Optional[datetime]:
+        """When the first dose reminder fires for a course starting at `start`"""
+        if self.is_prn:
+            return None
+        if self.is_stat:
+            return start
+        if self.dose_times:
+            return next_clock_time(self.dose_times, start)
+        return start + timedelta(minutes=self.interval_minutes)
+
+
+@functools.lru_cache(maxsize=256)
+def parse_dose_times(value: Optional[str]) -> Tuple[int, ...]:
+    """Stored "HH:MM,HH:MM" -> sorted minutes after midnight (cached)"""
+    if not value:
+        return ()
+    minutes = []
+    for part in value.split(","):
+        hour, minute = part.strip().split(":")
+        minutes.append(int(hour) * 60 + int(minute))
+    return tuple(sorted(set(minutes)))
+
+
+def next_clock_time(dose_times: Tuple[int, ...], after: datetime, tz=None) -> datetime:
+    """
+    First of the daily clock times (ward time) strictly after `after`.
+    `after` and the result are naive UTC, like the stored timestamps.
+    """
+    local = to_ward_time(after, tz)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    minute_of_day = (local - midnight).total_seconds() / 60
+    index = bisect.bisect_right(dose_times, minute_of_day)
+    if index < len(dose_times):
+        result = midnight + timedelta(minutes=dose_times[index])
+    else:
+        result = midnight + timedelta(days=1, minutes=dose_times[0])
+    return from_ward_time(result, tz)
+
+
+def next_dose(interval_minutes: Optional[int], dose_times: Optional[str], is_prn, end_date: Optional[datetime],
+              previous_due: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """
+    The dose after `previous_due`, from a medication row's stored schedule.
+    Interval schedules stay anchored to the original dose times (no drift)
+    and skip doses missed while the service was down. Returns None when
+    there are no further reminders (PRN, or the course has ended).
+    """
+    if is_prn:
+        return None
+
+    if dose_times:
+        result = next_clock_time(parse_dose_times(dose_times), max(previous_due or now, now))
+    elif interval_minutes:
+        if previous_due is None:
+            result = now + timedelta(minutes=interval_minutes)
+        else:
+            step = timedelta(minutes=interval_minutes)
+            missed = max(int((now - previous_due) / step), 0)
+            result = previous_due + step * (missed + 1)
+    else:
+        return None
+
+    if end_date is not None and result > end_date:
+        return None
+    return result
+
+
+def _every_minutes(match) -> Optional[int]:
+    if match.group('hourly'):
+        return int(match.group('hourly')) * 60
+    count = float(match.group('count') or 1)
+    unit = match.group('unit')
+    if unit.startswith("m"):
+        return int(count)
+    if unit.startswith("h"):
+        return int(count * 60)
+    if unit.startswith("d"):
+        return int(count * MINUTES_PER_DAY)
+    return int(count * 7 * MINUTES_PER_DAY)
+
+
+def _clock_minutes(text: str) -> Tuple[int, ...]:
+    minutes = []
+    for match in _CLOCK_RE.finditer(text):
+        if match.group('hour') is not None:
+            hour = int(match.group('hour'))
+            if not 1 <= hour <= 12:
+                continue
+            hour = hour % 12 + (12 if match.group('ampm') == "p" else 0)
+            minute = int(match.group('minute') or 0)
+        else:
+            hour, minute = int(match.group('hour24')), int(match.group('minute24'))
+        if hour < 24 and minute < 60:
+            minutes.append(hour * 60 + minute)
+    return tuple(sorted(set(minutes)))
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_frequency(frequency: Optional[str]) -> DoseSchedule:
+    """Parse a free-text frequency into a DoseSchedule"""
+    text = re.sub(r"\s+", " ", (frequency or "").lower()).strip()
+
+    duration = _DURATION_RE.search(text)
+    duration_days = None
+    if duration:
+        duration_days = int(duration.group('count')) * (7 if duration.group('unit').startswith("w") else 1)
+        text = (text[:duration.start()] + text[duration.end():]).strip()
+
+    if _PRN_RE.search(text):
+        return DoseSchedule(is_prn=True, duration_days=duration_days)
+
+    if _STAT_RE.search(text):
+        return DoseSchedule(is_stat=True)
+
+    clock_times = _clock_minutes(text)
+    if clock_times:
+        return DoseSchedule(dose_times=clock_times, duration_days=duration_days)
+
+    for pattern, minute in _NAMED_TIMES:
+        if pattern.search(text):
+            return DoseSchedule(dose_times=(minute,), duration_days=duration_days)
+
+    per_day = _PER_DAY_RE.search(text)
+    if per_day:
+        count = per_day.group('count')
+        count = int(count) if count.isdigit() else _COUNT_WORDS[count]
+        if count > 0:
+            return DoseSchedule(interval_minutes=MINUTES_PER_DAY // count, duration_days=duration_days)
+
+    per_week = _PER_WEEK_RE.search(text)
+    if per_week:
+        count = per_week.group('count')
+        count = int(count) if count.isdigit() else _COUNT_WORDS[count]
+        if count > 0:
+            return DoseSchedule(interval_minutes=7 * MINUTES_PER_DAY // count, duration_days=duration_days)
+
+    abbreviation = _ABBREVIATION_RE.search(text)
+    if abbreviation:
+        return DoseSchedule(
+            interval_minutes=MINUTES_PER_DAY // _ABBREVIATIONS[abbreviation.group('abbr')],
+            duration_days=duration_days
+        )
+
+    if _OTHER_DAY_RE.search(text):
+        return DoseSchedule(interval_minutes=2 * MINUTES_PER_DAY, duration_days=duration_days)
+
+    every = _EVERY_RE.search(text)
+    if every:
+        minutes = _every_minutes(every)
+        if minutes and minutes > 0:
+            return DoseSchedule(interval_minutes=minutes, duration_days=duration_days)
+
+    if re.search(r"\bhourly\b", text):
+        return DoseSchedule(interval_minutes=60, duration_days=duration_days)
+
+    if _WEEKLY_RE.search(text):
+        return DoseSchedule(interval_minutes=7 * MINUTES_PER_DAY, duration_days=duration_days)
+
+    if _DAILY_RE.search(text) or re.search(r"\bonce\b", text):
+        return DoseSchedule(interval_minutes=MINUTES_PER_DAY, duration_days=duration_days)
+
+    return DoseSchedule(interval_minutes=DEFAULT_INTERVAL_MINUTES, duration_days=duration_days, recognised=False)
@@ -0,0 +1,84 @@
+import os
+import threading
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.database import engine as default_engine
+from app.models.sequence import IdSequence
+
+# Sequential IDs start above the legacy random PT1000-PT9999 range
+PATIENT_ID_START = int(os.getenv("PATIENT_ID_START", "10000"))
+
+# How many IDs a worker leases per DB round-trip
+PATIENT_ID_BLOCK_SIZE = int(os.getenv("PATIENT_ID_BLOCK_SIZE", "50"))
+
+
+class BlockIdAllocator:
+    """
+    Hands out unique integers from a DB-backed counter.
+
+    Each process leases a block of `block_size` values with a single
+    atomic UPDATE, then serves IDs from memory until the block runs out.
+    Concurrent workers always get disjoint blocks; values left in a block
+    when a process exits are skipped, so IDs are unique but not gapless.
+    """
+
+    def __init__(self, name: str, start: int, block_size: int, engine=default_engine):
+        self.name = name
+        self.start = start
+        self.block_size = block_size
+        self.engine = engine
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_value(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._lease_block()
+            value = self._next
+            self._next += 1
+            return value
+
+    def _ensure_sequence(self):
+        """Create the counter row the first time this sequence is used"""
+        try:
+            with self.engine.begin() as conn:
+                exists = conn.execute(
+                    select(IdSequence.name).where(IdSequence.name == self.name)
+                ).first()
+                if not exists:
+                    conn.execute(IdSequence.__table__.insert().values(name=self.name, next_value=self.start))
+        except IntegrityError:
+            # Another worker created it first
+            pass
+
+    def _lease_block(self):
+        """Atomically advance the counter by one block and return [start, end)"""
+        self._ensure_sequence()
+
+        # The UPDATE takes the row (Postgres) or database (SQLite) write lock,
+        # so reading it back in the same transaction sees only our increment
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(IdSequence)
+                .where(IdSequence.name == self.name)
+                .values(next_value=IdSequence.next_value + self.block_size)
+            )
+            end = conn.execute(
+                select(IdSequence.next_value).where(IdSequence.name == self.name)
+            ).scalar_one()
+
+        return end - self.block_size, end
+
+
+class PatientIdAllocator(BlockIdAllocator):
+    """Human-friendly patient IDs: PT10000, PT10001, ..."""
+
+    def __init__(self, engine=default_engine):
+        super().__init__("patient_id", PATIENT_ID_START, PATIENT_ID_BLOCK_SIZE, engine)
+
+    def next_id(self) -> str:
+        return f"PT{self.next_value()}"
+
+
+patient_id_allocator = PatientIdAllocator()
@@ -0,0 +1,168 @@
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+INTENT_CACHE_ENABLED = os.getenv("INTENT_CACHE_ENABLED", "true").lower() == "true"
+INTENT_CACHE_URL = os.getenv("INTENT_CACHE_URL")  # e.g. redis://localhost:6379/0 to share across workers
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "2048"))
+INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", "3600"))  # seconds
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PATIENT_ID_RE = re.compile(r"\bpt\s*-?\s*(\d{3,})\b", re.IGNORECASE)
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s.!?]+$")
+
+# Results that must never be cached so transient failures don't stick
+UNCACHEABLE_INTENTS = {None, "", "unknown"}
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a message into a cache key (case, whitespace, patient IDs)"""
+    key = _WHITESPACE_RE.sub(" ", message.strip().lower())
+    key = _PATIENT_ID_RE.sub(lambda m: f"pt{m.group(1)}", key)
+    return _TRAILING_PUNCTUATION_RE.sub("", key)
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU cache with TTL expiry"""
+
+    is_remote = False
+
+    def __init__(self, max_size: int = INTENT_CACHE_SIZE, ttl: int = INTENT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+        # Callers mutate the parsed data, so hand out a private copy
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Shared cache for several uvicorn workers. Entries expire via TTL;
+    LRU eviction is the Redis server's maxmemory-policy (allkeys-lru).
+    """
+
+    is_remote = True
+
+    def __init__(self, url: str, ttl: int = INTENT_CACHE_TTL, prefix: str = "intent:"):
+        # Optional dependency, only needed when a shared cache is configured
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("Intent cache read error", extra={"fields": {"error": type(e).__name__}})
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: dict):
+        try:
+            self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logger.warning("Intent cache write error", extra={"fields": {"error": type(e).__name__}})
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self):
+        # Counting keys means a full SCAN, too costly for a health check
+        return None
+
+
+class IntentCache:
+    """Cache of parse_intent results keyed on the normalized message"""
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, message: str):
+        if not self.enabled:
+            return None
+
+        value = self.backend.get(normalize_message(message))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, message: str, result: dict):
+        if not self.enabled or result.get('intent') in UNCACHEABLE_INTENTS:
+            return
+        self.backend.set(normalize_message(message), result)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'size': self.backend.size() if self.enabled else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def create_intent_cache() -> IntentCache:
+    """Build the intent cache from environment settings"""
+    if INTENT_CACHE_URL:
+        try:
+            return IntentCache(RedisCacheBackend(INTENT_CACHE_URL), enabled=INTENT_CACHE_ENABLED)
+        except Exception as e:
+            logger.warning("Shared intent cache unavailable, using in-memory cache", extra={"fields": {"error": type(e).__name__}})
+    return IntentCache(InMemoryCacheBackend(), enabled=INTENT_CACHE_ENABLED)
+
+
+intent_cache = create_intent_cache()
@@ -0,0 +1,341 @@
+import os
+import re
+import threading
+
+# Below this confidence the message is handed to the LLM
+MIN_CONFIDENCE = float(os.getenv("INTENT_RULES_MIN_CONFIDENCE", "0.85"))
+
+# Share of the confidence lost per word the rules couldn't explain
+LEFTOVER_WORD_PENALTY = 0.2
+
+PATIENT_ID_RE = re.compile(r"\bpt\s*-?\s*(\d{3,})\b", re.IGNORECASE)
+
+_WORD_RE = re.compile(r"[a-z0-9]+", re.IGNORECASE)
+
+# Vitals can come in any order, so each one has its own pattern
+_VITALS_PATTERNS = {
+    'blood_pressure': re.compile(r"\b(?:bp|blood\s+pressure)\s*(?:of|is|was|:|=)?\s*(\d{2,3}\s*/\s*\d{2,3})(?!\d)", re.IGNORECASE),
+    'temperature': re.compile(r"\b(?:temp(?:erature)?|t)\s*(?:of|is|was|:|=)?\s*(\d{2}(?:\.\d+)?)(?![\d.])\s*(?:°?\s*c\b)?", re.IGNORECASE),
+    'pulse': re.compile(r"\b(?:pulse|hr|heart\s+rate|p)\s*(?:of|is|was|:|=)?\s*(\d{2,3})(?!\d)\s*(?:bpm\b)?", re.IGNORECASE),
+    'respiratory_rate': re.compile(r"\b(?:rr|resp(?:iratory)?(?:\s+rate)?)\s*(?:of|is|was|:|=)?\s*(\d{1,2})\b", re.IGNORECASE),
+    'oxygen_saturation': re.compile(r"\b(?:spo2|sp02|o2\s+sat(?:uration)?|oxygen(?:\s+saturation)?|sats?)\s*(?:of|is|was|:|=)?\s*(\d{2,3}(?:\.\d+)?)(?![\d.])\s*%?", re.IGNORECASE),
+}
+
+_VITALS_TYPES = {
+    'blood_pressure': lambda v: re.sub(r"\s+", "", v),
+    'temperature': float,
+    'pulse': int,
+    'respiratory_rate': int,
+    'oxygen_saturation': float,
+}
+
+_VITALS_FILLER = {"record", "log", "chart", "vitals", "vital", "signs", "for", "patient", "and", "of", "the", "is", "was", "bpm", "c"}
+
+_QUERY_RE = re.compile(
+    r"^(?:please\s+)?(?:show|get|view|display|fetch|pull\s+up|open)(?:\s+me)?\s+(?:the\s+)?"
+    r"(?:(?:complete|full)\s+)?(?:records?|chart|history|details|file)?\s*(?:for|of)?\s*"
+    r"(?:patient\s+)?pt\s*-?\s*\d{3,}(?:'s)?\s*(?:(?:complete|full)\s+)?(?:records?|chart|history|details|file)?\s*[.!?]?$",
+    re.IGNORECASE
+)
+
+_TREND_RE = re.compile(
+    r"^(?:please\s+)?(?:(?:show|get|view|check)\s+)?(?:me\s+)?(?:the\s+)?(?:vitals?\s+)?"
+    r"(?:trends?|news2?|early\s+warning(?:\s+scores?)?|ews)(?:\s+scores?)?\s+(?:for|of)\s+(?:patient\s+)?pt\s*-?\s*\d{3,}\s*[.!?]?$"
+    r"|^(?:please\s+)?(?:(?:show|get|view|check)\s+)?(?:me\s+)?(?:the\s+)?(?:ward\s+)?(?:news2?|early\s+warning|ews)(?:\s+scores?)?"
+    r"(?:\s+(?:for|on)\s+(?:the\s+)?ward)?\s*[.!?]?$"
+    r"|^(?:who(?:'s|\s+is)\s+deteriorating|which\s+patients\s+are\s+deteriorating)\s*[.!?]?$",
+    re.IGNORECASE
+)
+
+_PRESCRIBE_RE = re.compile(
+    r"^(?:please\s+)?(?:prescribe|start|give)\s+(?P<name>[a-z][\w\-]*(?:\s+[a-z][\w\-]*){0,2}?)\s+"
+    r"(?P<dosage>\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|iu|units?)\b)\s*"
+    r"(?:(?P<route>orally|oral|po|iv|im|sc|subcutaneous|intravenous|intramuscular|topical)\s+)?"
+    r"(?P<frequency>.+?)\s+(?:for|to)\s+(?:patient\s+)?pt\s*-?\s*\d{3,}"
+    r"(?:\s+(?P<route_after>orally|oral|po|iv|im|sc|subcutaneous|intravenous|intramuscular|topical))?\s*[.!?]?$",
+    re.IGNORECASE
+)
+
+_FREQUENCY_RE = re.compile(
+    r"^(?:once|twice|thrice|(?:one|two|three|four|\d+)\s+times?)\s+(?:a\s+)?(?:daily|day|per\s+day)$"
+    r"|^(?:daily|nightly|at\s+night|every\s+morning|bd|bid|tds|tid|qds|qid|od|prn|as\s+needed|stat)$"
+    r"|^every\s+\d+\s*(?:hours?|hrs?|h)$",
+    re.IGNORECASE
+)
+
+_ROUTES = {
+    'orally': 'oral', 'oral': 'oral', 'po': 'oral',
+    'iv': 'IV', 'intravenous': 'IV',
+    'im': 'injection', 'intramuscular': 'injection',
+    'sc': 'injection', 'subcutaneous': 'injection',
+    'topical': 'topical',
+}
+
+_DIAGNOSIS_RE = re.compile(
+    r"^(?P<doctor>dr\.?\s+[a-z][\w\-]*)\s+(?:has\s+)?diagnosed\s+(?:patient\s+)?pt\s*-?\s*\d{3,}\s+with\s+(?P<diagnosis>[^.!?]+?)\s*[.!?]?$",
+    re.IGNORECASE
+)
+
+_SCHEDULE_RE = re.compile(
+    r"^(?:please\s+)?(?:schedule|book|arrange)\s+(?:an?\s+)?(?P<type>[a-z][\w\-]*(?:\s+[a-z][\w\-]*)??)\s+"
+    r"(?:appointment\s+|visit\s+)?for\s+(?:patient\s+)?pt\s*-?\s*\d{3,}\s+(?P<time>.+?)\s*[.!?]?$",
+    re.IGNORECASE
+)
+
+_TIME_HINT_RE = re.compile(
+    r"\b(?:today|tomorrow|tonight|next|in\s+\d+|at\s+\d{1,2}(?::\d{2})?|\d{1,2}(?::\d{2})?\s*(?:am|pm)|\d{1,2}:\d{2}"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2})\b",
+    re.IGNORECASE
+)
+
+# Words that may sit around the time hints in an appointment time
+_TIME_FILLER = {
+    "at", "on", "in", "by", "the", "a", "an", "this", "coming", "after", "around", "about",
+    "am", "pm", "o", "clock", "oclock", "morning", "afternoon", "evening", "night", "noon", "midday",
+    "minute", "minutes", "mins", "hour", "hours", "hrs", "day", "days", "week", "weeks",
+}
+
+# Other intents whose cues inside a diagnosis mean a second instruction
+_SECOND_INSTRUCTION_INTENTS = ("prescribe_medication", "record_vitals", "schedule_appointment")
+
+_REGISTER_RE = re.compile(
+    r"^(?:please\s+)?(?:register\s+)?(?:a\s+)?new\s+patient[:,]?\s+(?P<name>[a-z][a-z'\-]*(?:\s+[a-z][a-z'\-]*){0,3})\s*(?:,|$)",
+    re.IGNORECASE
+)
+
+_AGE_RE = re.compile(r"\b(\d{1,3})\s*(?:years?\s+old|yrs?(?:\s+old)?|y/?o)\b", re.IGNORECASE)
+_GENDER_RE = re.compile(r"\b(male|female|man|woman)\b", re.IGNORECASE)
+_PHONE_RE = re.compile(r"(?:\b(?:phone|tel|mobile|number)\s*(?:number|no\.?)?\s*:?\s*)?(\+?\d[\d\s\-]{6,}\d)")
+
+_REGISTER_FILLER = {"years", "year", "old", "yrs", "yo", "phone", "tel", "mobile", "number", "no", "and", "aged", "age"}
+
+_GENDERS = {'male': 'male', 'man': 'male', 'female': 'female', 'woman': 'female'}
+
+# Loose keyword cues per intent, used to pick few-shot examples for the LLM
+# when the rules above aren't confident enough to answer themselves
+_INTENT_HINTS = {
+    "register_patient": re.compile(r"\b(?:new\s+patient|register|admit(?:ted)?|years?\s+old|y/?o|male|female)\b", re.IGNORECASE),
+    "record_vitals": re.compile(
+        r"\b(?:vitals?|bp|blood\s+pressure|temp(?:erature)?|pulse|hr|heart\s+rate|rr|resp(?:iratory)?|spo2|sats?|o2)\b"
+        r"|\d{2,3}\s*/\s*\d{2,3}", re.IGNORECASE
+    ),
+    "add_diagnosis": re.compile(r"\b(?:diagnos\w*|dx|dr\.?|doctor|confirmed|suspected)\b", re.IGNORECASE),
+    "prescribe_medication": re.compile(
+        r"\b(?:prescribe\w*|start(?:ed)?|give|medication|meds?|tablets?|daily|bd|tds|qds|prn|q\d+h)\b"
+        # Units usually follow the number directly ("500mg"), so no leading \b
+        r"|(?<![a-z])(?:mg|mcg|ml|iu|units?)\b",
+        re.IGNORECASE
+    ),
+    "schedule_appointment": re.compile(
+        r"\b(?:schedule|book|appointment|follow[\s\-]?up|review|clinic|tomorrow|next\s+\w+day|\d{1,2}\s*(?:am|pm))\b",
+        re.IGNORECASE
+    ),
+    "query_patient": re.compile(r"\b(?:show|view|records?|history|chart|details|file|look\s+up|pull\s+up)\b", re.IGNORECASE),
+    "vitals_trend": re.compile(r"\b(?:trend\w*|news2?|early\s+warning|ews|deteriorat\w*|worse|improving|sick\w*)\b", re.IGNORECASE),
+}
+
+
+def canonical_patient_id(text: str) -> str:
+    """Extract a patient ID from text in its canonical PT#### form"""
+    match = PATIENT_ID_RE.search(text)
+    return f"PT{match.group(1)}" if match else None
+
+
+def _residual_confidence(message: str, spans: list, filler: set) -> float:
+    """
+    Confidence from how much of the message the matched spans explain.
+    Each word outside the spans that isn't known filler cuts the score by
+    LEFTOVER_WORD_PENALTY, however long the message, so one unexplained
+    clinical word ("... and patient is confused") is enough to hand the
+    message to the LLM at the default threshold.
+    """
+    remaining = message
+    for start, end in sorted(spans, reverse=True):
+        remaining = remaining[:start] + " " + remaining[end:]
+    remaining = PATIENT_ID_RE.sub(" ", remaining)
+
+    leftover = [w for w in _WORD_RE.findall(remaining) if w.lower() not in filler]
+    return (1.0 - LEFTOVER_WORD_PENALTY) ** len(leftover)
+
+
+class IntentRules:
+    """
+    Deterministic regex-based extractor for routine nurse messages.
+    Returns the same {"intent", "data"} shape as the LLM parser.
+    """
+
+    def __init__(self, min_confidence: float = MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def match(self, message: str):
+        """Return (result, confidence) for the best matching rule, or (None, 0.0)"""
+        message = message.strip()
+        best, best_confidence = None, 0.0
+
+        for rule in (self._query, self._trend, self._prescribe, self._diagnosis,
+                     self._schedule, self._register, self._vitals):
+            result, confidence = rule(message)
+            if result and confidence > best_confidence:
+                best, best_confidence = result, confidence
+                if confidence >= 1.0:
+                    break
+
+        return best, best_confidence
+
+    def parse(self, message: str):
+        """Return a parsed intent if the rules are confident enough, else None"""
+        result, confidence = self.match(message)
+        with self._lock:
+            if result and confidence >= self.min_confidence:
+                self.hits += 1
+                return result
+            self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the fast path"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+    @staticmethod
+    def _query(message: str):
+        if not _QUERY_RE.match(message):
+            return None, 0.0
+        return {"intent": "query_patient", "data": {"patient_id": canonical_patient_id(message)}}, 1.0
+
+    @staticmethod
+    def _trend(message: str):
+        if not _TREND_RE.match(message):
+            return None, 0.0
+        patient_id = canonical_patient_id(message)
+        return {"intent": "vitals_trend", "data": {"patient_id": patient_id} if patient_id else {}}, 1.0
+
+    @staticmethod
+    def _prescribe(message: str):
+        match = _PRESCRIBE_RE.match(message)
+        if not match:
+            return None, 0.0
+
+        frequency = re.sub(r"\s+", " ", match.group('frequency')).strip()
+        data = {
+            "patient_id": canonical_patient_id(message[match.end('frequency'):]),
+            "medication_name": match.group('name'),
+            "dosage": re.sub(r"\s+", "", match.group('dosage')),
+            "frequency": frequency
+        }
+        route = match.group('route') or match.group('route_after')
+        if route:
+            data["route"] = _ROUTES[route.lower()]
+
+        # Unrecognised frequency wording is left to the LLM
+        confidence = 1.0 if _FREQUENCY_RE.match(frequency) else 0.6
+        return {"intent": "prescribe_medication", "data": data}, confidence
+
+    @staticmethod
+    def _diagnosis(message: str):
+        match = _DIAGNOSIS_RE.match(message)
+        if not match:
+            return None, 0.0
+
+        # The diagnosis is free text, so instead of leftover words count the
+        # cues of a second instruction in it ("..., start amoxicillin 500mg tds")
+        diagnosis = match.group('diagnosis')
+        cues = sum(len(_INTENT_HINTS[intent].findall(diagnosis)) for intent in _SECOND_INSTRUCTION_INTENTS)
+        if re.search(r"\b(?:and|then)\s+(?:prescribed?|started|gave|give)\b", diagnosis, re.IGNORECASE):
+            cues = max(cues, 2)
+        confidence = (1.0 - LEFTOVER_WORD_PENALTY) ** cues
+
+        return {"intent": "add_diagnosis", "data": {
+            "patient_id": canonical_patient_id(message),
+            "doctor_name": re.sub(r"^dr\.?\s+", "Dr ", match.group('doctor'), flags=re.IGNORECASE),
+            "diagnosis": diagnosis
+        }}, confidence
+
+    @staticmethod
+    def _schedule(message: str):
+        match = _SCHEDULE_RE.match(message)
+        if not match:
+            return None, 0.0
+
+        # Words in the time part that aren't a time ("... and cancel the 3pm",
+        # "on hold") mean the message says more than the rule understood
+        time_str = match.group('time')
+        spans = [hint.span() for hint in _TIME_HINT_RE.finditer(time_str)]
+        confidence = _residual_confidence(time_str, spans, _TIME_FILLER) if spans else 0.5
+
+        return {"intent": "schedule_appointment", "data": {
+            "patient_id": canonical_patient_id(message),
+            "appointment_type": match.group('type').lower(),
+            "time": time_str
+        }}, confidence
+
+    @staticmethod
+    def _register(message: str):
+        match = _REGISTER_RE.match(message)
+        if not match:
+            return None, 0.0
+
+        data = {"name": match.group('name').strip()}
+        spans = [match.span()]
+
+        age = _AGE_RE.search(message)
+        if age:
+            data["age"] = int(age.group(1))
+            spans.append(age.span())
+
+        gender = _GENDER_RE.search(message, match.end())
+        if gender:
+            data["gender"] = _GENDERS[gender.group(1).lower()]
+            spans.append(gender.span())
+
+        phone = _PHONE_RE.search(message, match.end())
+        if phone:
+            data["phone"] = re.sub(r"[\s\-]", "", phone.group(1))
+            spans.append(phone.span())
+
+        confidence = _residual_confidence(message, spans, _REGISTER_FILLER)
+        return {"intent": "register_patient", "data": data}, confidence
+
+    @staticmethod
+    def _vitals(message: str):
+        patient_id = canonical_patient_id(message)
+        if not patient_id:
+            return None, 0.0
+
+        data = {"patient_id": patient_id}
+        spans = []
+        for field, pattern in _VITALS_PATTERNS.items():
+            match = pattern.search(message)
+            if match:
+                data[field] = _VITALS_TYPES[field](match.group(1))
+                spans.append(match.span())
+
+        if len(data) == 1:
+            return None, 0.0
+
+        confidence = _residual_confidence(message, spans, _VITALS_FILLER)
+        return {"intent": "record_vitals", "data": data}, confidence
+
+
+def likely_intents(message: str, limit: int = 2) -> list:
+    """
+    Cheap keyword pre-classification: up to `limit` intents the message
+    most likely expresses, best first (empty if nothing looks familiar).
+    """
+    scores = []
+    for intent, pattern in _INTENT_HINTS.items():
+        hits = len(pattern.findall(message))
+        if hits:
+            scores.append((hits, intent))
+    # sorted() is stable, so ties keep _INTENT_HINTS order
+    return [intent for _, intent in sorted(scores, key=lambda s: -s[0])[:limit]]
+
+
+intent_rules = IntentRules()
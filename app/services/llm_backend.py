@@ -0,0 +1,315 @@
+"""
+Backends that answer intent-parse prompts.
+
+GeminiBackend calls the real model. LocalBackend answers from the
+rule-based parser, so the agent runs (and can be load-tested) offline.
+ResilientBackend wraps a primary backend with a per-call deadline,
+hedges slow async calls with a second request, and trips a circuit
+breaker when the primary's error rate or latency crosses a threshold,
+serving the fallback backend until a probe call succeeds again.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from app.services.intent_rules import IntentRules, MIN_CONFIDENCE
+from app.utils.log import get_logger
+from app.utils.metrics import inc, llm_calls_total
+
+logger = get_logger(__name__)
+
+# Which backend parse_intent uses: "gemini" (with the local fallback) or "local"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
+# Deadline for one LLM call, and how long an async call may run before a
+# hedged duplicate is sent (0 disables hedging)
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "8"))
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "2.5"))
+
+# The breaker opens when, over the last LLM_BREAKER_WINDOW calls (at least
+# LLM_BREAKER_MIN_CALLS), this share failed or took longer than
+# LLM_BREAKER_SLOW_S; it lets a probe through after LLM_BREAKER_COOLDOWN_S
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_SLOW_S = float(os.getenv("LLM_BREAKER_SLOW_S", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+
+def _outcome(error: Exception) -> str:
+    if isinstance(error, TimeoutError) or type(error).__name__ == "DeadlineExceeded":
+        return "timeout"
+    return "error"
+
+
+class IntentBackend:
+    """
+    Answers a prompt with a response object exposing `.text` (the JSON
+    reply) and, optionally, `.usage_metadata` token counts
+    """
+    name = "base"
+
+    def generate(self, prompt: str, timeout: float = None):
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, timeout: float = None):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class GeminiBackend(IntentBackend):
+    """
+    Gemini via google.generativeai. The SDK is imported and the model
+    created on first use, so importing the app doesn't pay for them.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-2.5-flash", system_instruction: str = None,
+                 generation_config: dict = None, model=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                    self._model = genai.GenerativeModel(
+                        self.model_name,
+                        system_instruction=self.system_instruction,
+                        generation_config=self.generation_config,
+                    )
+        return self._model
+
+    def generate(self, prompt: str, timeout: float = None):
+        options = {"timeout": timeout} if timeout else None
+        return self.model.generate_content(prompt, request_options=options)
+
+    async def generate_async(self, prompt: str, timeout: float = None):
+        options = {"timeout": timeout} if timeout else None
+        call = self.model.generate_content_async(prompt, request_options=options)
+        return await asyncio.wait_for(call, timeout) if timeout else await call
+
+
+class LocalResponse:
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LocalBackend(IntentBackend):
+    """
+    Deterministic stand-in: the rule-based parser's answer when it is at
+    least `min_confidence` sure, otherwise unknown. Used offline and as
+    the degraded path, where a low-confidence guess would be charted.
+    """
+    name = "local"
+
+    def __init__(self, min_confidence: float = MIN_CONFIDENCE):
+        self.rules = IntentRules(min_confidence=min_confidence)
+
+    @staticmethod
+    def prompt_message(prompt: str) -> str:
+        """The nurse's message from the last 'Message: "..."' line of a prompt"""
+        return prompt.rpartition('Message: "')[2].rpartition('"')[0]
+
+    def generate(self, prompt: str, timeout: float = None):
+        result = self.rules.parse(self.prompt_message(prompt))
+        return LocalResponse(json.dumps(result or {"intent": "unknown", "data": {}}))
+
+    async def generate_async(self, prompt: str, timeout: float = None):
+        return self.generate(prompt)
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through and their outcomes fill a sliding window.
+    open: calls are refused until the cooldown has passed.
+    half_open: one probe call goes through; success closes, failure reopens.
+    A probe that never reports back within probe_timeout_s counts as failed.
+    """
+
+    def __init__(self, window: int = LLM_BREAKER_WINDOW, min_calls: int = LLM_BREAKER_MIN_CALLS,
+                 error_rate: float = LLM_BREAKER_ERROR_RATE, slow_call_s: float = LLM_BREAKER_SLOW_S,
+                 cooldown_s: float = LLM_BREAKER_COOLDOWN_S, probe_timeout_s: float = LLM_TIMEOUT_S):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_s = slow_call_s
+        self.cooldown_s = cooldown_s
+        self.probe_timeout_s = probe_timeout_s
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trips = 0
+        self._failures = deque(maxlen=window)
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.cooldown_s:
+                self.state = "half_open"
+            if self.state == "half_open" and self._probing and now - self._probe_started > self.probe_timeout_s:
+                # The probe never reported back; treat it as failed
+                self._probing = False
+                self._open()
+                return False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                self._probe_started = now
+                return True
+            return False
+
+    def record(self, ok: bool, elapsed: float):
+        failed = not ok or elapsed > self.slow_call_s
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self._failures.clear()
+                    logger.info("LLM circuit closed")
+                return
+            if self.state != "closed":
+                return
+            self._failures.append(failed)
+            if len(self._failures) >= self.min_calls and sum(self._failures) / len(self._failures) >= self.error_rate:
+                self._open()
+
+    def abandon(self):
+        """A call ended without an outcome (e.g. cancelled); free the probe slot"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning("LLM circuit opened", extra={"fields": {"cooldown_s": self.cooldown_s}})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "open": int(self.state != "closed"),
+                "trips": self.trips,
+                "window_failures": sum(self._failures),
+                "window_calls": len(self._failures),
+            }
+
+
+class ResilientBackend(IntentBackend):
+    """
+    Primary backend with a deadline, hedging and a circuit breaker in
+    front, falling back to another backend. Fallback responses are marked
+    `degraded` so callers can avoid caching them.
+    """
+
+    def __init__(self, primary: IntentBackend, fallback: IntentBackend, breaker: CircuitBreaker = None,
+                 timeout: float = LLM_TIMEOUT_S, hedge_after: float = LLM_HEDGE_AFTER_S):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.name = primary.name
+
+    def _fallback(self, prompt: str, reason: str):
+        inc(llm_calls_total, backend=self.fallback.name, outcome=reason)
+        response = self.fallback.generate(prompt)
+        response.degraded = True
+        return response
+
+    def _failed(self, error: Exception, started: float, prompt: str):
+        self.breaker.record(False, time.perf_counter() - started)
+        outcome = _outcome(error)
+        inc(llm_calls_total, backend=self.primary.name, outcome=outcome)
+        logger.warning("LLM call failed, using fallback", extra={"fields": {
+            "backend": self.primary.name, "error": type(error).__name__
+        }})
+        return self._fallback(prompt, f"fallback_{outcome}")
+
+    def _succeeded(self, response, started: float):
+        self.breaker.record(True, time.perf_counter() - started)
+        inc(llm_calls_total, backend=self.primary.name, outcome="ok")
+        return response
+
+    def generate(self, prompt: str, timeout: float = None):
+        if not self.breaker.allow():
+            return self._fallback(prompt, "short_circuit")
+        started = time.perf_counter()
+        try:
+            response = self.primary.generate(prompt, timeout=timeout or self.timeout)
+        except Exception as e:
+            return self._failed(e, started, prompt)
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        return self._succeeded(response, started)
+
+    async def generate_async(self, prompt: str, timeout: float = None):
+        if not self.breaker.allow():
+            return self._fallback(prompt, "short_circuit")
+        hedge = self.hedge_after and self.breaker.state == "closed"
+        started = time.perf_counter()
+        try:
+            response = await self._hedged(prompt, timeout or self.timeout, hedge)
+        except Exception as e:
+            return self._failed(e, started, prompt)
+        except BaseException:
+            # Cancelled (client gone, hedge loser): no outcome to record
+            self.breaker.abandon()
+            raise
+        return self._succeeded(response, started)
+
+    async def _hedged(self, prompt: str, timeout: float, hedge: bool):
+        """
+        Send the call; if it hasn't answered after hedge_after seconds,
+        send a duplicate with the remaining deadline and take whichever
+        answers first
+        """
+        first = asyncio.ensure_future(self.primary.generate_async(prompt, timeout=timeout))
+        if not hedge or self.hedge_after >= timeout:
+            return await first
+
+        pending = {first}
+        error = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+            if done:
+                return first.result()
+
+            inc(llm_calls_total, backend=self.primary.name, outcome="hedged")
+            second = asyncio.ensure_future(self.primary.generate_async(prompt, timeout=timeout - self.hedge_after))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {"backend": self.primary.name, "fallback": self.fallback.name, **self.breaker.stats()}
@@ -1,26 +1,67 @@
 from sqlalchemy.orm import Session
 from app.models.patient import Patient, Vitals, Diagnosis, Medication, Appointment
 from app.models.schemas import *
-from datetime import datetime, timedelta
-import random
-import string
+from app.services.id_allocator import patient_id_allocator
+from app.services.dose_scheduler import dose_scheduler
+from app.services.frequency import parse_frequency
+from app.services.vitals import normalize_vitals
+from app.services.summary_service import SummaryService
+from app.utils.metrics import timed
+from datetime import datetime
+import sys
+
+# Rows per section returned by get_patient_full_record
+RECORD_LIMITS = {
+    'vitals': 1,
+    'diagnoses': 3,
+    'medications': 20,
+    'appointments': 5
+}
+
+MAX_HISTORY_PAGE_SIZE = 100
+
+# Only the columns the responses use are loaded, never whole ORM objects
+HISTORY_FIELDS = {
+    'patient': (Patient.id, Patient.patient_id, Patient.name, Patient.age, Patient.gender, Patient.phone),
+    'vitals': (Vitals.blood_pressure, Vitals.systolic_bp, Vitals.diastolic_bp, Vitals.temperature, Vitals.pulse, Vitals.respiratory_rate,
+               Vitals.oxygen_saturation, Vitals.recorded_at),
+    'diagnoses': (Diagnosis.doctor_name, Diagnosis.diagnosis, Diagnosis.diagnosed_at),
+    'medications': (Medication.medication_name, Medication.dosage, Medication.frequency, Medication.route,
+                    Medication.next_dose_time, Medication.is_active),
+    'appointments': (Appointment.appointment_type, Appointment.appointment_datetime, Appointment.is_completed)
+}
+
+HISTORY_ORDERING = {
+    'vitals': (Vitals, Vitals.recorded_at),
+    'diagnoses': (Diagnosis, Diagnosis.diagnosed_at),
+    'medications': (Medication, Medication.start_date),
+    'appointments': (Appointment, Appointment.appointment_datetime)
+}
+
+def _record_trend(patient_pk: int, patient_id: str, vitals):
+    """
+    Shift a new reading into the trend window. The trend engine (and
+    NumPy) is only imported by the first trend request; until then there
+    is no window to update and its first load picks the reading up.
+    """
+    trend_service = sys.modules.get("app.services.trend_service")
+    if trend_service is not None:
+        trend_service.trend_engine.record(patient_pk, patient_id, vitals)
 
 class PatientService:
     
     @staticmethod
     def generate_patient_id() -> str:
-        """Generate unique patient ID like PT001, PT002, etc."""
-        return f"PT{random.randint(1000, 9999)}"
+        """Generate unique patient ID like PT10000, PT10001, etc."""
+        return patient_id_allocator.next_id()
     
     @staticmethod
+    @timed("db.create_patient")
     def create_patient(db: Session, data: dict) -> Patient:
         """Register a new patient"""
+        # IDs come from a leased block, so no uniqueness check is needed
         patient_id = PatientService.generate_patient_id()
         
-        # Ensure unique ID
-        while db.query(Patient).filter(Patient.patient_id == patient_id).first():
-            patient_id = PatientService.generate_patient_id()
-        
         patient = Patient(
             patient_id=patient_id,
             name=data.get('name'),
@@ -40,39 +81,90 @@ class PatientService:
         return db.query(Patient).filter(Patient.patient_id == patient_id).first()
     
     @staticmethod
-    def record_vitals(db: Session, data: dict) -> Vitals:
-        """Record patient vitals"""
-        patient = PatientService.get_patient_by_id(db, data.get('patient_id'))
-        if not patient:
-            return None
-        
-        vitals = Vitals(
-            patient_id=patient.id,
+    @timed("db.get_patient_pks")
+    def get_patient_pks(db: Session, patient_ids) -> dict:
+        """Resolve many patient IDs to primary keys with a single IN query"""
+        patient_ids = {pid for pid in patient_ids if pid}
+        if not patient_ids:
+            return {}
+        rows = db.query(Patient.patient_id, Patient.id).filter(Patient.patient_id.in_(patient_ids)).all()
+        return {row.patient_id: row.id for row in rows}
+    
+    @staticmethod
+    def build_vitals(patient_pk: int, data: dict) -> Vitals:
+        """Vitals row for a patient (not yet added to the session); raises VitalsValidationError"""
+        data = normalize_vitals(data)
+        return Vitals(
+            patient_id=patient_pk,
             blood_pressure=data.get('blood_pressure'),
+            systolic_bp=data.get('systolic_bp'),
+            diastolic_bp=data.get('diastolic_bp'),
             temperature=data.get('temperature'),
             pulse=data.get('pulse'),
             respiratory_rate=data.get('respiratory_rate'),
             oxygen_saturation=data.get('oxygen_saturation'),
             notes=data.get('notes')
         )
+    
+    @staticmethod
+    def build_diagnosis(patient_pk: int, data: dict) -> Diagnosis:
+        """Diagnosis row for a patient (not yet added to the session)"""
+        return Diagnosis(
+            patient_id=patient_pk,
+            doctor_name=data.get('doctor_name'),
+            diagnosis=data.get('diagnosis')
+        )
+    
+    @staticmethod
+    def build_medication(patient_pk: int, data: dict) -> Medication:
+        """Medication row for a patient (not yet added to the session)"""
+        # Parse the frequency once; reminders only do arithmetic from here on
+        schedule = parse_frequency(data.get('frequency'))
+        start = datetime.utcnow()
+        return Medication(
+            patient_id=patient_pk,
+            medication_name=data.get('medication_name'),
+            dosage=data.get('dosage'),
+            frequency=data.get('frequency'),
+            route=data.get('route', 'oral'),
+            start_date=start,
+            end_date=schedule.end_date(start),
+            interval_minutes=schedule.interval_minutes,
+            dose_times=schedule.dose_times_text,
+            is_prn=int(schedule.is_prn),
+            next_dose_time=schedule.first_dose(start),
+            notes=data.get('notes')
+        )
+    
+    @staticmethod
+    @timed("db.record_vitals")
+    def record_vitals(db: Session, data: dict) -> Vitals:
+        """Record patient vitals"""
+        patient = PatientService.get_patient_by_id(db, data.get('patient_id'))
+        if not patient:
+            return None
+        
+        vitals = PatientService.build_vitals(patient.id, data)
         
         db.add(vitals)
+        db.flush()
+        SummaryService.apply_vitals(db, [vitals])
         db.commit()
         db.refresh(vitals)
+        
+        # Update the patient's trend window in place
+        _record_trend(patient.id, patient.patient_id, vitals)
         return vitals
     
     @staticmethod
+    @timed("db.add_diagnosis")
     def add_diagnosis(db: Session, data: dict) -> Diagnosis:
         """Add diagnosis for patient"""
         patient = PatientService.get_patient_by_id(db, data.get('patient_id'))
         if not patient:
             return None
         
-        diagnosis = Diagnosis(
-            patient_id=patient.id,
-            doctor_name=data.get('doctor_name'),
-            diagnosis=data.get('diagnosis')
-        )
+        diagnosis = PatientService.build_diagnosis(patient.id, data)
         
         db.add(diagnosis)
         db.commit()
@@ -80,52 +172,75 @@ class PatientService:
         return diagnosis
     
     @staticmethod
+    @timed("db.prescribe_medication")
     def prescribe_medication(db: Session, data: dict) -> Medication:
         """Prescribe medication for patient"""
         patient = PatientService.get_patient_by_id(db, data.get('patient_id'))
         if not patient:
             return None
         
-        # Calculate next dose time based on frequency
-        next_dose = PatientService.calculate_next_dose(data.get('frequency'))
-        
-        medication = Medication(
-            patient_id=patient.id,
-            medication_name=data.get('medication_name'),
-            dosage=data.get('dosage'),
-            frequency=data.get('frequency'),
-            route=data.get('route', 'oral'),
-            next_dose_time=next_dose,
-            notes=data.get('notes')
-        )
+        medication = PatientService.build_medication(patient.id, data)
         
         db.add(medication)
+        db.flush()
+        SummaryService.refresh_medications(db, [patient.id])
         db.commit()
         db.refresh(medication)
+        
+        # Arm the reminder timer for the first dose
+        dose_scheduler.schedule(medication.id, medication.next_dose_time)
         return medication
     
     @staticmethod
-    def calculate_next_dose(frequency: str) -> datetime:
-        """Calculate next dose time based on frequency"""
-        now = datetime.utcnow()
-        frequency_lower = frequency.lower()
+    @timed("db.chart_batch")
+    def chart_batch(db: Session, items: list) -> list:
+        """
+        Insert vitals, diagnoses and prescriptions for many patients at once.
+        items is a list of (intent, data) pairs; patients are resolved with one
+        IN query and every row is written in a single transaction. Returns the
+        created row per item, or None where the patient wasn't found.
+        """
+        builders = {
+            'record_vitals': PatientService.build_vitals,
+            'add_diagnosis': PatientService.build_diagnosis,
+            'prescribe_medication': PatientService.build_medication
+        }
+        
+        pks = PatientService.get_patient_pks(db, [data.get('patient_id') for _, data in items])
+        
+        rows = []
+        for intent, data in items:
+            pk = pks.get(data.get('patient_id'))
+            rows.append(builders[intent](pk, data) if pk else None)
         
-        if 'once' in frequency_lower or 'daily' in frequency_lower:
-            return now + timedelta(hours=24)
-        elif 'twice' in frequency_lower:
-            return now + timedelta(hours=12)
-        elif 'three times' in frequency_lower or 'thrice' in frequency_lower:
-            return now + timedelta(hours=8)
-        elif 'four times' in frequency_lower:
-            return now + timedelta(hours=6)
-        elif 'every 6 hours' in frequency_lower:
-            return now + timedelta(hours=6)
-        elif 'every 8 hours' in frequency_lower:
-            return now + timedelta(hours=8)
-        else:
-            return now + timedelta(hours=8)  # Default
+        created = [row for row in rows if row is not None]
+        if created:
+            db.add_all(created)
+            db.flush()
+            SummaryService.apply_vitals(db, [row for row in created if isinstance(row, Vitals)])
+            medication_pks = {row.patient_id for row in created if isinstance(row, Medication)}
+            if medication_pks:
+                SummaryService.refresh_medications(db, medication_pks)
+            # Rows hold exactly what was written, so skip the per-row refresh
+            # that expiring them on commit would trigger
+            expire_on_commit = db.expire_on_commit
+            db.expire_on_commit = False
+            try:
+                db.commit()
+            finally:
+                db.expire_on_commit = expire_on_commit
+        
+        codes = {pk: patient_id for patient_id, pk in pks.items()}
+        for row in created:
+            if isinstance(row, Medication):
+                dose_scheduler.schedule(row.id, row.next_dose_time)
+            elif isinstance(row, Vitals):
+                _record_trend(row.patient_id, codes[row.patient_id], row)
+        
+        return rows
     
     @staticmethod
+    @timed("db.schedule_appointment")
     def schedule_appointment(db: Session, data: dict) -> Appointment:
         """Schedule appointment for patient"""
         patient = PatientService.get_patient_by_id(db, data.get('patient_id'))
@@ -140,62 +255,103 @@ class PatientService:
         )
         
         db.add(appointment)
+        db.flush()
+        SummaryService.refresh_appointments(db, [patient.id])
         db.commit()
         db.refresh(appointment)
         return appointment
     
     @staticmethod
-    def get_patient_full_record(db: Session, patient_id: str) -> dict:
-        """Get complete patient record"""
+    @timed("db.get_patient_full_record")
+    def get_patient_full_record(
+        db: Session,
+        patient_id: str,
+        vitals_limit: int = RECORD_LIMITS['vitals'],
+        diagnoses_limit: int = RECORD_LIMITS['diagnoses'],
+        medications_limit: int = RECORD_LIMITS['medications'],
+        appointments_limit: int = RECORD_LIMITS['appointments']
+    ) -> dict:
+        """
+        Get a patient's record summary: latest vitals, recent diagnoses,
+        active medications and upcoming appointments. Every section is
+        bounded so the cost doesn't grow with the patient's history.
+        """
+        patient = db.query(*HISTORY_FIELDS['patient']).filter(Patient.patient_id == patient_id).first()
+        if not patient:
+            return None
+        
+        patient = patient._asdict()
+        pk = patient.pop('id')
+        
+        vitals = db.query(*HISTORY_FIELDS['vitals']).filter(
+            Vitals.patient_id == pk
+        ).order_by(Vitals.recorded_at.desc()).limit(vitals_limit).all()
+        
+        diagnoses = db.query(*HISTORY_FIELDS['diagnoses']).filter(
+            Diagnosis.patient_id == pk
+        ).order_by(Diagnosis.diagnosed_at.desc()).limit(diagnoses_limit).all()
+        
+        medications = db.query(*HISTORY_FIELDS['medications']).filter(
+            Medication.patient_id == pk,
+            Medication.is_active == 1
+        ).order_by(Medication.next_dose_time).limit(medications_limit).all()
+        
+        appointments = db.query(*HISTORY_FIELDS['appointments']).filter(
+            Appointment.patient_id == pk,
+            Appointment.is_completed == 0,
+            Appointment.is_cancelled == 0,
+            Appointment.appointment_datetime >= datetime.utcnow()
+        ).order_by(Appointment.appointment_datetime).limit(appointments_limit).all()
+        
+        return {
+            'patient': patient,
+            'vitals': [row._asdict() for row in vitals],
+            'diagnoses': [row._asdict() for row in diagnoses],
+            'medications': [row._asdict() for row in medications],
+            'appointments': [row._asdict() for row in appointments]
+        }
+    
+    @staticmethod
+    @timed("db.get_patient_history")
+    def get_patient_history(db: Session, patient_id: str, section: str, limit: int = 50, offset: int = 0) -> dict:
+        """
+        Page through one section of a patient's full history, newest first
+        """
+        if section not in HISTORY_ORDERING:
+            raise ValueError(f"Unknown history section: {section}")
+        
         patient = PatientService.get_patient_by_id(db, patient_id)
         if not patient:
             return None
         
-        vitals = db.query(Vitals).filter(Vitals.patient_id == patient.id).order_by(Vitals.recorded_at.desc()).all()
-        diagnoses = db.query(Diagnosis).filter(Diagnosis.patient_id == patient.id).order_by(Diagnosis.diagnosed_at.desc()).all()
-        medications = db.query(Medication).filter(Medication.patient_id == patient.id).all()
-        appointments = db.query(Appointment).filter(Appointment.patient_id == patient.id).order_by(Appointment.appointment_datetime).all()
+        model, order_column = HISTORY_ORDERING[section]
+        limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+        
+        # Fetch one extra row to know whether another page exists
+        rows = db.query(*HISTORY_FIELDS[section]).filter(
+            model.patient_id == patient.id
+        ).order_by(order_column.desc(), model.id.desc()).offset(offset).limit(limit + 1).all()
         
         return {
-            'patient': {
-                'patient_id': patient.patient_id,
-                'name': patient.name,
-                'age': patient.age,
-                'gender': patient.gender,
-                'phone': patient.phone
-            },
-            'vitals': [
-                {
-                    'blood_pressure': v.blood_pressure,
-                    'temperature': v.temperature,
-                    'pulse': v.pulse,
-                    'respiratory_rate': v.respiratory_rate,
-                    'oxygen_saturation': v.oxygen_saturation,
-                    'recorded_at': v.recorded_at
-                } for v in vitals
-            ],
-            'diagnoses': [
-                {
-                    'doctor_name': d.doctor_name,
-                    'diagnosis': d.diagnosis,
-                    'diagnosed_at': d.diagnosed_at
-                } for d in diagnoses
-            ],
-            'medications': [
-                {
-                    'medication_name': m.medication_name,
-                    'dosage': m.dosage,
-                    'frequency': m.frequency,
-                    'route': m.route,
-                    'next_dose_time': m.next_dose_time,
-                    'is_active': m.is_active
-                } for m in medications
-            ],
-            'appointments': [
-                {
-                    'appointment_type': a.appointment_type,
-                    'appointment_datetime': a.appointment_datetime,
-                    'is_completed': a.is_completed
-                } for a in appointments
-            ]
-        }
\ No newline at end of file
+            'patient_id': patient.patient_id,
+            'section': section,
+            'items': [row._asdict() for row in rows[:limit]],
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if len(rows) > limit else None
+        }
+    
+    @staticmethod
+    def get_vitals_trend(db: Session, patient_id: str) -> dict:
+        """Rolling vitals trend and NEWS2 score for one patient (None if no recent vitals)"""
+        patient = PatientService.get_patient_by_id(db, patient_id)
+        if not patient:
+            return None
+        from app.services.trend_service import trend_engine
+        return trend_engine.patient_trend(db, patient.id)
+    
+    @staticmethod
+    def get_ward_scores(db: Session, limit: int = 20, min_score: int = 0) -> list:
+        """Patients with recent vitals, highest NEWS2 score first"""
+        from app.services.trend_service import trend_engine
+        return trend_engine.ward_scores(db, limit=max(1, min(limit, MAX_HISTORY_PAGE_SIZE)), min_score=min_score)
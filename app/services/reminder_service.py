@@ -1,96 +1,412 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.models.patient import Medication, Appointment
+from app.models.patient import Patient, Medication, Appointment, AppointmentReminder
 from app.database import SessionLocal
+from app.services.dose_scheduler import dose_scheduler
+from app.services.frequency import next_dose
+from app.services.scheduler_lease import LeaderLease, WORKER_ID
+from app.services.summary_service import SummaryService
+from app.services.telex_service import telex_service, TELEX_REMINDER_CHANNEL_ID
+from app.utils.metrics import observe, inc, sweep_seconds, sweep_rows_total
+from app.utils.log import get_logger, log_context, new_correlation_id
+from app.utils.ward_time import to_ward_time
 from datetime import datetime, timedelta
-import httpx
+import functools
+import logging
 import os
+import time
+import uuid
+
+logger = get_logger(__name__)
+
+# Due medications loaded and updated per batch in the reminder sweep
+SWEEP_BATCH_SIZE = int(os.getenv("REMINDER_SWEEP_BATCH_SIZE", "500"))
+
+# How often the in-memory dose timer is reconciled with the DB
+DOSE_SCHEDULE_RESYNC_MINUTES = int(os.getenv("DOSE_SCHEDULE_RESYNC_MINUTES", "60"))
+
+# Appointment reminder lead times in minutes (default: 24h and 1h before)
+APPOINTMENT_REMINDER_LEADS = [
+    int(minutes) for minutes in os.getenv("APPOINTMENT_REMINDER_LEADS", "1440,60").split(",") if minutes.strip()
+]
+
+# Minutes between appointment reminder sweeps
+APPOINTMENT_REMINDER_INTERVAL_MINUTES = int(os.getenv("APPOINTMENT_REMINDER_INTERVAL_MINUTES", "10"))
+
+# Seconds between catch-up sweeps for due doses no worker's timer sent
+# (e.g. claimed by a worker that died before sending)
+MEDICATION_CATCHUP_INTERVAL_SECONDS = int(os.getenv("MEDICATION_CATCHUP_INTERVAL_SECONDS", "60"))
+
+# How long a worker's claim on due doses lasts; if it dies before sending,
+# another worker picks the doses up after this
+REMINDER_CLAIM_LEASE_SECONDS = int(os.getenv("REMINDER_CLAIM_LEASE_SECONDS", "120"))
+
+# Only the holder of this lease runs the dose catch-up and appointment
+# sweeps; it is renewed every sweep, so it must outlast the interval
+# between appointment sweeps
+REMINDER_LEADER_TTL_SECONDS = int(os.getenv(
+    "REMINDER_LEADER_TTL_SECONDS", str(APPOINTMENT_REMINDER_INTERVAL_MINUTES * 60 * 5 // 2)
+))
 
 class ReminderService:
+    """
+    Medication and appointment reminders, safe to run in every uvicorn
+    worker and replica. Each worker keeps its own dose timer, but due
+    doses are claimed in the DB before they are sent, so every dose is
+    sent by exactly one worker and large sweeps are split between them.
+    The appointment sweep runs only on the worker holding its leader lease.
+    """
     
     def __init__(self):
+        # Imported here so importing app.main doesn't load APScheduler
+        from apscheduler.schedulers.background import BackgroundScheduler
+
         self.scheduler = BackgroundScheduler()
         self.scheduler.start()
+        self.sweep_stats = {}
+        self.sweep_lease = LeaderLease("reminder_sweeps", REMINDER_LEADER_TTL_SECONDS)
+    
+    @staticmethod
+    def due_medications_query(db: Session):
+        """Due-medication columns with the patient joined in (no lazy loads)"""
+        return db.query(
+            Medication.id,
+            Medication.patient_id.label('patient_pk'),
+            Medication.medication_name,
+            Medication.dosage,
+            Medication.route,
+            Medication.interval_minutes,
+            Medication.dose_times,
+            Medication.is_prn,
+            Medication.end_date,
+            Medication.next_dose_time,
+            Medication.claim_token,
+            Patient.name.label('patient_name'),
+            Patient.patient_id
+        ).join(Patient, Medication.patient_id == Patient.id).filter(
+            Medication.is_active == 1
+        )
+    
+    def claim_due_medications(self, db: Session, now: datetime, medication_ids: list = None) -> list:
+        """
+        Claim up to SWEEP_BATCH_SIZE due medications for this worker with one
+        UPDATE, and return them. Rows another worker is holding are skipped
+        (FOR UPDATE SKIP LOCKED on Postgres; SQLite runs one writer at a
+        time), so concurrent workers claim disjoint batches. Claims whose
+        lease has lapsed can be taken again.
+        """
+        token = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        candidates = select(Medication.id).where(
+            Medication.is_active == 1,
+            Medication.next_dose_time <= now,
+            or_(Medication.claimed_until.is_(None), Medication.claimed_until < now)
+        )
+        if medication_ids is not None:
+            candidates = candidates.where(Medication.id.in_(medication_ids))
+        candidates = candidates.order_by(Medication.id).limit(SWEEP_BATCH_SIZE).with_for_update(skip_locked=True)
+        
+        claimed = db.execute(
+            update(Medication)
+            .where(Medication.id.in_(candidates))
+            .values(claim_token=token, claimed_until=now + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return []
+        return self.due_medications_query(db).filter(
+            Medication.claim_token == token
+        ).order_by(Medication.id).all()
+    
+    def send_medication_batch(self, db: Session, due: list) -> int:
+        """
+        Advance next_dose_time for a batch of claimed medications and release
+        the claim with one bulk UPDATE and commit, then send their reminders
+        and re-arm the timer. Courses with no further doses are marked inactive.
+        Rows whose claim lapsed and was taken by another worker are dropped;
+        returns how many reminders were sent.
+        """
+        now = datetime.utcnow()
+        
+        # Confirm the claim is still ours and extend it, in the same
+        # transaction as the advance, so a worker that stalled past its
+        # lease can't send a dose another worker already sent
+        token = due[0].claim_token
+        held = set(db.execute(
+            update(Medication)
+            .where(Medication.claim_token == token, Medication.id.in_([med.id for med in due]))
+            .values(claimed_until=now + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS))
+            .returning(Medication.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all())
+        due = [med for med in due if med.id in held]
+        if not due:
+            db.rollback()
+            return 0
+        
+        next_doses = {
+            med.id: next_dose(med.interval_minutes, med.dose_times, med.is_prn, med.end_date, med.next_dose_time, now)
+            for med in due
+        }
+        
+        db.execute(update(Medication), [
+            {'id': med_id, 'next_dose_time': next_dose, 'is_active': 1 if next_dose else 0,
+             'claim_token': None, 'claimed_until': None}
+            for med_id, next_dose in next_doses.items()
+        ])
+        SummaryService.refresh_medications(db, {med.patient_pk for med in due})
+        db.commit()
+        
+        for med in due:
+            self.send_telex_message(self.format_medication_reminder(med))
+            dose_scheduler.schedule(med.id, next_doses[med.id])
+        return len(due)
+    
+    def send_due_medications(self, medication_ids: list):
+        """
+        Fire reminders for the medications the dose timer reports as due.
+        Every worker's timer fires; only the worker that claims a dose sends it.
+        """
+        started = time.perf_counter()
+        sent = 0
+        batches = 0
+        
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            for i in range(0, len(medication_ids), SWEEP_BATCH_SIZE):
+                due = self.claim_due_medications(db, now, medication_ids[i:i + SWEEP_BATCH_SIZE])
+                if due:
+                    sent += self.send_medication_batch(db, due)
+                    batches += 1
+        
+        finally:
+            db.close()
+            self.record_sweep('dose_timer', started, sent, batches)
     
     def check_medication_reminders(self):
-        """Check for due medications and send reminders"""
+        """
+        Catch-up sweep for every medication that is already due.
+        Claims due rows in batches with the patient columns joined in and
+        bulk-updates next_dose_time once per batch; workers sweeping at the
+        same time share the backlog instead of repeating it.
+        """
+        started = time.perf_counter()
+        sent = 0
+        batches = 0
+        
         db = SessionLocal()
         try:
             now = datetime.utcnow()
-            due_medications = db.query(Medication).filter(
-                Medication.is_active == 1,
-                Medication.next_dose_time <= now + timedelta(minutes=15)
-            ).all()
             
-            for med in due_medications:
-                patient = med.patient
-                message = f"🔔 **Medication Reminder**\n\n"
-                message += f"Patient: {patient.name} ({patient.patient_id})\n"
-                message += f"Medication: {med.medication_name} {med.dosage}\n"
-                message += f"Route: {med.route}\n"
-                message += f"Due: {med.next_dose_time.strftime('%I:%M %p')}"
+            while True:
+                due = self.claim_due_medications(db, now)
+                if not due:
+                    break
                 
-                self.send_telex_message(message)
-                
-                # Update next dose time
-                from app.services.patient_service import PatientService
-                med.next_dose_time = PatientService.calculate_next_dose(med.frequency)
-                db.commit()
+                sent += self.send_medication_batch(db, due)
+                batches += 1
         
         finally:
             db.close()
+            self.record_sweep('medication_reminders', started, sent, batches)
+    
+    def rebuild_dose_schedule(self):
+        """Reload the dose timer from the active medications in the DB"""
+        db = SessionLocal()
+        try:
+            entries = db.query(Medication.id, Medication.next_dose_time).filter(
+                Medication.is_active == 1,
+                Medication.next_dose_time.isnot(None)
+            ).all()
+            dose_scheduler.load(entries)
+            logger.info("Dose schedule loaded", extra={"fields": {"active_medications": len(dose_scheduler)}})
+        finally:
+            db.close()
+    
+    @staticmethod
+    def format_medication_reminder(med) -> str:
+        """Build the reminder text for a due medication row"""
+        message = f"🔔 **Medication Reminder**\n\n"
+        message += f"Patient: {med.patient_name} ({med.patient_id})\n"
+        message += f"Medication: {med.medication_name} {med.dosage}\n"
+        message += f"Route: {med.route}\n"
+        message += f"Due: {to_ward_time(med.next_dose_time).strftime('%I:%M %p')}"
+        return message
+    
+    def record_sweep(self, name: str, started: float, rows: int, batches: int):
+        """Keep timing stats for the last run of a sweep"""
+        duration_ms = (time.perf_counter() - started) * 1000
+        observe(sweep_seconds, duration_ms / 1000, sweep=name)
+        inc(sweep_rows_total, rows, sweep=name)
+        self.sweep_stats[name] = {
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+            'batches': batches,
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        # Frequent catch-up sweeps usually find nothing; keep those quiet
+        logger.log(logging.INFO if rows else logging.DEBUG, "Reminder sweep finished", extra={"fields": {
+            "sweep": name, "rows": rows, "batches": batches, "duration_ms": round(duration_ms, 1)
+        }})
+    
+    @staticmethod
+    def record_appointment_reminders(db: Session, appointment_ids: list, lead_minutes: int, now: datetime) -> set:
+        """
+        Record reminders as sent, skipping any another worker already
+        recorded, and return the appointment ids this call recorded
+        """
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        table = AppointmentReminder.__table__
+        recorded = db.execute(
+            insert(table)
+            .values([{'appointment_id': apt_id, 'lead_minutes': lead_minutes, 'sent_at': now} for apt_id in appointment_ids])
+            .on_conflict_do_nothing(index_elements=[table.c.appointment_id, table.c.lead_minutes])
+            .returning(table.c.appointment_id)
+        ).scalars().all()
+        db.commit()
+        return set(recorded)
     
     def check_appointment_reminders(self):
-        """Check for upcoming appointments"""
+        """
+        Send each appointment reminder once per lead time (e.g. 24h and 1h
+        before). Delivered reminders are recorded in appointment_reminders,
+        so the sweep only picks up ones that haven't been sent yet.
+        """
+        started = time.perf_counter()
+        sent = 0
+        batches = 0
+        
         db = SessionLocal()
         try:
             now = datetime.utcnow()
-            upcoming = db.query(Appointment).filter(
-                Appointment.is_completed == 0,
-                Appointment.appointment_datetime >= now,
-                Appointment.appointment_datetime <= now + timedelta(hours=24)
-            ).all()
+            handled = set()
             
-            for apt in upcoming:
-                patient = apt.patient
-                message = f"📅 **Appointment Reminder**\n\n"
-                message += f"Patient: {patient.name} ({patient.patient_id})\n"
-                message += f"Type: {apt.appointment_type}\n"
-                message += f"Time: {apt.appointment_datetime.strftime('%B %d, %Y at %I:%M %p')}\n"
-                if apt.notes:
-                    message += f"Notes: {apt.notes}"
+            # Shortest lead first: an appointment inside the 1h window gets the
+            # 1h reminder, and its longer-lead reminders are marked as covered
+            for lead_minutes in sorted(APPOINTMENT_REMINDER_LEADS):
+                already_sent = db.query(AppointmentReminder.id).filter(
+                    AppointmentReminder.appointment_id == Appointment.id,
+                    AppointmentReminder.lead_minutes == lead_minutes
+                ).exists()
+                
+                upcoming = db.query(
+                    Appointment.id,
+                    Appointment.appointment_type,
+                    Appointment.appointment_datetime,
+                    Appointment.notes,
+                    Patient.name.label('patient_name'),
+                    Patient.patient_id
+                ).join(Patient, Appointment.patient_id == Patient.id).filter(
+                    Appointment.is_completed == 0,
+                    Appointment.is_cancelled == 0,
+                    Appointment.appointment_datetime >= now,
+                    Appointment.appointment_datetime <= now + timedelta(minutes=lead_minutes),
+                    ~already_sent
+                ).order_by(Appointment.appointment_datetime).all()
                 
-                self.send_telex_message(message)
+                if not upcoming:
+                    continue
+                
+                # Record delivery before sending so a crash can't cause repeats;
+                # rows another worker recorded first (e.g. during a leader
+                # handover) are left to that worker
+                recorded = self.record_appointment_reminders(db, [apt.id for apt in upcoming], lead_minutes, now)
+                batches += 1
+                
+                for apt in upcoming:
+                    if apt.id in recorded and apt.id not in handled:
+                        self.send_telex_message(self.format_appointment_reminder(apt))
+                        handled.add(apt.id)
+                        sent += 1
+        
+            # Dashboard rows whose next appointment has passed move on to the following one
+            if SummaryService.refresh_passed_appointments(db, now):
+                db.commit()
         
         finally:
             db.close()
+            self.record_sweep('appointment_reminders', started, sent, batches)
+    
+    @staticmethod
+    def format_appointment_reminder(apt) -> str:
+        """Build the reminder text for an upcoming appointment row"""
+        message = f"📅 **Appointment Reminder**\n\n"
+        message += f"Patient: {apt.patient_name} ({apt.patient_id})\n"
+        message += f"Type: {apt.appointment_type}\n"
+        message += f"Time: {to_ward_time(apt.appointment_datetime).strftime('%B %d, %Y at %I:%M %p')}\n"
+        if apt.notes:
+            message += f"Notes: {apt.notes}"
+        return message
     
     def send_telex_message(self, message: str):
-        """Send message to Telex"""
+        """Queue a reminder for Telex delivery (returns immediately)"""
         try:
-            # This will be implemented when we integrate Telex
-            # For now, just print
-            print(f"[REMINDER] {message}")
-            # TODO: Implement actual Telex API call
+            if TELEX_REMINDER_CHANNEL_ID and telex_service.enqueue(TELEX_REMINDER_CHANNEL_ID, message, coalesce=True):
+                return
+            # No reminder channel configured or delivery not running
+            logger.info("Reminder not delivered: no Telex reminder channel", extra={"fields": {"reminder": message}})
         except Exception as e:
-            print(f"Error sending reminder: {e}")
+            logger.error("Error sending reminder", extra={"fields": {"error": type(e).__name__}})
+    
+    @staticmethod
+    def when_leader(lease: LeaderLease, func):
+        """Run a job only on the worker holding `lease`, renewing it each run"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if lease.acquire():
+                return func(*args, **kwargs)
+        return wrapper
+    
+    @staticmethod
+    def with_correlation_id(prefix: str, func):
+        """Run each background job invocation under its own correlation ID"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with log_context(new_correlation_id(prefix)):
+                return func(*args, **kwargs)
+        return wrapper
     
     def start(self):
         """Start scheduled tasks"""
-        # Check medication reminders every 15 minutes
+        # Medication reminders fire at their exact due time from the dose timer
+        dose_scheduler.start(self.with_correlation_id("dose-", self.send_due_medications))
+        self.rebuild_dose_schedule()
+        
+        # Catch up on due doses the timers missed, e.g. ones claimed by a
+        # worker that died before sending. Only the lease holder runs it, so
+        # extra workers don't each add a claim query a minute
         self.scheduler.add_job(
-            self.check_medication_reminders,
+            self.with_correlation_id("catchup-", self.when_leader(self.sweep_lease, self.check_medication_reminders)),
             'interval',
-            minutes=15,
-            id='medication_reminders'
+            seconds=MEDICATION_CATCHUP_INTERVAL_SECONDS,
+            id='medication_catchup'
         )
         
-        # Check appointment reminders every hour
+        # Periodically resync the timer with the DB (e.g. edits made elsewhere)
         self.scheduler.add_job(
-            self.check_appointment_reminders,
+            self.with_correlation_id("resync-", self.rebuild_dose_schedule),
             'interval',
-            hours=1,
+            minutes=DOSE_SCHEDULE_RESYNC_MINUTES,
+            id='dose_schedule_resync'
+        )
+        
+        # Check for unsent appointment reminders (lease holder only)
+        self.scheduler.add_job(
+            self.with_correlation_id("sweep-", self.when_leader(self.sweep_lease, self.check_appointment_reminders)),
+            'interval',
+            minutes=APPOINTMENT_REMINDER_INTERVAL_MINUTES,
             id='appointment_reminders'
         )
         
-        print("✅ Reminder service started")
\ No newline at end of file
+        logger.info("Reminder service started")
+    
+    def stop(self):
+        """Stop the dose timer and scheduled tasks, and hand leadership on"""
+        dose_scheduler.stop()
+        self.scheduler.shutdown()
+        try:
+            self.sweep_lease.release()
+        except Exception:
+            logger.exception("Error releasing scheduler lease")
@@ -0,0 +1,81 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app.database import engine as default_engine
+from app.models.lease import SchedulerLease
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Identifies this process among uvicorn workers and replicas
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """
+    A named lock row with an expiry, so one worker out of many runs a job.
+
+    acquire() takes the lease when it is free or expired, or renews it
+    when this worker already holds it, with a single conditional UPDATE;
+    calling it on every run doubles as the heartbeat. If the holder dies,
+    another worker takes over once `ttl_seconds` have passed.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, owner: str = WORKER_ID, engine=default_engine):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = owner
+        self.engine = engine
+        self.held = False
+
+    def _ensure_lease(self):
+        """Create the lease row the first time this lease is used"""
+        try:
+            with self.engine.begin() as conn:
+                exists = conn.execute(
+                    select(SchedulerLease.name).where(SchedulerLease.name == self.name)
+                ).first()
+                if not exists:
+                    conn.execute(SchedulerLease.__table__.insert().values(name=self.name))
+        except IntegrityError:
+            # Another worker created it first
+            pass
+
+    def acquire(self) -> bool:
+        """Take or renew the lease; True if this worker holds it"""
+        self._ensure_lease()
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(
+                        SchedulerLease.owner == self.owner,
+                        SchedulerLease.owner.is_(None),
+                        SchedulerLease.expires_at < now
+                    )
+                )
+                .values(owner=self.owner, expires_at=now + self.ttl)
+            )
+        held = result.rowcount == 1
+        if held != self.held:
+            logger.info("Scheduler lease acquired" if held else "Scheduler lease lost",
+                        extra={"fields": {"lease": self.name, "worker": self.owner}})
+        self.held = held
+        return held
+
+    def release(self):
+        """Give the lease up so another worker can take it straight away"""
+        if not self.held:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.owner == self.owner)
+                .values(owner=None, expires_at=None)
+            )
+        self.held = False
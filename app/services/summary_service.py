@@ -0,0 +1,178 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.patient import Patient, Vitals, Medication, Appointment
+from app.models.summary import PatientSummary
+from app.utils.metrics import timed
+from datetime import datetime
+
+VITALS_FIELDS = ('blood_pressure', 'systolic_bp', 'diastolic_bp', 'temperature', 'pulse',
+                 'respiratory_rate', 'oxygen_saturation')
+
+DASHBOARD_SORTS = {
+    'patient': (Patient.id,),
+    'next_dose': (PatientSummary.next_dose_time.is_(None), PatientSummary.next_dose_time, Patient.id),
+    'next_appointment': (PatientSummary.next_appointment_at.is_(None), PatientSummary.next_appointment_at, Patient.id),
+}
+
+MAX_DASHBOARD_PAGE_SIZE = 200
+
+class SummaryService:
+    """
+    Maintains patient_summaries, the ward dashboard's read model. Each
+    write path updates only the affected patients' rows, inside its own
+    transaction, so the dashboard never touches vitals/medication/
+    appointment history.
+    """
+
+    @staticmethod
+    def _summaries_for(db: Session, patient_pks) -> dict:
+        """Existing summary rows for the patients, creating any that are missing"""
+        patient_pks = set(patient_pks)
+        summaries = {
+            s.patient_id: s for s in
+            db.query(PatientSummary).filter(PatientSummary.patient_id.in_(patient_pks)).all()
+        } if patient_pks else {}
+        for pk in patient_pks - summaries.keys():
+            summaries[pk] = PatientSummary(patient_id=pk, active_medications=0)
+            db.add(summaries[pk])
+        return summaries
+
+    @staticmethod
+    def apply_vitals(db: Session, vitals_rows: list):
+        """Record newly flushed vitals rows as each patient's latest reading"""
+        latest = {}
+        for row in vitals_rows:
+            current = latest.get(row.patient_id)
+            if current is None or row.recorded_at >= current.recorded_at:
+                latest[row.patient_id] = row
+
+        summaries = SummaryService._summaries_for(db, latest)
+        for pk, row in latest.items():
+            summary = summaries[pk]
+            if summary.last_vitals_at and summary.last_vitals_at > row.recorded_at:
+                continue
+            summary.last_vitals_at = row.recorded_at
+            for field in VITALS_FIELDS:
+                setattr(summary, field, getattr(row, field))
+
+    @staticmethod
+    def refresh_vitals(db: Session, patient_pks=None):
+        """Recompute latest vitals from the DB (one windowed query)"""
+        position = func.row_number().over(
+            partition_by=Vitals.patient_id,
+            order_by=(Vitals.recorded_at.desc(), Vitals.id.desc())
+        ).label('position')
+        query = db.query(Vitals.patient_id, Vitals.recorded_at, *[getattr(Vitals, f) for f in VITALS_FIELDS], position)
+        if patient_pks is not None:
+            query = query.filter(Vitals.patient_id.in_(patient_pks))
+        recent = query.subquery()
+        rows = db.query(recent).filter(recent.c.position == 1).all()
+
+        summaries = SummaryService._summaries_for(db, [row.patient_id for row in rows])
+        for row in rows:
+            summary = summaries[row.patient_id]
+            summary.last_vitals_at = row.recorded_at
+            for field in VITALS_FIELDS:
+                setattr(summary, field, getattr(row, field))
+
+    @staticmethod
+    @timed("db.refresh_medication_summaries")
+    def refresh_medications(db: Session, patient_pks=None):
+        """Recompute active medication count and next due dose for the patients"""
+        position = func.row_number().over(
+            partition_by=Medication.patient_id,
+            order_by=(Medication.next_dose_time.is_(None), Medication.next_dose_time, Medication.id)
+        ).label('position')
+        count = func.count().over(partition_by=Medication.patient_id).label('active')
+        query = db.query(
+            Medication.patient_id, Medication.medication_name, Medication.next_dose_time, position, count
+        ).filter(Medication.is_active == 1)
+        if patient_pks is not None:
+            query = query.filter(Medication.patient_id.in_(patient_pks))
+        ranked = query.subquery()
+        rows = {row.patient_id: row for row in db.query(ranked).filter(ranked.c.position == 1).all()}
+
+        summaries = SummaryService._summaries_for(db, rows.keys() if patient_pks is None else patient_pks)
+        for pk, summary in summaries.items():
+            row = rows.get(pk)
+            summary.active_medications = row.active if row else 0
+            summary.next_dose_time = row.next_dose_time if row else None
+            summary.next_dose_medication = row.medication_name if row and row.next_dose_time else None
+
+    @staticmethod
+    @timed("db.refresh_appointment_summaries")
+    def refresh_appointments(db: Session, patient_pks=None):
+        """Recompute the next upcoming appointment for the patients"""
+        position = func.row_number().over(
+            partition_by=Appointment.patient_id,
+            order_by=(Appointment.appointment_datetime, Appointment.id)
+        ).label('position')
+        query = db.query(
+            Appointment.patient_id, Appointment.appointment_type, Appointment.appointment_datetime, position
+        ).filter(
+            Appointment.is_completed == 0,
+            Appointment.is_cancelled == 0,
+            Appointment.appointment_datetime >= datetime.utcnow()
+        )
+        if patient_pks is not None:
+            query = query.filter(Appointment.patient_id.in_(patient_pks))
+        ranked = query.subquery()
+        rows = {row.patient_id: row for row in db.query(ranked).filter(ranked.c.position == 1).all()}
+
+        summaries = SummaryService._summaries_for(db, rows.keys() if patient_pks is None else patient_pks)
+        for pk, summary in summaries.items():
+            row = rows.get(pk)
+            summary.next_appointment_at = row.appointment_datetime if row else None
+            summary.next_appointment_type = row.appointment_type if row else None
+
+    @staticmethod
+    def refresh_passed_appointments(db: Session, now: datetime = None) -> int:
+        """Move summaries whose next appointment is now in the past on to the following one"""
+        now = now or datetime.utcnow()
+        pks = [row.patient_id for row in db.query(PatientSummary.patient_id).filter(
+            PatientSummary.next_appointment_at < now
+        ).all()]
+        if pks:
+            SummaryService.refresh_appointments(db, pks)
+        return len(pks)
+
+    @staticmethod
+    def rebuild(db: Session):
+        """Recompute every summary from history (used by the backfill migration)"""
+        SummaryService.refresh_vitals(db)
+        db.flush()
+        SummaryService.refresh_medications(db)
+        db.flush()
+        SummaryService.refresh_appointments(db)
+        db.flush()
+
+    @staticmethod
+    @timed("db.get_dashboard")
+    def get_dashboard(db: Session, limit: int = 50, offset: int = 0, sort: str = 'patient') -> dict:
+        """One page of the ward dashboard: a single indexed join, no history scans"""
+        if sort not in DASHBOARD_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        limit = max(1, min(limit, MAX_DASHBOARD_PAGE_SIZE))
+
+        rows = db.query(
+            Patient.patient_id, Patient.name,
+            PatientSummary.last_vitals_at, *[getattr(PatientSummary, f) for f in VITALS_FIELDS],
+            PatientSummary.active_medications, PatientSummary.next_dose_time, PatientSummary.next_dose_medication,
+            PatientSummary.next_appointment_at, PatientSummary.next_appointment_type
+        ).outerjoin(
+            PatientSummary, PatientSummary.patient_id == Patient.id
+        ).order_by(*DASHBOARD_SORTS[sort]).offset(offset).limit(limit + 1).all()
+
+        items = []
+        for row in rows[:limit]:
+            item = row._asdict()
+            item['active_medications'] = item['active_medications'] or 0
+            items.append(item)
+
+        return {
+            'patients': items,
+            'sort': sort,
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if len(rows) > limit else None
+        }
@@ -1,55 +1,242 @@
-import httpx
+import asyncio
+import importlib.util
 import os
+import random
+from dataclasses import dataclass
 from dotenv import load_dotenv
+from app.utils.log import get_logger, correlation_id, log_context
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# Outbound delivery settings
+TELEX_MAX_CONCURRENCY = int(os.getenv("TELEX_MAX_CONCURRENCY", "8"))  # parallel sends
+TELEX_QUEUE_SIZE = int(os.getenv("TELEX_QUEUE_SIZE", "10000"))  # pending messages before new ones are dropped
+TELEX_MAX_RETRIES = int(os.getenv("TELEX_MAX_RETRIES", "4"))
+TELEX_BACKOFF_BASE = float(os.getenv("TELEX_BACKOFF_BASE", "0.5"))  # seconds
+TELEX_BACKOFF_CAP = float(os.getenv("TELEX_BACKOFF_CAP", "30"))  # seconds
+TELEX_COALESCE_WINDOW = float(os.getenv("TELEX_COALESCE_WINDOW", "2"))  # seconds, 0 disables coalescing
+TELEX_COALESCE_MAX = int(os.getenv("TELEX_COALESCE_MAX", "20"))  # reminders per combined message
+TELEX_REMINDER_CHANNEL_ID = os.getenv("TELEX_REMINDER_CHANNEL_ID")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_httpx = None
+
+
+def _load_httpx():
+    """httpx, imported when the first message is sent rather than at app import"""
+    global _httpx
+    if _httpx is None:
+        import httpx
+        _httpx = httpx
+    return _httpx
+
+
+@dataclass
+class OutboundMessage:
+    channel_id: str
+    text: str
+    attempts: int = 0
+    correlation_id: str = "-"  # request or sweep that produced the message
+
+
 class TelexService:
-    
-    def __init__(self):
-        self.api_url = os.getenv("TELEX_API_URL", "https://api.telex.im")
-        self.bot_token = os.getenv("TELEX_BOT_TOKEN")
-    
+    """
+    Outbound Telex delivery.
+
+    One long-lived pooled HTTP client (keep-alive, HTTP/2 when the h2
+    package is installed) is shared by every send. Queued messages are
+    delivered by a fixed number of worker tasks, retried with jittered
+    exponential backoff on 429/5xx, and reminders for the same channel
+    can be coalesced into one message.
+    """
+
+    def __init__(self, api_url: str = None, bot_token: str = None):
+        self.api_url = api_url or os.getenv("TELEX_API_URL", "https://api.telex.im")
+        self.bot_token = bot_token or os.getenv("TELEX_BOT_TOKEN")
+        self._client = None
+        self._queue = None
+        self._loop = None
+        self._workers = []
+        self._pending = {}  # channel_id -> reminders waiting to be coalesced
+        self.stats_counters = {
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'dropped': 0,
+            'coalesced': 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def client(self):
+        if self._client is None:
+            httpx = _load_httpx()
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={
+                    "Authorization": f"Bearer {self.bot_token}",
+                    "Content-Type": "application/json"
+                },
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(
+                    max_connections=TELEX_MAX_CONCURRENCY,
+                    max_keepalive_connections=TELEX_MAX_CONCURRENCY
+                ),
+                timeout=10.0
+            )
+        return self._client
+
+    async def start(self):
+        """Start the delivery workers on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=TELEX_QUEUE_SIZE)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"telex-sender-{i}")
+            for i in range(TELEX_MAX_CONCURRENCY)
+        ]
+
+    async def stop(self, timeout: float = 5.0):
+        """Flush pending reminders, give queued messages a moment to drain, then close"""
+        if self.running:
+            for channel_id in list(self._pending):
+                self._flush(channel_id)
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Telex queue not drained on shutdown", extra={"fields": {"pending": self._queue.qsize()}})
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            self._loop = None
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def enqueue(self, channel_id: str, message: str, coalesce: bool = False) -> bool:
+        """
+        Queue a message for delivery and return immediately.
+        Safe to call from any thread (e.g. the reminder scheduler).
+        """
+        if not self.running:
+            return False
+
+        request_id = correlation_id.get()
+        if coalesce and TELEX_COALESCE_WINDOW > 0:
+            self._loop.call_soon_threadsafe(self._add_pending, channel_id, message, request_id)
+        else:
+            self._loop.call_soon_threadsafe(self._put, OutboundMessage(channel_id, message, correlation_id=request_id))
+        return True
+
+    def _put(self, item: OutboundMessage):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Backpressure: shed new messages rather than grow without bound
+            self.stats_counters['dropped'] += 1
+            logger.warning("Telex queue full, dropping message", extra={"fields": {"channel_id": item.channel_id}})
+
+    def _add_pending(self, channel_id: str, message: str, request_id: str = "-"):
+        pending = self._pending.setdefault(channel_id, [])
+        pending.append((message, request_id))
+        if len(pending) == 1:
+            self._loop.call_later(TELEX_COALESCE_WINDOW, self._flush, channel_id)
+        elif len(pending) >= TELEX_COALESCE_MAX:
+            self._flush(channel_id)
+
+    def _flush(self, channel_id: str):
+        messages = self._pending.pop(channel_id, None)
+        if not messages:
+            return
+        if len(messages) > 1:
+            self.stats_counters['coalesced'] += len(messages) - 1
+        # A combined message is logged under the first reminder's correlation ID
+        self._put(OutboundMessage(
+            channel_id,
+            "\n\n---\n\n".join(text for text, _ in messages),
+            correlation_id=messages[0][1]
+        ))
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                with log_context(item.correlation_id):
+                    await self.send_message(item.channel_id, item.text)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def backoff_delay(attempt: int, retry_after: str = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        if retry_after:
+            try:
+                return min(float(retry_after), TELEX_BACKOFF_CAP)
+            except ValueError:
+                pass
+        return random.uniform(0, min(TELEX_BACKOFF_CAP, TELEX_BACKOFF_BASE * (2 ** attempt)))
+
+    async def post(self, path: str, payload: dict):
+        """POST with retries on 429/5xx and transport errors"""
+        httpx = _load_httpx()
+        for attempt in range(TELEX_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                response = await self.client.post(path, json=payload)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                retry_after = response.headers.get("Retry-After")
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                # The exception text can echo request details; the type is enough
+                error = type(e).__name__
+
+            if attempt == TELEX_MAX_RETRIES:
+                logger.warning("Telex request failed", extra={"fields": {"path": path, "attempts": attempt + 1, "error": error}})
+                raise RuntimeError(f"giving up after {attempt + 1} attempts: {error}")
+
+            self.stats_counters['retried'] += 1
+            await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+
     async def send_message(self, channel_id: str, message: str):
         """Send message to Telex channel"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/messages",
-                    headers={
-                        "Authorization": f"Bearer {self.bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "channel_id": channel_id,
-                        "text": message
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            result = await self.post("/messages", {
+                "channel_id": channel_id,
+                "text": message
+            })
+            self.stats_counters['sent'] += 1
+            return result
         except Exception as e:
-            print(f"Error sending Telex message: {e}")
+            self.stats_counters['failed'] += 1
+            logger.error("Error sending Telex message", extra={"fields": {"channel_id": channel_id, "error": type(e).__name__}})
             return None
-    
+
     async def register_webhook(self, webhook_url: str):
         """Register webhook with Telex"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/webhooks",
-                    headers={
-                        "Authorization": f"Bearer {self.bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "url": webhook_url,
-                        "events": ["message.created"]
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self.post("/webhooks", {
+                "url": webhook_url,
+                "events": ["message.created"]
+            })
         except Exception as e:
-            print(f"Error registering webhook: {e}")
-            return None
\ No newline at end of file
+            logger.error("Error registering webhook", extra={"fields": {"error": type(e).__name__}})
+            return None
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counters,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'pending_coalesce': sum(len(m) for m in self._pending.values())
+        }
+
+
+telex_service = TelexService()
@@ -0,0 +1,274 @@
+"""
+Vitals trends and NEWS2 early-warning scores.
+
+The engine keeps each patient's last TREND_WINDOW readings in columnar
+NumPy arrays (patients x readings x parameters, oldest first). The ward
+is loaded from the DB once with a single windowed query; after that each
+recorded vitals row shifts one patient's window in place, so scores are
+never recomputed from full history. Rolling means, least-squares slopes
+and NEWS2 scores are computed for the whole ward in one vectorized pass.
+
+NEWS2 here covers the parameters we chart (respiration rate, SpO2 on
+scale 1, systolic BP, pulse, temperature). Consciousness (ACVPU) and
+supplemental oxygen aren't recorded, so they always score 0.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.patient import Patient, Vitals
+from app.utils.metrics import timed
+
+# Readings per patient kept for rolling means and slopes
+TREND_WINDOW = int(os.getenv("TREND_WINDOW", "12"))
+
+# Only readings this recent count towards the trend (and the score)
+TREND_LOOKBACK_HOURS = int(os.getenv("TREND_LOOKBACK_HOURS", "72"))
+
+# Reload from the DB after this long, to pick up rows other workers wrote
+TREND_RELOAD_SECONDS = int(os.getenv("TREND_RELOAD_SECONDS", "300"))
+
+_EPOCH = datetime(1970, 1, 1)
+
+PARAMETERS = ('respiratory_rate', 'oxygen_saturation', 'systolic_bp', 'pulse', 'temperature')
+
+# Per parameter: inclusive upper bounds of each band and the band scores (NEWS2)
+NEWS2_BANDS = {
+    'respiratory_rate': ([8, 11, 20, 24], [3, 1, 0, 2, 3]),
+    'oxygen_saturation': ([91, 93, 95], [3, 2, 1, 0]),
+    'systolic_bp': ([90, 100, 110, 219], [3, 2, 1, 0, 3]),
+    'pulse': ([40, 50, 90, 110, 130], [3, 1, 0, 1, 2, 3]),
+    'temperature': ([35.0, 36.0, 38.0, 39.0], [3, 1, 0, 1, 2]),
+}
+
+_EDGES = [np.asarray(NEWS2_BANDS[p][0], dtype=float) for p in PARAMETERS]
+_SCORES = [np.asarray(NEWS2_BANDS[p][1], dtype=np.int8) for p in PARAMETERS]
+
+
+def news2_components(latest: np.ndarray) -> np.ndarray:
+    """Per-parameter NEWS2 scores for an (n, len(PARAMETERS)) array; missing values score 0"""
+    components = np.zeros(latest.shape, dtype=np.int8)
+    for j in range(len(PARAMETERS)):
+        column = latest[:, j]
+        present = ~np.isnan(column)
+        components[present, j] = _SCORES[j][np.searchsorted(_EDGES[j], column[present], side='left')]
+    return components
+
+
+def news2_risk(total: int, max_component: int) -> str:
+    """NEWS2 clinical risk band"""
+    if total >= 7:
+        return "high"
+    if total >= 5:
+        return "medium"
+    if max_component >= 3:
+        return "low-medium"
+    return "low"
+
+
+def window_stats(values: np.ndarray, times: np.ndarray):
+    """
+    Latest observed value, mean and slope (per hour) for each patient and
+    parameter. values is (n, window, params) with NaN gaps, times is
+    (n, window) in epoch seconds, oldest first.
+    """
+    observed = ~np.isnan(values)
+    counts = observed.sum(axis=1)
+
+    # Latest observed value: index of the last non-NaN reading per parameter
+    positions = np.where(observed, np.arange(values.shape[1])[None, :, None], -1)
+    last = positions.max(axis=1)
+    rows = np.arange(values.shape[0])[:, None]
+    latest = np.where(last >= 0, values[rows, np.maximum(last, 0), np.arange(values.shape[2])[None, :]], np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=1) / counts
+        mean[counts == 0] = np.nan
+
+        hours = np.broadcast_to((times / 3600.0)[:, :, None], values.shape)
+        hours = np.where(observed, hours, 0.0)
+        filled = np.where(observed, values, 0.0)
+        hour_mean = hours.sum(axis=1) / counts
+        dx = np.where(observed, hours - hour_mean[:, None, :], 0.0)
+        dy = np.where(observed, filled - mean[:, None, :], 0.0)
+        denominator = (dx * dx).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / denominator
+        slope[(counts < 2) | (denominator == 0)] = np.nan
+
+    return latest, mean, slope
+
+
+def _seconds(value: datetime) -> float:
+    """Naive UTC datetime -> epoch seconds"""
+    return (value - _EPOCH).total_seconds()
+
+
+class TrendEngine:
+    """In-memory columnar vitals windows for every patient with recent readings"""
+
+    def __init__(self, window: int = TREND_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._rows = {}  # patient pk -> row in the arrays
+        self._patient_ids = []  # row -> "PT..." id
+        self._values = np.full((0, window, len(PARAMETERS)), np.nan)
+        self._times = np.full((0, window), np.nan)
+        self._loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < TREND_RELOAD_SECONDS
+
+    def _grow(self, rows: int):
+        capacity = self._values.shape[0]
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 64)
+        values = np.full((capacity, self.window, len(PARAMETERS)), np.nan)
+        times = np.full((capacity, self.window), np.nan)
+        values[:self._values.shape[0]] = self._values
+        times[:self._times.shape[0]] = self._times
+        self._values, self._times = values, times
+
+    def _row_for(self, patient_pk: int, patient_id: str) -> int:
+        row = self._rows.get(patient_pk)
+        if row is None:
+            row = len(self._patient_ids)
+            self._grow(row + 1)
+            self._rows[patient_pk] = row
+            self._patient_ids.append(patient_id)
+        return row
+
+    @timed("trends.load")
+    def load(self, db: Session):
+        """Load the last `window` readings of every patient with one windowed query"""
+        since = datetime.utcnow() - timedelta(hours=TREND_LOOKBACK_HOURS)
+        position = func.row_number().over(
+            partition_by=Vitals.patient_id,
+            order_by=Vitals.recorded_at.desc()
+        ).label('position')
+        recent = db.query(
+            Vitals.patient_id, Vitals.recorded_at, position,
+            *[getattr(Vitals, p) for p in PARAMETERS]
+        ).filter(Vitals.recorded_at >= since).subquery()
+
+        rows = db.query(recent, Patient.patient_id.label('patient_code')).join(
+            Patient, Patient.id == recent.c.patient_id
+        ).filter(recent.c.position <= self.window).all()
+
+        with self._lock:
+            self._rows, self._patient_ids = {}, []
+            self._values = np.full((0, self.window, len(PARAMETERS)), np.nan)
+            self._times = np.full((0, self.window), np.nan)
+            if rows:
+                pks = np.fromiter((r.patient_id for r in rows), dtype=np.int64, count=len(rows))
+                unique_pks, first = np.unique(pks, return_index=True)
+                self._grow(len(unique_pks))
+                for pk, index in zip(unique_pks.tolist(), first.tolist()):
+                    self._rows[pk] = len(self._patient_ids)
+                    self._patient_ids.append(rows[index].patient_code)
+
+                target = np.searchsorted(unique_pks, pks)
+                # position 1 is the newest reading, stored in the last slot
+                slot = self.window - np.fromiter((r.position for r in rows), dtype=np.int64, count=len(rows))
+                self._times[target, slot] = [_seconds(r.recorded_at) for r in rows]
+                self._values[target, slot] = np.array(
+                    [[np.nan if getattr(r, p) is None else getattr(r, p) for p in PARAMETERS] for r in rows],
+                    dtype=float
+                )
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.load(db)
+
+    def record(self, patient_pk: int, patient_id: str, vitals):
+        """Shift a newly recorded reading into the patient's window (O(window))"""
+        if self._loaded_at is None or vitals.recorded_at is None:
+            # Not loaded in this process yet; the first load picks it up
+            return
+        reading = [np.nan if getattr(vitals, p) is None else getattr(vitals, p) for p in PARAMETERS]
+        with self._lock:
+            row = self._row_for(patient_pk, patient_id)
+            self._values[row, :-1] = self._values[row, 1:]
+            self._times[row, :-1] = self._times[row, 1:]
+            self._values[row, -1] = reading
+            self._times[row, -1] = _seconds(vitals.recorded_at)
+
+    def _snapshot(self, rows=None):
+        with self._lock:
+            count = len(self._patient_ids)
+            if rows is None:
+                rows = np.arange(count)
+            return self._values[rows].copy(), self._times[rows].copy(), [self._patient_ids[r] for r in rows]
+
+    @staticmethod
+    def _summaries(values, times, patient_ids) -> list:
+        latest, mean, slope = window_stats(values, times)
+        components = news2_components(latest)
+        totals = components.sum(axis=1).tolist()
+        worst = components.max(axis=1).tolist()
+        readings = (~np.isnan(times)).sum(axis=1).tolist()
+        with np.errstate(invalid='ignore'):
+            newest = np.nanmax(np.where(np.isnan(times), -np.inf, times), axis=1).tolist()
+
+        # Plain Python lists from here on; per-element NumPy indexing is slow
+        latest = np.round(latest, 1).tolist()
+        mean = np.round(mean, 1).tolist()
+        slope = np.round(slope, 3).tolist()
+        components = components.tolist()
+
+        def named(row):
+            return {p: (None if v != v else v) for p, v in zip(PARAMETERS, row)}
+
+        summaries = []
+        for i, patient_id in enumerate(patient_ids):
+            summaries.append({
+                'patient_id': patient_id,
+                'news2': {
+                    'score': totals[i],
+                    'risk': news2_risk(totals[i], worst[i]),
+                    'components': dict(zip(PARAMETERS, components[i]))
+                },
+                'readings': readings[i],
+                'latest': named(latest[i]),
+                'mean': named(mean[i]),
+                'slope_per_hour': named(slope[i]),
+                'as_of': (_EPOCH + timedelta(seconds=newest[i])).isoformat() if newest[i] != float('-inf') else None
+            })
+        return summaries
+
+    @timed("trends.patient")
+    def patient_trend(self, db: Session, patient_pk: int) -> dict:
+        """Trend and score for one patient, or None without recent vitals"""
+        self.ensure_loaded(db)
+        row = self._rows.get(patient_pk)
+        if row is None:
+            return None
+        return self._summaries(*self._snapshot([row]))[0]
+
+    @timed("trends.ward")
+    def ward_scores(self, db: Session, limit: int = 20, min_score: int = 0) -> list:
+        """Patients with recent vitals, highest NEWS2 score first"""
+        self.ensure_loaded(db)
+        values, times, patient_ids = self._snapshot()
+        if not patient_ids:
+            return []
+
+        latest, _, _ = window_stats(values, times)
+        components = news2_components(latest)
+        totals = components.sum(axis=1)
+        # Rank on score, ties broken by the single worst parameter
+        order = np.lexsort((-components.max(axis=1), -totals))
+        selected = [i for i in order[:limit] if totals[i] >= min_score]
+        if not selected:
+            return []
+        return self._summaries(values[selected], times[selected], [patient_ids[i] for i in selected])
+
+
+trend_engine = TrendEngine()
@@ -0,0 +1,89 @@
+"""
+Vitals parsing and validation at ingestion.
+
+Blood pressure arrives as free text ("120/80"); it is split into integer
+systolic/diastolic values so BP can be filtered and aggregated in SQL,
+while the original string is kept for display. Every numeric vital is
+checked against a plausible range so typos ("BP 1200/80", "temp 377")
+are rejected instead of charted.
+"""
+import re
+from typing import Optional, Tuple
+
+# Plausible (not normal) ranges; anything outside is treated as a typo
+VITAL_RANGES = {
+    'systolic_bp': (50, 300),
+    'diastolic_bp': (20, 200),
+    'temperature': (25.0, 45.0),
+    'pulse': (20, 300),
+    'respiratory_rate': (4, 80),
+    'oxygen_saturation': (50.0, 100.0),
+}
+
+_VITAL_TYPES = {
+    'temperature': float,
+    'pulse': int,
+    'respiratory_rate': int,
+    'oxygen_saturation': float,
+}
+
+_BP_RE = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})\s*(?:mm\s*hg)?\s*$", re.IGNORECASE)
+
+
+class VitalsValidationError(ValueError):
+    """Raised when submitted vitals are malformed or out of range"""
+
+
+def parse_blood_pressure(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """"120/80" -> (120, 80); (None, None) for an empty value. Raises ValueError if malformed."""
+    if value is None or not str(value).strip():
+        return None, None
+    match = _BP_RE.match(str(value))
+    if not match:
+        raise ValueError(f"blood pressure '{value}' should look like 120/80")
+    return int(match.group(1)), int(match.group(2))
+
+
+def normalize_vitals(data: dict) -> dict:
+    """
+    Copy of `data` with numeric vitals coerced, systolic_bp/diastolic_bp
+    filled in from blood_pressure (which is left as entered), and
+    everything range-checked.
+    Raises VitalsValidationError listing every problem found.
+    """
+    cleaned = dict(data)
+    problems = []
+
+    for field, cast in _VITAL_TYPES.items():
+        value = cleaned.get(field)
+        if value is None or value == "":
+            cleaned[field] = None
+            continue
+        try:
+            cleaned[field] = cast(float(value)) if cast is int else cast(value)
+        except (TypeError, ValueError):
+            problems.append(f"{field.replace('_', ' ')} '{value}' is not a number")
+            cleaned[field] = None
+
+    try:
+        systolic, diastolic = parse_blood_pressure(cleaned.get('blood_pressure'))
+    except ValueError as e:
+        problems.append(str(e))
+        systolic, diastolic = None, None
+    cleaned['systolic_bp'] = systolic
+    cleaned['diastolic_bp'] = diastolic
+    # blood_pressure stays as the nurse entered it, for display
+    if systolic is not None:
+        if diastolic > systolic:
+            problems.append(f"blood pressure {systolic}/{diastolic} has diastolic above systolic")
+        elif diastolic == systolic:
+            problems.append(f"blood pressure {systolic}/{diastolic} has diastolic equal to systolic")
+
+    for field, (low, high) in VITAL_RANGES.items():
+        value = cleaned.get(field)
+        if value is not None and not low <= value <= high:
+            problems.append(f"{field.replace('_bp', '').replace('_', ' ')} {value} is outside {low}-{high}")
+
+    if problems:
+        raise VitalsValidationError("; ".join(problems))
+    return cleaned
@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Max number of blocking calls (DB work, sync SDK calls) running at once per worker
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "32"))
+
+# Max number of in-flight LLM calls per worker
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=AGENT_MAX_CONCURRENCY,
+    thread_name_prefix="agent-worker"
+)
+
+_semaphores = {}
+
+
+def _get_semaphore(name: str, limit: int) -> asyncio.Semaphore:
+    """Get a semaphore bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    key = (name, id(loop))
+    semaphore = _semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(limit)
+        _semaphores[key] = semaphore
+    return semaphore
+
+
+def llm_slot() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent LLM calls on this event loop"""
+    return _get_semaphore("llm", LLM_MAX_CONCURRENCY)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking function on the bounded worker pool so it
+    doesn't stall the event loop
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context vars (e.g. the request's correlation ID) into the worker thread
+    context = contextvars.copy_context()
+    async with _get_semaphore("blocking", AGENT_MAX_CONCURRENCY):
+        return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
+
+
+def shutdown():
+    """Stop the worker pool"""
+    _executor.shutdown(wait=False)
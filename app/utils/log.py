@@ -0,0 +1,193 @@
+"""
+Structured, non-blocking logging.
+
+Records are handed to a QueueHandler, so the request path only pays for
+an in-memory enqueue; a QueueListener thread formats them as JSON lines
+and writes them to stdout. Structured fields go in `extra={"fields":
+{...}}`. PHI-bearing fields and exception messages are redacted,
+high-volume DEBUG lines are sampled, and every record carries the
+current correlation ID.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))  # fraction of DEBUG lines kept
+LOG_REDACT = os.getenv("LOG_REDACT", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Structured fields that may carry patient names, phone numbers or free text
+REDACTED_FIELDS = {"name", "patient_name", "phone", "message", "text", "content", "reminder", "notes", "body"}
+
+_PHONE_RE = re.compile(r"\+?\d[\d\s\-]{7,}\d")
+
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+_listener = None
+_handler = None
+
+
+def new_correlation_id(prefix: str = "") -> str:
+    return f"{prefix}{uuid.uuid4().hex[:16]}"
+
+
+@contextmanager
+def log_context(value: str):
+    """Run a block with the given correlation ID"""
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the correlation ID onto records at the call site"""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of DEBUG records"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def _redacted_traceback(exc_info) -> str:
+    """
+    Traceback frames and exception type without the exception message,
+    which can carry PHI (SQLAlchemy errors include the bound parameters)
+    """
+    exc_type, _, tb = exc_info
+    frames = "".join(traceback.format_tb(tb))
+    return f"Traceback (most recent call last):\n{frames}{exc_type.__module__}.{exc_type.__qualname__}: [REDACTED]"
+
+
+class RedactionFilter(logging.Filter):
+    """Masks PHI-bearing structured fields, phone numbers in messages and exception messages"""
+
+    def filter(self, record):
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {
+                k: ("[REDACTED]" if k in REDACTED_FIELDS and v not in (None, "") else v)
+                for k, v in fields.items()
+            }
+        if isinstance(record.msg, str):
+            record.msg = _PHONE_RE.sub("[REDACTED]", record.msg)
+        if record.exc_info and record.exc_info[0] is not None:
+            record.exc_text = _redacted_traceback(record.exc_info)
+            record.exc_info = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-")
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{record.levelname:7} [{getattr(record, 'correlation_id', '-')}] {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        elif record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: if the queue is full the record is dropped"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record):
+        # Keep structured fields; the listener does the formatting
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging():
+    """Route the app's loggers through a background queue listener (idempotent)"""
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+    if LOG_REDACT:
+        handler.addFilter(RedactionFilter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(handler)
+    app_logger.propagate = False
+
+    _handler = handler
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging():
+    """
+    Flush queued records, stop the listener thread and detach the queue
+    handler, so a later setup_logging() starts clean
+    """
+    global _listener, _handler
+    if _listener is not None:
+        app_logger = logging.getLogger("app")
+        app_logger.removeHandler(_handler)
+        app_logger.propagate = True
+        _listener.stop()
+        _listener = None
+        _handler = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
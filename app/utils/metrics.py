@@ -0,0 +1,313 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and histograms are keyed by label values and guarded by one
+lock. When METRICS_ENABLED is false, timer() hands back a shared no-op
+context manager and inc()/observe() return immediately, so the
+instrumented hot path pays only an attribute check.
+"""
+import asyncio
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with registry.lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = self.labels
+        if "outcome" in self.histogram.labelnames:
+            labels = {**labels, "outcome": "error" if exc_type else "ok"}
+        self.histogram.observe(time.perf_counter() - self.started, **labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self._metrics = {}
+        self._gauges = {}  # name -> (help, callback returning {key: value} or a number, counter keys)
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, help_text, labelnames)
+        return self._metrics[name]
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, help_text, labelnames, buckets)
+        return self._metrics[name]
+
+    def gauge_callback(self, name: str, help_text: str, callback, counters=()):
+        """
+        Register a gauge whose value(s) are read from `callback` at scrape
+        time. Keys listed in `counters` only ever go up, so they are
+        exported separately as the counter `<name>_total`.
+        """
+        self._gauges[name] = (help_text, callback, frozenset(counters))
+
+    def render(self) -> str:
+        with self.lock:
+            lines = []
+            for metric in self._metrics.values():
+                lines.extend(metric.render())
+
+        for name, (help_text, callback, counters) in self._gauges.items():
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+            if not isinstance(value, dict):
+                if value is not None:
+                    lines.append(f"{name} {value}")
+                continue
+
+            numeric = {
+                label: v for label, v in value.items()
+                if isinstance(v, (int, float)) and not isinstance(v, bool)
+            }
+            for label, v in numeric.items():
+                if label not in counters:
+                    lines.append(f'{name}{{key="{label}"}} {v}')
+            if counters:
+                lines.extend([f"# HELP {name}_total {help_text} (counters)", f"# TYPE {name}_total counter"])
+                for label, v in numeric.items():
+                    if label in counters:
+                        lines.append(f'{name}_total{{key="{label}"}} {v}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Hot-path metrics shared across modules
+stage_seconds = registry.histogram(
+    "agent_stage_seconds",
+    "Time spent per request-path stage",
+    ("stage", "outcome")
+)
+message_seconds = registry.histogram(
+    "agent_message_seconds",
+    "End-to-end /agent/message latency by intent",
+    ("intent", "success")
+)
+intent_parse_total = registry.counter(
+    "agent_intent_parse_total",
+    "Intent parses by resolution path (rules, cache, llm) and intent",
+    ("path", "intent")
+)
+llm_decode_total = registry.counter(
+    "agent_llm_decode_total",
+    "LLM intent replies by decode outcome (ok, repaired, failed)",
+    ("outcome",)
+)
+llm_calls_total = registry.counter(
+    "agent_llm_calls_total",
+    "LLM backend calls by backend and outcome (ok, error, timeout, hedged, short_circuit, fallback_*)",
+    ("backend", "outcome")
+)
+llm_tokens = registry.histogram(
+    "agent_llm_tokens",
+    "Gemini tokens per intent parse call (prompt, output)",
+    ("kind",),
+    buckets=(0, 25, 50, 100, 200, 400, 800, 1600, 3200)
+)
+time_parse_total = registry.counter(
+    "agent_time_parse_total",
+    "Appointment time parses by path (fast, dateparser, failed)",
+    ("path",)
+)
+sweep_seconds = registry.histogram(
+    "reminder_sweep_seconds",
+    "Reminder sweep duration",
+    ("sweep",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0)
+)
+sweep_rows_total = registry.counter(
+    "reminder_sweep_rows_total",
+    "Rows processed by reminder sweeps",
+    ("sweep",)
+)
+
+
+def timer(stage: str):
+    """Context manager timing a stage into agent_stage_seconds"""
+    if not registry.enabled:
+        return _NOOP_TIMER
+    return _Timer(stage_seconds, {"stage": stage})
+
+
+def inc(counter: Counter, amount: float = 1, **labels):
+    if registry.enabled:
+        counter.inc(amount, **labels)
+
+
+def observe(histogram: Histogram, value: float, **labels):
+    if registry.enabled:
+        histogram.observe(value, **labels)
+
+
+def timed(stage: str):
+    """Decorator timing a sync or async function as a stage"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler. A background thread samples every
+    thread's stack at a fixed interval and tallies collapsed stacks
+    (flamegraph.pl / speedscope format). Off unless started at runtime.
+    """
+
+    def __init__(self):
+        self.interval = 0.01
+        self.samples = _Tally()
+        self.sample_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = 10):
+        if self.running:
+            return
+        self.interval = max(interval_ms, 1) / 1000
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def reset(self):
+        self.samples.clear()
+        self.sample_count = 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self, limit: int = 500) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common(limit)) + "\n"
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,231 @@
+"""
+Appointment time parsing.
+
+The phrasings nurses actually use ("tomorrow at 2pm", "next Monday
+10:30", "in 3 hours", "Friday morning") are handled by a few precompiled
+patterns. Anything else falls back to dateparser, which is imported on
+first use and restricted to DATE_LANGUAGES so it doesn't try every locale.
+Phrases are read in ward time (WARD_TIMEZONE) and returned as naive UTC,
+like every stored timestamp.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.utils.metrics import timer, inc, time_parse_total
+from app.utils.ward_time import WARD_TIMEZONE, to_ward_time, from_ward_time
+
+# Languages dateparser may try for fallback parsing (comma separated)
+DATE_LANGUAGES = [lang.strip() for lang in os.getenv("DATE_LANGUAGES", "en").split(",") if lang.strip()]
+
+_DATEPARSER_SETTINGS = {
+    "PREFER_DATES_FROM": "future",
+    "TIMEZONE": WARD_TIMEZONE,
+    "TO_TIMEZONE": "UTC",
+    "RETURN_AS_TIMEZONE_AWARE": False,
+}
+
+_WEEKDAYS = {
+    "mon": 0, "monday": 0,
+    "tue": 1, "tues": 1, "tuesday": 1,
+    "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3,
+    "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6,
+}
+
+# Default hour for a part of the day given without a time
+_PERIODS = {"morning": 9, "afternoon": 14, "evening": 18, "tonight": 20, "night": 20}
+
+_OFFSET_RE = re.compile(
+    r"\bin\s+(?P<count>\d+|an?|one)\s+(?P<unit>min(?:ute)?s?|h(?:ou)?rs?|hours?|days?|weeks?)\b"
+)
+
+_DAY_RE = re.compile(
+    r"\b(?:(?P<relative>today|tonight|tomorrow|tmrw|(?:the\s+)?day\s+after\s+tomorrow)"
+    r"|(?:(?P<modifier>next|this|coming)\s+)?(?P<weekday>" + "|".join(sorted(_WEEKDAYS, key=len, reverse=True)) + r")"
+    r"|(?P<iso>\d{4}-\d{2}-\d{2}))\b"
+)
+
+_TIME_RE = re.compile(
+    r"(?:\b(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?m\b\.?"
+    r"|\b(?P<hour24>\d{1,2}):(?P<minute24>\d{2})\b"
+    r"|\bat\s+(?P<hour_at>\d{1,2})\b(?![:./\-])"
+    r"|\b(?P<named>noon|midday|midnight)\b)"
+)
+
+_PERIOD_RE = re.compile(r"\b(?:in\s+the\s+)?(?P<period>morning|afternoon|evening|night)\b")
+
+_FILLER = {"at", "on", "by", "for", "around", "about", "the", "please", "o'clock", "oclock"}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+_dateparser = None
+
+
+def _load_dateparser():
+    global _dateparser
+    if _dateparser is None:
+        import dateparser
+        _dateparser = dateparser
+    return _dateparser
+
+
+def _clock(match) -> Optional[tuple]:
+    """(hour, minute) from a _TIME_RE match, or None if out of range"""
+    if match.group('named'):
+        return (0, 0) if match.group('named') == "midnight" else (12, 0)
+
+    if match.group('hour') is not None:
+        hour, minute = int(match.group('hour')), int(match.group('minute') or 0)
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group('ampm') == "p" else 0)
+    elif match.group('hour24') is not None:
+        hour, minute = int(match.group('hour24')), int(match.group('minute24'))
+    else:
+        hour, minute = int(match.group('hour_at')), 0
+
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _day(match, now: datetime) -> Optional[datetime]:
+    """Midnight of the day named by a _DAY_RE match"""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if match.group('iso'):
+        try:
+            return datetime.strptime(match.group('iso'), "%Y-%m-%d")
+        except ValueError:
+            return None
+
+    relative = match.group('relative')
+    if relative:
+        if relative.endswith("after tomorrow"):
+            return today + timedelta(days=2)
+        if relative in ("tomorrow", "tmrw"):
+            return today + timedelta(days=1)
+        return today
+
+    days_ahead = (_WEEKDAYS[match.group('weekday')] - today.weekday()) % 7
+    if days_ahead == 0 and match.group('modifier') == "next":
+        days_ahead = 7
+    return today + timedelta(days=days_ahead)
+
+
+def parse_relative(text: str, now: datetime = None) -> Optional[datetime]:
+    """
+    Parse common relative/absolute phrasings without dateparser.
+    `now` and the result are naive UTC; the phrase is read in ward time.
+    Returns None if any part of the text isn't understood.
+    """
+    now = now or datetime.utcnow()
+    result = _parse_ward_time(text, to_ward_time(now))
+    return from_ward_time(result) if result is not None else None
+
+
+def _parse_ward_time(text: str, now: datetime) -> Optional[datetime]:
+    """parse_relative with `now` and the result in naive ward time"""
+    text = text.lower().strip().rstrip(".!?")
+    spans = []
+
+    offset = _OFFSET_RE.search(text)
+    if offset:
+        spans.append(offset.span())
+        count = offset.group('count')
+        count = int(count) if count.isdigit() else 1
+        unit = offset.group('unit')
+        if unit.startswith("m"):
+            delta = timedelta(minutes=count)
+        elif unit.startswith("h"):
+            delta = timedelta(hours=count)
+        elif unit.startswith("d"):
+            delta = timedelta(days=count)
+        else:
+            delta = timedelta(weeks=count)
+        result = now + delta
+    else:
+        result = None
+
+    day_match = _DAY_RE.search(text)
+    time_match = _TIME_RE.search(text)
+    period_match = _PERIOD_RE.search(text)
+
+    if offset and (day_match or time_match or period_match):
+        # "in 2 days at 3pm" and the like are left to dateparser
+        return None
+
+    for match in (day_match, time_match, period_match):
+        if match:
+            spans.append(match.span())
+
+    if not spans:
+        return None
+
+    # Everything outside the recognised parts must be filler words
+    residual = text
+    for start, end in sorted(spans, reverse=True):
+        residual = residual[:start] + " " + residual[end:]
+    if any(word not in _FILLER for word in _WORD_RE.findall(residual)):
+        return None
+
+    if result is not None:
+        return result
+
+    day = _day(day_match, now) if day_match else None
+    if day_match and day is None:
+        return None
+
+    period = period_match.group('period') if period_match else None
+    if day_match and day_match.group('relative') == "tonight":
+        period = "tonight"
+
+    if time_match:
+        clock = _clock(time_match)
+        if clock is None:
+            return None
+        hour, minute = clock
+        # "at 6 in the evening", "tonight at 8"
+        if period in ("afternoon", "evening", "tonight", "night") and hour < 12 and not time_match.group('ampm'):
+            hour += 12
+    elif period:
+        hour, minute = _PERIODS[period], 0
+    else:
+        # A bare day keeps the current time of day, as dateparser does
+        return day + timedelta(hours=now.hour, minutes=now.minute)
+
+    if day is None:
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if day + timedelta(hours=hour, minutes=minute) < now:
+            # A time that has already passed today means tomorrow
+            day += timedelta(days=1)
+
+    result = day + timedelta(hours=hour, minutes=minute)
+    if day_match and day_match.group('weekday') and not day_match.group('modifier') and result < now:
+        # "monday at 9am" said on Monday afternoon means next Monday
+        result += timedelta(weeks=1)
+    return result
+
+
+def parse_datetime(text: str, now: datetime = None) -> Optional[datetime]:
+    """Parse an appointment time, falling back to dateparser for unusual phrasings"""
+    if not text or not text.strip():
+        return None
+
+    if "en" in DATE_LANGUAGES:
+        with timer("timeparse"):
+            result = parse_relative(text, now)
+        if result is not None:
+            inc(time_parse_total, path="fast")
+            return result
+
+    with timer("dateparser"):
+        # Relative phrases are resolved against the ward's clock
+        settings = dict(_DATEPARSER_SETTINGS, RELATIVE_BASE=to_ward_time(now or datetime.utcnow()))
+        result = _load_dateparser().parse(text, languages=DATE_LANGUAGES, settings=settings)
+    inc(time_parse_total, path="dateparser" if result else "failed")
+    return result
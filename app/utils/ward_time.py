@@ -0,0 +1,24 @@
+"""
+The ward's wall clock.
+
+Timestamps are stored as naive UTC. What nurses say and read ("tomorrow
+at 9am", "8am and 8pm", "Due: 08:00 PM") is ward time, in WARD_TIMEZONE;
+these helpers convert between the two.
+"""
+import os
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+# IANA timezone of the ward's clock, e.g. "Africa/Lagos"
+WARD_TIMEZONE = os.getenv("WARD_TIMEZONE", "UTC")
+WARD_TZ = timezone.utc if WARD_TIMEZONE.upper() == "UTC" else ZoneInfo(WARD_TIMEZONE)
+
+
+def to_ward_time(value: datetime, tz=None) -> datetime:
+    """Naive UTC -> naive ward time"""
+    return value.replace(tzinfo=timezone.utc).astimezone(tz or WARD_TZ).replace(tzinfo=None)
+
+
+def from_ward_time(value: datetime, tz=None) -> datetime:
+    """Naive ward time -> naive UTC"""
+    return value.replace(tzinfo=tz or WARD_TZ).astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark: how long `import app.main` takes in a fresh interpreter.
+
+Runs `python -X importtime -c "import app.main"` a few times, reports the
+median total import time and the slowest top-level imports, and fails
+(exit status 1) when the median exceeds --budget-ms or one of the lazily
+loaded heavy dependencies gets imported again.
+
+    python -m benchmarks.bench_import --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded on first use, never by importing the app
+LAZY_MODULES = ("google.generativeai", "dateparser", "apscheduler", "httpx", "numpy")
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def import_profile(statement: str) -> list:
+    """(self_us, cumulative_us, depth, name) per import, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    # Modules the interpreter imports at startup anyway don't count
+    startup = {row[3] for row in import_profile("pass")}
+    profiles = [
+        [row for row in import_profile(f"import {args.module}") if row[3] not in startup]
+        for _ in range(args.runs)
+    ]
+    totals = [sum(row[1] for row in profile if row[2] == 0) / 1000 for profile in profiles]
+    median = statistics.median(totals)
+
+    # Slowest top-level imports, from the run closest to the median
+    profile = profiles[min(range(len(totals)), key=lambda i: abs(totals[i] - median))]
+    top_level = sorted((row for row in profile if row[2] == 0), key=lambda row: row[1], reverse=True)
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("\nSlowest top-level imports")
+    for self_us, cumulative_us, _, name in top_level[:args.top]:
+        print(f"  {name:40} {cumulative_us / 1000:8.1f} ms")
+
+    imported = {row[3] for row in profile}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\nFAIL: {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Scan vs. index benchmark for the hot filter columns.
+
+Builds a throwaway SQLite database with the pre-index schema, loads
+--rows vitals rows (default 1M) spread over --patients patients plus
+medications and appointments, then times the record lookup and reminder
+sweep queries before and after run_migrations() adds the indexes.
+
+    python -m benchmarks.bench_indexes --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from app.database import Base
+from app.migrations import run_migrations
+from app.models.patient import Vitals, Diagnosis, Medication, Appointment
+
+QUERIES = {
+    "latest vitals for patient": (
+        "SELECT * FROM vitals WHERE patient_id = :pk ORDER BY recorded_at DESC LIMIT 1"
+    ),
+    "recent diagnoses for patient": (
+        "SELECT * FROM diagnoses WHERE patient_id = :pk ORDER BY diagnosed_at DESC LIMIT 3"
+    ),
+    "due medications sweep": (
+        "SELECT * FROM medications WHERE is_active = 1 AND next_dose_time <= :now"
+    ),
+    "upcoming appointments sweep": (
+        "SELECT * FROM appointments WHERE is_completed = 0 "
+        "AND appointment_datetime >= :now AND appointment_datetime <= :until"
+    ),
+}
+
+
+def load_data(engine, rows: int, patients: int, batch: int = 50_000):
+    now = datetime.utcnow()
+    rng = random.Random(42)
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO patients (id, patient_id, name) VALUES (:id, :pid, :name)"), [
+            {"id": i, "pid": f"PT{10000 + i}", "name": f"Patient {i}"} for i in range(1, patients + 1)
+        ])
+
+        for start in range(0, rows, batch):
+            conn.execute(text(
+                "INSERT INTO vitals (patient_id, blood_pressure, temperature, pulse, recorded_at) "
+                "VALUES (:pk, '120/80', 37.0, :pulse, :at)"
+            ), [
+                {"pk": rng.randint(1, patients), "pulse": rng.randint(55, 110),
+                 "at": now - timedelta(minutes=rng.randint(0, 525_600))}
+                for _ in range(min(batch, rows - start))
+            ])
+
+        conn.execute(text(
+            "INSERT INTO diagnoses (patient_id, doctor_name, diagnosis, diagnosed_at) VALUES (:pk, 'Dr X', 'dx', :at)"
+        ), [{"pk": rng.randint(1, patients), "at": now - timedelta(days=rng.randint(0, 365))} for _ in range(patients * 5)])
+
+        conn.execute(text(
+            "INSERT INTO medications (patient_id, medication_name, is_active, next_dose_time) VALUES (:pk, 'med', :active, :at)"
+        ), [{"pk": rng.randint(1, patients), "active": int(rng.random() < 0.3),
+             "at": now + timedelta(minutes=rng.randint(-60, 2880))} for _ in range(patients * 10)])
+
+        conn.execute(text(
+            "INSERT INTO appointments (patient_id, appointment_type, appointment_datetime, is_completed) "
+            "VALUES (:pk, 'checkup', :at, :done)"
+        ), [{"pk": rng.randint(1, patients), "done": int(rng.random() < 0.8),
+             "at": now + timedelta(hours=rng.randint(-2000, 2000))} for _ in range(patients * 5)])
+
+
+def drop_hot_path_indexes(engine):
+    with engine.begin() as conn:
+        for model in (Vitals, Diagnosis, Medication, Appointment):
+            for index in model.__table__.indexes:
+                index.drop(conn, checkfirst=True)
+
+
+def run_queries(engine, patients: int, repeat: int) -> dict:
+    now = datetime.utcnow()
+    params = {"now": now, "until": now + timedelta(hours=24)}
+    results = {}
+
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = " | ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), {**params, "pk": 1}))
+
+            start = time.perf_counter()
+            for i in range(repeat):
+                conn.execute(text(sql), {**params, "pk": (i % patients) + 1}).fetchall()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+            results[name] = (elapsed_ms, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="vitals rows to load")
+    parser.add_argument("--patients", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=20, help="executions per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        drop_hot_path_indexes(engine)
+
+        start = time.perf_counter()
+        load_data(engine, args.rows, args.patients)
+        print(f"Loaded {args.rows:,} vitals rows in {time.perf_counter() - start:.1f}s\n")
+
+        before = run_queries(engine, args.patients, args.repeat)
+
+        start = time.perf_counter()
+        run_migrations(engine)
+        print(f"Indexes built in {time.perf_counter() - start:.1f}s\n")
+
+        after = run_queries(engine, args.patients, args.repeat)
+
+        print(f"{'query':32} {'scan ms':>10} {'index ms':>10} {'speedup':>9}")
+        for name in QUERIES:
+            (scan_ms, scan_plan), (index_ms, index_plan) = before[name], after[name]
+            print(f"{name:32} {scan_ms:10.3f} {index_ms:10.3f} {scan_ms / max(index_ms, 1e-6):8.1f}x")
+            print(f"    before: {scan_plan}")
+            print(f"    after:  {index_plan}")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
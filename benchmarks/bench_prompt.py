@@ -0,0 +1,93 @@
+"""
+Intent prompt size benchmark: the old all-examples prompt vs. the static
+system instruction plus per-message few-shot selection.
+
+Reports input tokens per LLM call over a corpus (only messages the rule
+fast path doesn't answer reach Gemini) and how long building a prompt
+takes. Token counts are estimated (~4 chars/token) unless --count-tokens
+is given, which asks the Gemini API (needs GEMINI_API_KEY).
+
+    python -m benchmarks.bench_prompt benchmarks/corpus/ward_shift.jsonl
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.services.ai_service import AIAgent, SYSTEM_INSTRUCTION, estimate_tokens
+from app.services.intent_rules import intent_rules
+
+# The prompt parse_intent used to send on every call
+LEGACY_PROMPT = """
+You are a healthcare assistant AI. Analyze this nurse's message and extract structured information.
+
+Message: "{message}"
+
+Return a JSON object with:
+- intent: one of ["register_patient", "record_vitals", "add_diagnosis", "prescribe_medication", "schedule_appointment", "query_patient", "vitals_trend", "list_reminders", "unknown"]
+- data: extracted relevant information based on intent
+
+Examples:
+1. "New patient John Doe, 45 years old, male" → {{"intent": "register_patient", "data": {{"name": "John Doe", "age": 45, "gender": "male"}}}}
+2. "Record vitals for PT001: BP 120/80, temp 37.2, pulse 75" → {{"intent": "record_vitals", "data": {{"patient_id": "PT001", "blood_pressure": "120/80", "temperature": 37.2, "pulse": 75}}}}
+3. "Dr Smith diagnosed PT001 with hypertension" → {{"intent": "add_diagnosis", "data": {{"patient_id": "PT001", "doctor_name": "Dr Smith", "diagnosis": "hypertension"}}}}
+4. "Prescribe amoxicillin 500mg three times daily for PT001" → {{"intent": "prescribe_medication", "data": {{"patient_id": "PT001", "medication_name": "amoxicillin", "dosage": "500mg", "frequency": "three times daily"}}}}
+5. "Schedule follow-up for PT001 tomorrow at 2pm" → {{"intent": "schedule_appointment", "data": {{"patient_id": "PT001", "appointment_type": "follow-up", "time": "tomorrow at 2pm"}}}}
+6. "Show me PT001's records" → {{"intent": "query_patient", "data": {{"patient_id": "PT001"}}}}
+7. "How are PT001's vitals trending?" → {{"intent": "vitals_trend", "data": {{"patient_id": "PT001"}}}}
+8. "Who on the ward is deteriorating?" → {{"intent": "vitals_trend", "data": {{}}}}
+
+Return ONLY valid JSON, no explanation.
+"""
+
+
+def load_messages(path: str, include_rules: bool) -> list:
+    messages = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                message = json.loads(line)["message"]
+                if include_rules or intent_rules.match(message)[1] < intent_rules.min_confidence:
+                    messages.append(message)
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus")
+    parser.add_argument("--all", action="store_true", help="include messages the rules answer themselves")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--count-tokens", action="store_true", help="use the Gemini count_tokens API")
+    args = parser.parse_args()
+
+    messages = load_messages(args.corpus, args.all)
+    if not messages:
+        raise SystemExit("No messages would reach the LLM")
+
+    count = estimate_tokens
+    if args.count_tokens:
+        from app.services.ai_service import build_backend
+        model = build_backend("gemini").primary.model
+        count = lambda text: model.count_tokens(text).total_tokens
+
+    legacy = [count(LEGACY_PROMPT.format(message=m)) for m in messages]
+    per_call = [count(AIAgent.build_prompt(m)) for m in messages]
+    system = count(SYSTEM_INSTRUCTION)
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for message in messages:
+            AIAgent.build_prompt(message)
+    build_us = (time.perf_counter() - start) / (args.iterations * len(messages)) * 1e6
+
+    print(f"{len(messages)} messages reaching the LLM")
+    print(f"legacy prompt:        mean {statistics.mean(legacy):7.1f} tokens/call")
+    print(f"system instruction:   {system:7d} tokens (static, sent with every call)")
+    print(f"per-message prompt:   mean {statistics.mean(per_call):7.1f} tokens/call")
+    print(f"total input:          mean {statistics.mean(per_call) + system:7.1f} tokens/call "
+          f"({1 - (statistics.mean(per_call) + system) / statistics.mean(legacy):.0%} fewer)")
+    print(f"prompt build time:    {build_us:7.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
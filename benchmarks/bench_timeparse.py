@@ -0,0 +1,88 @@
+"""
+Appointment time parsing benchmark: fast path vs. dateparser.
+
+Measures cold-start cost (a fresh interpreter importing each parser and
+parsing one phrase) and warm per-call parse time over common clinical
+phrasings, and reports how many phrases the fast path resolves itself.
+
+    python -m benchmarks.bench_timeparse --iterations 2000
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from app.utils.timeparse import parse_relative
+
+PHRASES = [
+    "tomorrow at 2pm",
+    "tomorrow 10:30am",
+    "today at 16:00",
+    "next Monday 10:30",
+    "monday at 9am",
+    "friday morning",
+    "in 3 hours",
+    "in 30 minutes",
+    "in 2 days",
+    "tonight at 8",
+    "at 2pm",
+    "noon tomorrow",
+    "the day after tomorrow at 11am",
+    "2pm on thursday",
+    "2026-11-02 09:00",
+]
+
+COLD_START = {
+    "fast path": "from app.utils.timeparse import parse_relative; parse_relative('tomorrow at 2pm')",
+    "dateparser": "import dateparser; dateparser.parse('tomorrow at 2pm', languages=['en'])",
+    "dateparser (all languages)": "import dateparser; dateparser.parse('tomorrow at 2pm')",
+}
+
+
+def cold_start(statement: str, runs: int) -> float:
+    """Median wall time of a fresh interpreter running `statement`, in ms"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True, capture_output=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def per_call(parse, iterations: int) -> float:
+    """Mean time per parse over PHRASES, in microseconds"""
+    started = time.perf_counter()
+    for i in range(iterations):
+        parse(PHRASES[i % len(PHRASES)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = cold_start("pass", args.cold_runs)
+    print(f"Cold start (median of {args.cold_runs}, interpreter startup {baseline:.0f}ms subtracted)")
+    for name, statement in COLD_START.items():
+        print(f"  {name:28} {cold_start(statement, args.cold_runs) - baseline:8.1f} ms")
+
+    import dateparser
+    now = datetime.utcnow()
+    settings = {"PREFER_DATES_FROM": "future", "RELATIVE_BASE": now}
+    dateparser.parse("warm up", languages=["en"])
+
+    resolved = sum(parse_relative(p, now) is not None for p in PHRASES)
+    print(f"\nFast path resolves {resolved}/{len(PHRASES)} phrases")
+
+    print(f"\nPer call (mean over {args.iterations} parses)")
+    print(f"  {'fast path':28} {per_call(lambda p: parse_relative(p, now), args.iterations):8.1f} us")
+    print(f"  {'dateparser':28} {per_call(lambda p: dateparser.parse(p, languages=['en'], settings=settings), args.iterations):8.1f} us")
+    print(f"  {'dateparser (all languages)':28} {per_call(lambda p: dateparser.parse(p, settings=settings), max(args.iterations // 10, 50)):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Replay a JSONL message corpus against the agent and measure it.
+
+Each line is a JSON object with a "message" (or "text"/"content") and
+an optional "user_id". The corpus is streamed, not loaded up front, and
+replayed at a fixed --rate (requests/second, 0 = as fast as possible)
+with at most --concurrency requests in flight.
+
+In-process mode calls process_message directly against a scratch SQLite
+database with Gemini replaced by a local stub; HTTP mode posts to a
+running server's /agent/message.
+
+    python -m benchmarks.replay benchmarks/corpus/ward_shift.jsonl --requests 2000 --concurrency 50
+    python -m benchmarks.replay corpus.jsonl --mode http --url http://localhost:8000 --rate 20
+
+Results (throughput, p50/p95/p99 latency and error rates, overall and
+per intent) are printed and written as JSON to --output.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+
+def stream_corpus(path: str, limit: int = None, loop: bool = True):
+    """Yield (message, user_id) from a JSONL file, cycling until limit"""
+    def read_once():
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                message = item.get("message") or item.get("text") or item.get("content") or item.get("body")
+                if message:
+                    yield message, item.get("user_id", "replay")
+
+    items = itertools.chain.from_iterable(read_once() for _ in itertools.count()) if loop else read_once()
+    return itertools.islice(items, limit)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(samples: list) -> dict:
+    latencies = sorted(s["latency_ms"] for s in samples)
+    errors = sum(1 for s in samples if s["error"])
+    failures = sum(1 for s in samples if not s["error"] and not s["success"])
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "unsuccessful": failures,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0
+        }
+    }
+
+
+class InProcessTarget:
+    """Calls process_message directly with a fresh session per request"""
+
+    def __init__(self, args):
+        from app.database import SessionLocal
+        from app.migrations import init_db
+        from app.routers.agent import MessageRequest, process_message
+        from app.services import ai_service
+        from app.services.intent_rules import intent_rules
+        from app.services.intent_cache import intent_cache
+        from app.services.patient_service import PatientService
+        from app.services.llm_backend import GeminiBackend, LocalBackend, ResilientBackend
+        from benchmarks.stub_llm import StubGeminiModel
+
+        init_db()
+
+        self.stub = StubGeminiModel(latency=args.llm_latency, error_rate=args.llm_error_rate)
+        # The stub stands in for the Gemini model, behind the same deadline,
+        # hedging and circuit breaker as production
+        self.backend = ResilientBackend(GeminiBackend(model=self.stub), fallback=LocalBackend())
+        ai_service.backend = self.backend
+        if args.no_rules:
+            intent_rules.min_confidence = float("inf")
+        if args.no_cache:
+            intent_cache.enabled = False
+
+        self.SessionLocal = SessionLocal
+        self.MessageRequest = MessageRequest
+        self.process_message = process_message
+
+        # Seed patients so record/query messages have someone to find
+        db = SessionLocal()
+        try:
+            for i in range(args.seed_patients):
+                PatientService.create_patient(db, {"name": f"Load Test {i}", "age": 40})
+        finally:
+            db.close()
+
+    async def send(self, message: str, user_id: str) -> dict:
+        db = self.SessionLocal()
+        try:
+            return await self.process_message(self.MessageRequest(message=message, user_id=user_id), db)
+        finally:
+            db.close()
+
+    async def close(self):
+        pass
+
+    def extra_stats(self) -> dict:
+        return {"stub_llm_calls": self.stub.calls, "llm_backend": self.backend.stats()}
+
+
+class HttpTarget:
+    """Posts to a running server's /agent/message"""
+
+    def __init__(self, args):
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=args.url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency)
+        )
+
+    async def send(self, message: str, user_id: str) -> dict:
+        response = await self.client.post("/agent/message", json={"message": message, "user_id": user_id})
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.client.aclose()
+
+    def extra_stats(self) -> dict:
+        return {}
+
+
+async def run(target, corpus, rate: float, concurrency: int) -> tuple:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+    interval = 1 / rate if rate > 0 else 0
+
+    async def one(message: str, user_id: str):
+        start = time.perf_counter()
+        try:
+            result = await target.send(message, user_id)
+            error = "error" in result
+            samples.append({
+                "intent": result.get("intent") or "none",
+                "success": bool(result.get("success")),
+                "error": error,
+                "latency_ms": (time.perf_counter() - start) * 1000
+            })
+        except Exception:
+            samples.append({
+                "intent": "transport_error",
+                "success": False,
+                "error": True,
+                "latency_ms": (time.perf_counter() - start) * 1000
+            })
+        finally:
+            semaphore.release()
+
+    tasks = []
+    started = time.perf_counter()
+    for n, (message, user_id) in enumerate(corpus):
+        if interval:
+            # Open-loop pacing: schedule by wall clock, not by completions
+            delay = started + n * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(one(message, user_id)))
+
+    await asyncio.gather(*tasks)
+    return samples, time.perf_counter() - started
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="JSONL file of messages")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default="http://localhost:8000", help="server URL for --mode http")
+    parser.add_argument("--requests", type=int, default=None, help="total requests (cycles the corpus); default one pass")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second, 0 = unpaced")
+    parser.add_argument("--concurrency", type=int, default=20, help="max in-flight requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--llm-latency", default="lognormal:400:0.5",
+                        help="stub Gemini latency: fixed:MS | uniform:LOW:HIGH | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of stub Gemini calls that fail")
+    parser.add_argument("--no-rules", action="store_true", help="disable the rule-based fast path")
+    parser.add_argument("--no-cache", action="store_true", help="disable the intent cache")
+    parser.add_argument("--seed-patients", type=int, default=10, help="patients created before replay (in-process)")
+    parser.add_argument("--database-url", default=None, help="in-process DB (default: scratch SQLite file)")
+    parser.add_argument("--output", default="replay_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.mode == "inprocess":
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        else:
+            scratch = tempfile.TemporaryDirectory()
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch.name, 'replay.db')}"
+        target = InProcessTarget(args)
+    else:
+        target = HttpTarget(args)
+
+    corpus = stream_corpus(args.corpus, limit=args.requests, loop=args.requests is not None)
+
+    async def go():
+        try:
+            return await run(target, corpus, args.rate, args.concurrency)
+        finally:
+            await target.close()
+
+    samples, elapsed = asyncio.run(go())
+
+    by_intent = defaultdict(list)
+    for sample in samples:
+        by_intent[sample["intent"]].append(sample)
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items()},
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "overall": summarize(samples),
+        "intents": {intent: summarize(items) for intent, items in sorted(by_intent.items())},
+        **target.extra_stats()
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    overall = report["overall"]
+    print(f"{len(samples)} requests in {elapsed:.2f}s → {report['throughput_rps']} req/s, "
+          f"error rate {overall['error_rate']:.2%}", file=sys.stderr)
+    print(f"{'intent':24} {'count':>6} {'err%':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for intent, stats in [("ALL", overall)] + list(report["intents"].items()):
+        lat = stats["latency_ms"]
+        print(f"{intent:24} {stats['count']:6} {stats['error_rate']:7.2%} {lat['p50']:9.2f} {lat['p95']:9.2f} {lat['p99']:9.2f}",
+              file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if scratch:
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Local stand-in for the Gemini model used by the load harness.
+
+It answers with the rule-based parser's best guess (or "unknown") after
+a delay drawn from a configurable latency distribution, so the agent
+can be load-tested offline with realistic LLM timing.
+"""
+import asyncio
+import math
+import random
+import time
+
+from app.services.llm_backend import LocalBackend
+
+
+def parse_latency(spec: str):
+    """
+    Build a latency sampler (seconds) from a spec:
+      fixed:MS                 e.g. fixed:300
+      uniform:LOW_MS:HIGH_MS   e.g. uniform:200:800
+      lognormal:MEDIAN_MS:SIGMA e.g. lognormal:400:0.6
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StubUsage:
+    """Mirrors the usage_metadata token counts on a Gemini response (~4 chars per token)"""
+
+    def __init__(self, prompt: str, text: str):
+        self.prompt_token_count = len(prompt) // 4 + 1
+        self.candidates_token_count = len(text) // 4 + 1
+
+
+class StubResponse:
+    def __init__(self, text: str, prompt: str = ""):
+        self.text = text
+        self.usage_metadata = StubUsage(prompt, text)
+
+
+class StubGeminiModel:
+    """Drop-in replacement for the genai.GenerativeModel behind GeminiBackend"""
+
+    def __init__(self, latency: str = "lognormal:400:0.5", error_rate: float = 0.0, seed: int = 7):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        # Stands in for the model, so it answers with the best guess at any confidence
+        self.local = LocalBackend(min_confidence=0.0)
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> StubResponse:
+        self.calls += 1
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("stub LLM error")
+        return StubResponse(self.local.generate(prompt).text, prompt)
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.sample_latency(self.rng))
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(self.sample_latency(self.rng))
+        return self._answer(prompt)
@@ -0,0 +1,107 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.frequency import (
+    DEFAULT_INTERVAL_MINUTES, DoseSchedule, next_clock_time, next_dose, parse_dose_times, parse_frequency
+)
+
+LAGOS = ZoneInfo("Africa/Lagos")  # UTC+1, no DST
+
+
+@pytest.mark.parametrize("frequency, interval_minutes", [
+    ("once daily", 24 * 60),
+    ("od", 24 * 60),
+    ("twice daily", 12 * 60),
+    ("three times daily", 8 * 60),
+    ("tds", 8 * 60),
+    ("qds", 6 * 60),
+    ("q6h", 6 * 60),
+    ("every 4 hours", 4 * 60),
+    ("4-hourly", 4 * 60),
+    ("hourly", 60),
+    ("every other day", 2 * 24 * 60),
+    ("weekly", 7 * 24 * 60),
+    ("twice a week", 7 * 24 * 60 // 2),
+    ("3 times a week", 7 * 24 * 60 // 3),
+])
+def test_interval_schedules(frequency, interval_minutes):
+    assert parse_frequency(frequency) == DoseSchedule(interval_minutes=interval_minutes)
+
+
+@pytest.mark.parametrize("frequency, dose_times, text", [
+    ("8am and 8pm", (8 * 60, 20 * 60), "08:00,20:00"),
+    ("20:00, 08:00", (8 * 60, 20 * 60), "08:00,20:00"),
+    ("at night", (22 * 60,), "22:00"),
+    ("every morning", (8 * 60,), "08:00"),
+])
+def test_clock_time_schedules(frequency, dose_times, text):
+    schedule = parse_frequency(frequency)
+    assert schedule.dose_times == dose_times
+    assert schedule.interval_minutes is None
+    assert schedule.dose_times_text == text
+
+
+def test_duration_bounds_the_course():
+    schedule = parse_frequency("tds for 5 days")
+    assert schedule == DoseSchedule(interval_minutes=8 * 60, duration_days=5)
+    assert schedule.end_date(datetime(2026, 1, 1)) == datetime(2026, 1, 6)
+    assert parse_frequency("bd x 2 weeks").duration_days == 14
+
+
+def test_prn_has_no_reminders():
+    schedule = parse_frequency("as needed for 5 days")
+    assert schedule.is_prn and schedule.duration_days == 5
+    assert schedule.first_dose(datetime(2026, 1, 1)) is None
+
+
+def test_stat_is_a_single_dose_now():
+    schedule = parse_frequency("stat")
+    start = datetime(2026, 1, 1, 9, 30)
+    assert schedule.is_stat
+    assert schedule.first_dose(start) == start
+    assert schedule.end_date(start) == start
+
+
+@pytest.mark.parametrize("frequency", ["with food", "13pm", "", None])
+def test_unrecognised_frequency_falls_back_to_default_interval(frequency):
+    schedule = parse_frequency(frequency)
+    assert schedule.interval_minutes == DEFAULT_INTERVAL_MINUTES
+    assert not schedule.recognised
+
+
+def test_parse_dose_times_sorts_and_dedupes():
+    assert parse_dose_times("20:00, 08:00,08:00") == (8 * 60, 20 * 60)
+    assert parse_dose_times(None) == ()
+
+
+@pytest.mark.parametrize("after, expected", [
+    # 07:30 ward time: 08:00 ward time is next, i.e. 07:00 UTC
+    (datetime(2026, 1, 1, 6, 30), datetime(2026, 1, 1, 7, 0)),
+    # Exactly on a dose time: the next one, not the same
+    (datetime(2026, 1, 1, 7, 0), datetime(2026, 1, 1, 19, 0)),
+    # After the last dose of the ward day: the first one tomorrow
+    (datetime(2026, 1, 1, 19, 30), datetime(2026, 1, 2, 7, 0)),
+    # 23:30 UTC is already the next ward day
+    (datetime(2026, 1, 1, 23, 30), datetime(2026, 1, 2, 7, 0)),
+])
+def test_next_clock_time_is_in_ward_time(after, expected):
+    assert next_clock_time((8 * 60, 20 * 60), after, LAGOS) == expected
+
+
+def test_interval_doses_stay_anchored_and_skip_missed():
+    # Due at 00:00 every 6h; the service was down until 13:00
+    assert next_dose(360, None, False, None, datetime(2026, 1, 1, 0), datetime(2026, 1, 1, 13)) == datetime(2026, 1, 1, 18)
+
+
+def test_first_interval_dose_counts_from_now():
+    assert next_dose(360, None, False, None, None, datetime(2026, 1, 1, 1)) == datetime(2026, 1, 1, 7)
+
+
+def test_no_dose_after_the_course_ends():
+    assert next_dose(360, None, False, datetime(2026, 1, 1, 5), datetime(2026, 1, 1, 0), datetime(2026, 1, 1, 1)) is None
+
+
+def test_prn_row_has_no_next_dose():
+    assert next_dose(None, None, True, None, None, datetime(2026, 1, 1)) is None
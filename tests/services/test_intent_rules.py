@@ -0,0 +1,87 @@
+import pytest
+
+from app.services.intent_rules import IntentRules, MIN_CONFIDENCE, canonical_patient_id, likely_intents
+
+
+@pytest.fixture
+def rules():
+    return IntentRules()
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Record vitals for PT1234: BP 120/80, temp 37.5, pulse 72, SpO2 98%",
+     {"intent": "record_vitals", "data": {"patient_id": "PT1234", "blood_pressure": "120/80", "temperature": 37.5,
+                                          "pulse": 72, "oxygen_saturation": 98.0}}),
+    ("pt-10001 bp 130 / 85",
+     {"intent": "record_vitals", "data": {"patient_id": "PT10001", "blood_pressure": "130/85"}}),
+    ("Dr Smith diagnosed PT1234 with hypertension",
+     {"intent": "add_diagnosis", "data": {"patient_id": "PT1234", "doctor_name": "Dr Smith", "diagnosis": "hypertension"}}),
+    ("Prescribe amoxicillin 500mg three times daily for PT1234",
+     {"intent": "prescribe_medication", "data": {"patient_id": "PT1234", "medication_name": "amoxicillin",
+                                                 "dosage": "500mg", "frequency": "three times daily"}}),
+    ("Give paracetamol 1g IV every 6 hours for PT10001",
+     {"intent": "prescribe_medication", "data": {"patient_id": "PT10001", "medication_name": "paracetamol",
+                                                 "dosage": "1g", "frequency": "every 6 hours", "route": "IV"}}),
+    ("Schedule follow-up for PT1234 tomorrow at 2pm",
+     {"intent": "schedule_appointment", "data": {"patient_id": "PT1234", "appointment_type": "follow-up",
+                                                 "time": "tomorrow at 2pm"}}),
+    ("Show me PT1234's records", {"intent": "query_patient", "data": {"patient_id": "PT1234"}}),
+    ("Trend for PT1234", {"intent": "vitals_trend", "data": {"patient_id": "PT1234"}}),
+    ("NEWS2 for the ward", {"intent": "vitals_trend", "data": {}}),
+    ("New patient: John Doe, 45 years old, male, phone 08012345678",
+     {"intent": "register_patient", "data": {"name": "John Doe", "age": 45, "gender": "male", "phone": "08012345678"}}),
+])
+def test_routine_messages_take_the_fast_path(rules, message, expected):
+    assert rules.parse(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    # A clinical remark the vitals rule can't chart
+    "PT1234 temp 39 and patient is confused",
+    # A second instruction inside the diagnosis text
+    "Dr Smith diagnosed PT1234 with hypertension and prescribed amlodipine 5mg daily",
+    # Frequency wording the rule doesn't recognise
+    "Prescribe amoxicillin 500mg with food for PT1234",
+    # Appointment "times" that aren't times, or say more than a time
+    "Schedule follow-up for PT1234 on hold",
+    "Schedule follow-up for PT1234 tomorrow at 2pm and cancel the 3pm",
+    "New patient: John Doe, 45 years old, male, allergic to penicillin",
+])
+def test_messages_saying_more_than_the_rules_understand_go_to_the_llm(rules, message):
+    result, confidence = rules.match(message)
+    assert result is not None
+    assert confidence < MIN_CONFIDENCE
+    assert rules.parse(message) is None
+
+
+def test_weekday_with_on_is_still_a_time(rules):
+    result, confidence = rules.match("Schedule review for PT1234 on Friday")
+    assert confidence == 1.0
+    assert result["data"]["time"] == "on Friday"
+
+
+def test_hit_and_miss_counters(rules):
+    rules.parse("Show me PT1234's records")
+    rules.parse("how is the ward doing")
+    assert rules.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("PT1234", "PT1234"),
+    ("pt - 10001", "PT10001"),
+    ("patient 1234", None),
+    ("PT12", None),
+])
+def test_canonical_patient_id(text, expected):
+    assert canonical_patient_id(text) == expected
+
+
+@pytest.mark.parametrize("message, expected", [
+    # Units written against the number still count as a prescription cue
+    ("give 500mg paracetamol", ["prescribe_medication"]),
+    # Ties keep _INTENT_HINTS order
+    ("BP 150/95 and started amlodipine 5mg", ["record_vitals", "prescribe_medication"]),
+    ("good morning", []),
+])
+def test_likely_intents(message, expected):
+    assert likely_intents(message) == expected
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from app.services.trend_service import PARAMETERS, news2_components, news2_risk, window_stats
+
+
+def _component(parameter: str, value: float) -> int:
+    latest = np.full((1, len(PARAMETERS)), np.nan)
+    latest[0, PARAMETERS.index(parameter)] = value
+    return int(news2_components(latest)[0, PARAMETERS.index(parameter)])
+
+
+# Both edges of every NEWS2 band
+@pytest.mark.parametrize("parameter, value, score", [
+    ("respiratory_rate", 8, 3), ("respiratory_rate", 9, 1), ("respiratory_rate", 11, 1),
+    ("respiratory_rate", 12, 0), ("respiratory_rate", 20, 0), ("respiratory_rate", 21, 2),
+    ("respiratory_rate", 24, 2), ("respiratory_rate", 25, 3),
+    ("oxygen_saturation", 91, 3), ("oxygen_saturation", 92, 2), ("oxygen_saturation", 93, 2),
+    ("oxygen_saturation", 94, 1), ("oxygen_saturation", 95, 1), ("oxygen_saturation", 96, 0),
+    ("systolic_bp", 90, 3), ("systolic_bp", 91, 2), ("systolic_bp", 100, 2), ("systolic_bp", 101, 1),
+    ("systolic_bp", 110, 1), ("systolic_bp", 111, 0), ("systolic_bp", 219, 0), ("systolic_bp", 220, 3),
+    ("pulse", 40, 3), ("pulse", 41, 1), ("pulse", 50, 1), ("pulse", 51, 0), ("pulse", 90, 0),
+    ("pulse", 91, 1), ("pulse", 110, 1), ("pulse", 111, 2), ("pulse", 130, 2), ("pulse", 131, 3),
+    ("temperature", 35.0, 3), ("temperature", 35.1, 1), ("temperature", 36.0, 1), ("temperature", 36.1, 0),
+    ("temperature", 38.0, 0), ("temperature", 38.1, 1), ("temperature", 39.0, 1), ("temperature", 39.1, 2),
+])
+def test_news2_band_edges(parameter, value, score):
+    assert _component(parameter, value) == score
+
+
+def test_missing_values_score_zero():
+    latest = np.array([[np.nan, 90.0, np.nan, np.nan, np.nan]])
+    assert news2_components(latest).tolist() == [[0, 3, 0, 0, 0]]
+
+
+@pytest.mark.parametrize("total, max_component, risk", [
+    (0, 0, "low"),
+    (4, 2, "low"),
+    (3, 3, "low-medium"),
+    (5, 2, "medium"),
+    (6, 3, "medium"),
+    (7, 3, "high"),
+])
+def test_news2_risk(total, max_component, risk):
+    assert news2_risk(total, max_component) == risk
+
+
+def test_window_stats_skip_gaps():
+    # One patient, pulse 80 -> (gap) -> 100 over two hours, nothing else recorded
+    values = np.full((1, 3, len(PARAMETERS)), np.nan)
+    pulse = PARAMETERS.index("pulse")
+    values[0, 0, pulse] = 80
+    values[0, 2, pulse] = 100
+    times = np.array([[0.0, 3600.0, 7200.0]])
+
+    latest, mean, slope = window_stats(values, times)
+    assert latest[0, pulse] == 100
+    assert mean[0, pulse] == 90
+    assert slope[0, pulse] == pytest.approx(10.0)
+    # A parameter with no readings has no latest value, mean or slope
+    assert np.isnan(latest[0, 0]) and np.isnan(mean[0, 0]) and np.isnan(slope[0, 0])
+
+
+def test_window_stats_need_two_readings_for_a_slope():
+    values = np.full((1, 2, len(PARAMETERS)), np.nan)
+    values[0, 1, 0] = 18
+    latest, mean, slope = window_stats(values, np.array([[0.0, 3600.0]]))
+    assert latest[0, 0] == 18 and mean[0, 0] == 18
+    assert np.isnan(slope[0, 0])
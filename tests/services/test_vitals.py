@@ -0,0 +1,65 @@
+import pytest
+
+from app.services.vitals import VitalsValidationError, normalize_vitals, parse_blood_pressure
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120/80", (120, 80)),
+    (" 120 / 80 mmHg ", (120, 80)),
+    (None, (None, None)),
+    ("", (None, None)),
+])
+def test_parse_blood_pressure(value, expected):
+    assert parse_blood_pressure(value) == expected
+
+
+@pytest.mark.parametrize("value", ["120", "120-80", "1200/80", "high"])
+def test_parse_blood_pressure_rejects_malformed(value):
+    with pytest.raises(ValueError):
+        parse_blood_pressure(value)
+
+
+def test_normalize_keeps_blood_pressure_as_entered():
+    cleaned = normalize_vitals({"patient_id": "PT1234", "blood_pressure": " 120 / 80 mmHg "})
+    assert cleaned["blood_pressure"] == " 120 / 80 mmHg "
+    assert (cleaned["systolic_bp"], cleaned["diastolic_bp"]) == (120, 80)
+
+
+def test_normalize_coerces_numbers_and_blanks():
+    cleaned = normalize_vitals({"temperature": "37.5", "pulse": "72.0", "respiratory_rate": "", "oxygen_saturation": 98})
+    assert cleaned["temperature"] == 37.5
+    assert cleaned["pulse"] == 72 and isinstance(cleaned["pulse"], int)
+    assert cleaned["respiratory_rate"] is None
+    assert cleaned["oxygen_saturation"] == 98.0
+    assert cleaned["systolic_bp"] is None and cleaned["diastolic_bp"] is None
+
+
+@pytest.mark.parametrize("field, value", [
+    ("temperature", 25.0), ("temperature", 45.0),
+    ("pulse", 20), ("pulse", 300),
+    ("respiratory_rate", 4), ("oxygen_saturation", 100),
+    ("blood_pressure", "300/200"), ("blood_pressure", "50/20"),
+])
+def test_range_bounds_are_inclusive(field, value):
+    normalize_vitals({field: value})
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"temperature": 377}, "temperature 377.0 is outside 25.0-45.0"),
+    ({"pulse": "fast"}, "pulse 'fast' is not a number"),
+    ({"oxygen_saturation": 101}, "oxygen saturation 101.0 is outside 50.0-100.0"),
+    ({"blood_pressure": "80/120"}, "blood pressure 80/120 has diastolic above systolic"),
+    ({"blood_pressure": "90/90"}, "blood pressure 90/90 has diastolic equal to systolic"),
+    ({"blood_pressure": "320/80"}, "systolic 320 is outside 50-300"),
+    ({"blood_pressure": "120"}, "blood pressure '120' should look like 120/80"),
+])
+def test_normalize_rejects(data, message):
+    with pytest.raises(VitalsValidationError) as excinfo:
+        normalize_vitals(data)
+    assert message in str(excinfo.value)
+
+
+def test_every_problem_is_reported():
+    with pytest.raises(VitalsValidationError) as excinfo:
+        normalize_vitals({"temperature": 377, "pulse": 3, "blood_pressure": "80/120"})
+    assert len(str(excinfo.value).split("; ")) == 3
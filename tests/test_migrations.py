@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrations import MIGRATIONS, applied_versions, init_db, run_migrations
+
+# Tables as they were before any migration existed
+LEGACY_SCHEMA = [
+    "CREATE TABLE patients (id INTEGER PRIMARY KEY, patient_id VARCHAR UNIQUE, name VARCHAR NOT NULL, age INTEGER,"
+    " gender VARCHAR, phone VARCHAR, created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE vitals (id INTEGER PRIMARY KEY, patient_id INTEGER REFERENCES patients(id), blood_pressure VARCHAR,"
+    " temperature FLOAT, pulse INTEGER, respiratory_rate INTEGER, oxygen_saturation FLOAT, recorded_at DATETIME, notes TEXT)",
+    "CREATE TABLE diagnoses (id INTEGER PRIMARY KEY, patient_id INTEGER REFERENCES patients(id), doctor_name VARCHAR,"
+    " diagnosis TEXT NOT NULL, diagnosed_at DATETIME)",
+    "CREATE TABLE medications (id INTEGER PRIMARY KEY, patient_id INTEGER REFERENCES patients(id),"
+    " medication_name VARCHAR NOT NULL, dosage VARCHAR, frequency VARCHAR, route VARCHAR, start_date DATETIME,"
+    " end_date DATETIME, next_dose_time DATETIME, is_active INTEGER, notes TEXT)",
+    "CREATE TABLE appointments (id INTEGER PRIMARY KEY, patient_id INTEGER REFERENCES patients(id),"
+    " appointment_type VARCHAR, appointment_datetime DATETIME NOT NULL, notes TEXT, is_completed INTEGER,"
+    " created_at DATETIME)",
+]
+
+ALL_VERSIONS = [version for version, _, _ in MIGRATIONS]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etr.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_fresh_database(engine):
+    assert init_db(engine) == ALL_VERSIONS
+    assert sorted(applied_versions(engine)) == ALL_VERSIONS
+    # Nothing left to do on the next start
+    assert init_db(engine) == []
+
+
+def test_upgrade_legacy_database(engine):
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("INSERT INTO patients (id, patient_id, name) VALUES (1, 'PT1234', 'Ada')")
+        conn.exec_driver_sql(
+            "INSERT INTO vitals (id, patient_id, blood_pressure, recorded_at) VALUES"
+            " (1, 1, '120/80', '2026-01-01 08:00:00'), (2, 1, 'see notes', '2026-01-01 09:00:00')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO medications (id, patient_id, medication_name, frequency, start_date, next_dose_time, is_active)"
+            " VALUES (1, 1, 'amoxicillin', 'tds for 5 days', '2026-01-01 08:00:00', '2026-01-01 16:00:00', 1),"
+            " (2, 1, 'paracetamol', 'prn', '2026-01-01 08:00:00', '2026-01-01 16:00:00', 1)"
+        )
+
+    assert init_db(engine) == ALL_VERSIONS
+
+    columns = {table: {c['name'] for c in inspect(engine).get_columns(table)} for table in ("vitals", "medications")}
+    assert {"systolic_bp", "diastolic_bp"} <= columns["vitals"]
+    assert {"interval_minutes", "dose_times", "is_prn", "claim_token", "claimed_until"} <= columns["medications"]
+
+    with engine.connect() as conn:
+        vitals = conn.execute(text("SELECT blood_pressure, systolic_bp, diastolic_bp FROM vitals ORDER BY id")).all()
+        medications = conn.execute(text(
+            "SELECT interval_minutes, is_prn, end_date, next_dose_time FROM medications ORDER BY id"
+        )).all()
+        summaries = conn.execute(text("SELECT COUNT(*) FROM patient_summaries")).scalar()
+
+    # Unparseable BP strings stay text only
+    assert [tuple(row) for row in vitals] == [("120/80", 120, 80), ("see notes", None, None)]
+    assert medications[0].interval_minutes == 8 * 60
+    assert str(medications[0].end_date).startswith("2026-01-06 08:00:00")
+    # PRN medications lose their timed reminder
+    assert medications[1].is_prn == 1 and medications[1].next_dose_time is None
+    assert summaries == 1
+
+
+def test_concurrent_workers_apply_each_migration_once(tmp_path):
+    url = f"sqlite:///{tmp_path / 'etr.db'}"
+    engines = [create_engine(url, connect_args={"timeout": 30}) for _ in range(4)]
+    try:
+        with ThreadPoolExecutor(len(engines)) as pool:
+            results = list(pool.map(init_db, engines))
+    finally:
+        for engine in engines:
+            engine.dispose()
+
+    # Every worker starts cleanly and, between them, each migration runs once
+    assert sorted(version for applied in results for version in applied) == ALL_VERSIONS
+
+
+def test_run_migrations_skips_applied(engine):
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = :version"), {"version": ALL_VERSIONS[-1]})
+    # Migrations are idempotent, so re-running the forgotten one is safe
+    assert run_migrations(engine) == [ALL_VERSIONS[-1]]
@@ -0,0 +1,81 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.utils import ward_time
+from app.utils.timeparse import parse_datetime, parse_relative
+
+# A Wednesday, mid-morning (naive UTC)
+NOW = datetime(2026, 10, 14, 10, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("tomorrow at 2pm", datetime(2026, 10, 15, 14, 0)),
+    ("in 2 hours", datetime(2026, 10, 14, 12, 0)),
+    ("in 30 minutes", datetime(2026, 10, 14, 10, 30)),
+    ("in a week", datetime(2026, 10, 21, 10, 0)),
+    ("next Monday 10:30", datetime(2026, 10, 19, 10, 30)),
+    ("Friday morning", datetime(2026, 10, 16, 9, 0)),
+    ("tonight at 8", datetime(2026, 10, 14, 20, 0)),
+    ("at 6 in the evening", datetime(2026, 10, 14, 18, 0)),
+    ("today at 3.30pm", datetime(2026, 10, 14, 15, 30)),
+    ("noon", datetime(2026, 10, 14, 12, 0)),
+    ("2026-10-20 at 14:00", datetime(2026, 10, 20, 14, 0)),
+    ("the day after tomorrow", datetime(2026, 10, 16, 10, 0)),
+])
+def test_common_phrasings(text, expected):
+    assert parse_relative(text, NOW) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # A time that has already passed today means tomorrow
+    ("9am", datetime(2026, 10, 15, 9, 0)),
+    ("at 9", datetime(2026, 10, 15, 9, 0)),
+    # A bare weekday keeps the time of day; today's is today, not next week
+    ("monday", datetime(2026, 10, 19, 10, 0)),
+    ("wednesday", datetime(2026, 10, 14, 10, 0)),
+    ("next wednesday", datetime(2026, 10, 21, 10, 0)),
+    # Today's weekday at a time already gone rolls forward a week
+    ("wednesday at 9am", datetime(2026, 10, 21, 9, 0)),
+])
+def test_roll_forward(text, expected):
+    assert parse_relative(text, NOW) == expected
+
+
+@pytest.mark.parametrize("text", ["on hold", "tomorrow at 25:00", "13pm", "in 2 days at 3pm", "tomorrow or friday"])
+def test_anything_not_understood_is_left_to_dateparser(text):
+    assert parse_relative(text, NOW) is None
+
+
+@pytest.fixture
+def lagos_ward(monkeypatch):
+    # UTC+1, no DST
+    monkeypatch.setattr(ward_time, "WARD_TZ", ZoneInfo("Africa/Lagos"))
+
+
+@pytest.mark.parametrize("text, now, expected", [
+    # Clock times are ward time; results are naive UTC
+    ("tomorrow at 2pm", NOW, datetime(2026, 10, 15, 13, 0)),
+    ("9am", NOW, datetime(2026, 10, 15, 8, 0)),
+    # Offsets don't depend on the timezone
+    ("in 2 hours", NOW, datetime(2026, 10, 14, 12, 0)),
+    # 23:30 UTC is already tomorrow on the ward
+    ("tomorrow at 8am", datetime(2026, 10, 14, 23, 30), datetime(2026, 10, 16, 7, 0)),
+])
+def test_phrases_are_read_in_ward_time(lagos_ward, text, now, expected):
+    assert parse_relative(text, now) == expected
+
+
+def test_parse_datetime_fast_path():
+    assert parse_datetime("tomorrow at 2pm", NOW) == datetime(2026, 10, 15, 14, 0)
+
+
+@pytest.mark.parametrize("text", ["", "   ", None])
+def test_parse_datetime_empty(text):
+    assert parse_datetime(text, NOW) is None
+
+
+def test_parse_datetime_falls_back_to_dateparser():
+    pytest.importorskip("dateparser")
+    assert parse_datetime("October 20th 2026 at 2pm", NOW) == datetime(2026, 10, 20, 14, 0)